@@ -0,0 +1,89 @@
+"""
+Benchmarks of the performance-critical algorithms in DIALS.
+
+The benchmarks use pytest-benchmark and synthetic data, so need no network
+access or test data, and run on a CPU-only machine. Run them with e.g.
+
+    pytest benchmarks --benchmark-scales=small,medium --benchmark-json=results.json
+
+The scales of the synthetic data are defined in synthetic.SCALES. On Linux,
+the increase in the peak resident memory during each benchmark is recorded
+as peak_memory_mb in the extra_info of the results.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.synthetic import SCALES  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark-scales",
+        default="small,medium",
+        help="Comma-separated scales of synthetic data to benchmark, from "
+        + ", ".join(SCALES),
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        scales = metafunc.config.getoption("--benchmark-scales").split(",")
+        for scale in scales:
+            if scale not in SCALES:
+                raise pytest.UsageError(f"Unknown benchmark scale: {scale}")
+        metafunc.parametrize("scale", scales, scope="session")
+
+
+def _memory_status():
+    """Return the current and peak resident memory of the process in bytes."""
+    status = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                status[key] = int(value.split()[0]) * 1024
+    return status["VmRSS"], status["VmHWM"]
+
+
+def _reset_peak_memory():
+    """Reset the peak resident memory of the process (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+@pytest.fixture(autouse=True)
+def peak_memory(request):
+    """Record the increase in peak resident memory during each benchmark."""
+    if "benchmark" not in request.fixturenames or not _reset_peak_memory():
+        yield
+        return
+    benchmark = request.getfixturevalue("benchmark")
+    rss, _ = _memory_status()
+    yield
+    _, peak = _memory_status()
+    benchmark.extra_info["peak_memory_mb"] = (peak - rss) / 2**20
+
+
+@pytest.fixture(scope="session")
+def sweep(scale, tmp_path_factory):
+    """A synthetic rotation sweep, written as miniCBF images."""
+    sizes = SCALES[scale]
+    experiment = synthetic.rotation_experiment(
+        sizes["n_images"], image_size=sizes["image_size"]
+    )
+    return synthetic.write_sweep(experiment, tmp_path_factory.mktemp(f"sweep_{scale}"))
+
+
+@pytest.fixture(scope="session")
+def multi_dataset_intensities(scale):
+    """The intensities of many synthetic datasets of the same crystal."""
+    return synthetic.multi_dataset_intensities(SCALES[scale]["n_datasets"])
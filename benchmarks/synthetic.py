@@ -0,0 +1,256 @@
+"""
+Generators of synthetic data for the benchmarks.
+
+Everything is simulated from idealised models, so that the benchmarks run
+offline, without the dials_data files. The sizes of the generated data are
+set per scale in SCALES.
+"""
+
+from __future__ import annotations
+
+import copy
+import math
+
+import numpy as np
+
+from cctbx import miller, sgtbx
+from dxtbx import flumpy
+from dxtbx.format.FormatCBFMini import FormatCBFMini
+from dxtbx.model import (
+    BeamFactory,
+    Crystal,
+    DetectorFactory,
+    GoniometerFactory,
+    ScanFactory,
+)
+from dxtbx.model.experiment_list import (
+    Experiment,
+    ExperimentList,
+    ExperimentListFactory,
+)
+from scitbx import matrix
+
+from dials.algorithms.profile_model.gaussian_rs import Model
+from dials.algorithms.symmetry.cosym._generate_test_data import generate_test_data
+from dials.array_family import flex
+
+# The size of the synthetic data at each scale of benchmark
+SCALES = {
+    "small": {
+        "n_images": 10,
+        "image_size": (500, 500),
+        "n_scan_images": 90,
+        "n_datasets": 20,
+    },
+    "medium": {
+        "n_images": 50,
+        "image_size": (1000, 1000),
+        "n_scan_images": 450,
+        "n_datasets": 100,
+    },
+    "large": {
+        "n_images": 200,
+        "image_size": (2000, 2000),
+        "n_scan_images": 1800,
+        "n_datasets": 400,
+    },
+}
+
+PIXEL_SIZE = 0.172
+SIGMA_B = 0.02
+SIGMA_M = 0.04
+
+
+def rotation_experiment(
+    n_images,
+    image_size=(1000, 1000),
+    image_width=0.2,
+    unit_cell=(40, 50, 60),
+    seed=0,
+):
+    """
+    Create a rotation experiment with an idealised geometry.
+
+    The crystal is primitive orthorhombic with a random orientation, and the
+    beam is centred on a PAD detector, which covers 2 Å resolution at the edge
+    of a 1000x1000 image. The experiment has a Gaussian profile model but no
+    imageset.
+    """
+    nx, ny = image_size
+    detector = DetectorFactory.simple(
+        "PAD",
+        150.0,
+        (nx * PIXEL_SIZE / 2, ny * PIXEL_SIZE / 2),
+        "+x",
+        "-y",
+        (PIXEL_SIZE, PIXEL_SIZE),
+        image_size,
+        trusted_range=(-1, 1e6),
+    )
+    beam = BeamFactory.simple(wavelength=1.0)
+    goniometer = GoniometerFactory.known_axis((1, 0, 0))
+    scan = ScanFactory.make_scan(
+        image_range=(1, n_images),
+        exposure_times=0.1,
+        oscillation=(0, image_width),
+        epochs=list(range(n_images)),
+        deg=True,
+    )
+    a, b, c = unit_cell
+    crystal = Crystal((a, 0, 0), (0, b, 0), (0, 0, c), space_group_symbol="P 2 2 2")
+    rng = np.random.default_rng(seed)
+    axis = matrix.col(rng.normal(size=3).tolist()).normalize()
+    crystal.set_U(axis.axis_and_angle_as_r3_rotation_matrix(rng.uniform(0, math.pi)))
+    return Experiment(
+        beam=beam,
+        detector=detector,
+        goniometer=goniometer,
+        scan=scan,
+        crystal=crystal,
+        profile=Model(None, 3, SIGMA_B, SIGMA_M, deg=True),
+        identifier="0",
+    )
+
+
+def predicted_reflections(experiment):
+    """Predict the reflections for the experiment, with id and identifier."""
+    # Use the plain reflection predictor, which does not need an imageset
+    experiment = copy.copy(experiment)
+    experiment.profile = None
+    reflections = flex.reflection_table.from_predictions(experiment)
+    reflections["id"] = flex.int(reflections.size(), 0)
+    reflections["imageset_id"] = flex.int(reflections.size(), 0)
+    reflections.experiment_identifiers()[0] = experiment.identifier
+    return reflections
+
+
+def write_sweep(experiment, directory, background=10, counts=1000, seed=0):
+    """
+    Simulate and write the images of a rotation experiment as miniCBF files.
+
+    The spots are Gaussian, with random intensities, at the predicted positions
+    of the reflections on a Poisson background.
+
+    Returns:
+        An ExperimentList with the experiment, with the imageset of the images.
+    """
+    rng = np.random.default_rng(seed)
+    reflections = predicted_reflections(experiment)
+    x, y, z = (flumpy.to_numpy(c) for c in reflections["xyzcal.px"].parts())
+    intensity = rng.exponential(counts, size=len(x))
+
+    # The pixel offsets of the spot profiles, out to 3 sigma
+    offsets = np.arange(-3, 4)
+    dy, dx = (o.ravel() for o in np.meshgrid(offsets, offsets, indexing="ij"))
+
+    nx, ny = experiment.detector[0].get_image_size()
+    scan = experiment.scan
+    filenames = []
+    for i in range(scan.get_num_images()):
+        image = rng.poisson(background, size=(ny, nx)).astype(np.float64)
+        near = np.abs(z - (i + 0.5)) < 2
+        weight = intensity[near] * np.exp(-0.5 * ((z[near] - (i + 0.5)) / 0.5) ** 2)
+        px = np.floor(x[near]).astype(int)[:, None] + dx
+        py = np.floor(y[near]).astype(int)[:, None] + dy
+        profile = np.exp(
+            -0.5 * ((px + 0.5 - x[near, None]) ** 2 + (py + 0.5 - y[near, None]) ** 2)
+        )
+        profile *= (weight / profile.sum(axis=1))[:, None]
+        inside = (px >= 0) & (px < nx) & (py >= 0) & (py < ny)
+        np.add.at(image, (py[inside], px[inside]), profile[inside])
+
+        filename = str(directory / f"image_{i + 1:05d}.cbf")
+        FormatCBFMini.as_file(
+            experiment.detector,
+            experiment.beam,
+            experiment.goniometer,
+            scan[i],
+            flumpy.from_numpy(np.round(image).astype(np.int32)),
+            filename,
+        )
+        filenames.append(filename)
+
+    experiments = ExperimentListFactory.from_filenames(filenames)
+    experiments[0].crystal = experiment.crystal
+    experiments[0].profile = experiment.profile
+    experiments[0].identifier = experiment.identifier
+    return experiments
+
+
+def indexed_reflections(experiment, seed=0):
+    """
+    Simulate indexed reflections for refinement, with the observed centroids
+    drawn around the predicted positions of the experiment.
+    """
+    rng = np.random.default_rng(seed)
+    reflections = predicted_reflections(experiment)
+    n = reflections.size()
+    image_width = math.radians(experiment.scan.get_oscillation()[1])
+    sigmas = np.array([PIXEL_SIZE / 2, PIXEL_SIZE / 2, image_width / 2])
+    xyz = flumpy.to_numpy(reflections["xyzcal.mm"])
+    reflections["xyzobs.mm.value"] = flumpy.vec_from_numpy(
+        xyz + rng.normal(scale=sigmas, size=(n, 3))
+    )
+    reflections["xyzobs.mm.variance"] = flumpy.vec_from_numpy(
+        np.tile(sigmas**2, (n, 1))
+    )
+    reflections["xyzobs.px.value"] = reflections["xyzcal.px"]
+    reflections.set_flags(flex.bool(n, True), reflections.flags.indexed)
+    return reflections
+
+
+def integrated_reflections(experiment, seed=0):
+    """
+    Simulate integrated reflections for scaling.
+
+    The intensities of the symmetry equivalents are equal, multiplied by a
+    smoothly varying scale factor over the rotation and with Poisson noise.
+    """
+    rng = np.random.default_rng(seed)
+    reflections = predicted_reflections(experiment)
+    reflections.compute_d(ExperimentList([experiment]))
+    n = reflections.size()
+
+    # A random intensity per unique reflection
+    space_group = experiment.crystal.get_space_group()
+    asu_indices = reflections["miller_index"].deep_copy()
+    miller.map_to_asu(space_group.type(), False, asu_indices)
+    _, unique = np.unique(flumpy.to_numpy(asu_indices), axis=0, return_inverse=True)
+    true_intensity = rng.exponential(1000, size=unique.max() + 1)[unique.ravel()]
+
+    z = flumpy.to_numpy(reflections["xyzcal.px"].parts()[2])
+    scale = 1.0 + 0.2 * np.sin(2 * np.pi * z / max(z.max(), 1))
+    intensity = rng.poisson(true_intensity * scale).astype(np.float64)
+    reflections["intensity.sum.value"] = flumpy.from_numpy(intensity)
+    reflections["intensity.sum.variance"] = flumpy.from_numpy(
+        np.maximum(intensity, 1.0)
+    )
+    reflections["xyzobs.px.value"] = reflections["xyzcal.px"]
+    reflections["partiality"] = flex.double(n, 1.0)
+    reflections.set_flags(flex.bool(n, True), reflections.flags.integrated_sum)
+    return reflections
+
+
+def multi_dataset_intensities(n_datasets, space_group="P 2 2 2", d_min=1.5, seed=0):
+    """
+    Simulate the intensities of many datasets of the same crystal.
+
+    For space groups with an indexing ambiguity, each dataset is reindexed by
+    a randomly chosen twin law.
+
+    Returns:
+        A tuple of the combined intensities as a miller.array and an array of
+        the dataset index of each intensity.
+    """
+    datasets, _ = generate_test_data(
+        space_group=sgtbx.space_group_info(space_group).group(),
+        unit_cell=(40, 50, 60, 90, 90, 90) if space_group == "P 2 2 2" else None,
+        sample_size=n_datasets,
+        d_min=d_min,
+        seed=seed,
+    )
+    intensities = datasets[0]
+    for dataset in datasets[1:]:
+        intensities = intensities.concatenate(dataset, assert_is_similar_symmetry=False)
+    dataset_ids = np.repeat(np.arange(n_datasets), [d.size() for d in datasets])
+    return intensities, dataset_ids
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.synthetic import SCALES, multi_dataset_intensities
+from dials.algorithms.symmetry.cosym.target import Target
+from dials.util.asu_index_cache import asu_index_cache
+
+
+@pytest.fixture(scope="module")
+def cosym_target(scale):
+    # Datasets with an indexing ambiguity, reindexed at random
+    intensities, dataset_ids = multi_dataset_intensities(
+        SCALES[scale]["n_datasets"], space_group="P 4"
+    )
+    return Target(intensities, dataset_ids)
+
+
+def test_compute_rij_wij(benchmark, cosym_target):
+    # Clear the asu indices cached by the construction of the target and by
+    # earlier rounds, so that every round maps the indices to the asu
+    rij, wij = benchmark.pedantic(
+        cosym_target._compute_rij_wij, setup=asu_index_cache.clear, rounds=3
+    )
+    assert rij.shape == cosym_target.rij_matrix.shape
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from dxtbx import flumpy
+
+from dials.algorithms.statistics.delta_cchalf import PerGroupCChalfStatistics
+from dials.array_family import flex
+
+
+def test_delta_cchalf(benchmark, multi_dataset_intensities):
+    intensities, dataset_ids = multi_dataset_intensities
+    reflections = flex.reflection_table()
+    reflections["miller_index"] = intensities.indices()
+    reflections["intensity"] = intensities.data()
+    reflections["variance"] = flex.pow2(intensities.sigmas())
+    reflections["dataset"] = flumpy.from_numpy(dataset_ids.astype("int32"))
+    reflections["group"] = reflections["dataset"]
+
+    def delta_cchalf(reflections):
+        statistics = PerGroupCChalfStatistics(
+            reflections, intensities.unit_cell(), intensities.space_group()
+        )
+        statistics.run()
+        return statistics
+
+    statistics = benchmark.pedantic(
+        delta_cchalf, setup=lambda: ((reflections.copy(),), {}), rounds=3
+    )
+    assert len(statistics.delta_cchalf_i()) == len(set(dataset_ids))
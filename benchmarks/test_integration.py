@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from dials.algorithms.integration.integrator import (
+    Integrator3D,
+    IntegratorExecutor,
+    phil_scope,
+)
+from dials.algorithms.integration.processor import Processor3D, build_processor
+from dials.array_family import flex
+
+
+def test_processor_3d(benchmark, sweep):
+    params = phil_scope.extract()
+    reflections = flex.reflection_table.from_predictions_multi(sweep)
+    reflections["imageset_id"] = flex.int(reflections.size(), 0)
+    reflections.compute_partiality(sweep)
+    Integrator3D.initialize_reflections(sweep, params.integration, reflections)
+
+    def setup():
+        processor = build_processor(
+            Processor3D, sweep, reflections.copy(), params.integration
+        )
+        processor.executor = IntegratorExecutor(sweep)
+        return (processor,), {}
+
+    integrated, _, _ = benchmark.pedantic(
+        lambda processor: processor.process(), setup=setup, rounds=3
+    )
+    assert integrated.get_flags(integrated.flags.integrated_sum).count(True) > 0
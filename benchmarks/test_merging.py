@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from dxtbx.model import Crystal, Experiment, ExperimentList
+from scitbx import matrix
+
+from dials.algorithms.merging.merge import merge_scaled_array
+
+
+def test_merge_scaled_array(benchmark, multi_dataset_intensities):
+    intensities, _ = multi_dataset_intensities
+    B = matrix.sqr(intensities.unit_cell().fractionalization_matrix()).transpose()
+    crystal = Crystal(B, space_group=intensities.space_group(), reciprocal=True)
+    experiments = ExperimentList([Experiment(crystal=crystal)])
+    merged, merged_anomalous, _ = benchmark(
+        merge_scaled_array, experiments, intensities
+    )
+    assert merged.array().size() > 0
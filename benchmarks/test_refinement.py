@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import copy
+
+from dxtbx.model.experiment_list import ExperimentList
+from libtbx.phil import parse
+from scitbx import matrix
+
+from benchmarks import synthetic
+from benchmarks.synthetic import SCALES
+from dials.algorithms.refinement.refiner import RefinerFactory, phil_scope
+
+
+def test_refiner_run(benchmark, scale):
+    experiment = synthetic.rotation_experiment(SCALES[scale]["n_scan_images"])
+    reflections = synthetic.indexed_reflections(experiment)
+
+    # Start refinement from a slightly misset crystal
+    axis = matrix.col((1, 1, 0)).normalize()
+    misset = axis.axis_and_angle_as_r3_rotation_matrix(0.1, deg=True)
+    experiment.crystal.set_U(misset * matrix.sqr(experiment.crystal.get_U()))
+    params = phil_scope.fetch(source=parse("")).extract()
+
+    def setup():
+        experiments = ExperimentList([copy.deepcopy(experiment)])
+        refiner = RefinerFactory.from_parameters_data_experiments(
+            params, reflections.copy(), experiments
+        )
+        return (refiner,), {}
+
+    history = benchmark.pedantic(lambda refiner: refiner.run(), setup=setup, rounds=3)
+    assert history["rmsd"][-1] < history["rmsd"][0]
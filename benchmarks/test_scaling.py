@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import copy
+
+from dxtbx.model.experiment_list import ExperimentList
+from libtbx import phil
+
+from benchmarks import synthetic
+from benchmarks.synthetic import SCALES
+from dials.algorithms.scaling.algorithm import ScalingAlgorithm
+from dials.util.asu_index_cache import asu_index_cache
+from dials.util.options import ArgumentParser
+
+
+def test_scaling_algorithm(benchmark, scale):
+    experiment = synthetic.rotation_experiment(SCALES[scale]["n_scan_images"])
+    reflections = synthetic.integrated_reflections(experiment)
+
+    phil_scope = phil.parse(
+        "include scope dials.command_line.scale.phil_scope", process_includes=True
+    )
+    parser = ArgumentParser(phil=phil_scope, check_format=False)
+    params, _ = parser.parse_args(args=[], quick_parse=True, show_diff_phil=False)
+    params.output.html = None
+    params.output.json = None
+
+    def setup():
+        script = ScalingAlgorithm(
+            copy.deepcopy(params),
+            ExperimentList([copy.deepcopy(experiment)]),
+            [reflections.copy()],
+        )
+        # don't reuse the asu indices cached by earlier rounds
+        asu_index_cache.clear()
+        return (script,), {}
+
+    benchmark.pedantic(lambda script: script.run(), setup=setup, rounds=3)
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from dials.algorithms.spot_finding.finder import ExtractSpots
+from dials.algorithms.spot_finding.threshold import DispersionThresholdStrategy
+
+
+def test_extract_spots(benchmark, sweep):
+    extract_spots = ExtractSpots(
+        threshold_function=DispersionThresholdStrategy(gain=1.0),
+        max_spot_size=1000,
+    )
+    reflections = benchmark(extract_spots, sweep[0].imageset)
+    assert reflections.size() > 0
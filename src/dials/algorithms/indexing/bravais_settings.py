@@ -4,6 +4,7 @@
 import copy
 import logging
 import math
+import multiprocessing
 
 import libtbx
 import libtbx.phil
@@ -11,13 +12,13 @@
 from cctbx import crystal, miller, sgtbx
 from cctbx.crystal_orientation import crystal_orientation
 from cctbx.sgtbx import bravais_types
-from dxtbx.model import Crystal
+from dxtbx.model import Crystal, ExperimentList
 from rstbx.dps_core.lepage import iotbx_converter
 from rstbx.symmetry.subgroup import MetricSubgroup
-from scitbx.array_family import flex
 
 import dials.util
 from dials.algorithms.indexing.refinement import refine
+from dials.array_family import flex
 from dials.command_line.check_indexing_symmetry import (
     get_symop_correlation_coefficients,
 )
@@ -259,17 +260,53 @@ def refined_settings_from_refined_triclinic(
             constrain_orient, space_group
         )
 
-    with concurrent.futures.ProcessPoolExecutor(max_workers=params.nproc) as pool:
-        for i, result in enumerate(
-            pool.map(
-                refine_subgroup,
-                (
-                    (params, subgroup, used_reflections, experiments)
-                    for subgroup in refined_settings
-                ),
+    def report(result):
+        if result.rmsd is not None:
+            logger.info(
+                "Refined setting %d (%s): rmsd %.4f, %d reflections",
+                result.setting_number,
+                result["bravais"],
+                result.rmsd,
+                result.Nmatches,
             )
-        ):
-            refined_settings[i] = result
+
+    shared_data = _SubgroupRefinementData(used_reflections, experiments)
+    if params.nproc == 1:
+        for i, subgroup in enumerate(refined_settings):
+            # refinement modifies the parameters, so give each subgroup a copy
+            refined_settings[i] = _refine_subgroup_with_data(
+                (copy.deepcopy(params), subgroup, shared_data)
+            )
+            report(refined_settings[i])
+        identify_likely_solutions(refined_settings)
+        return refined_settings
+
+    global _shared_data
+    if "fork" in multiprocessing.get_all_start_methods():
+        # Share the common data with the worker processes by fork inheritance,
+        # rather than pickling them for every subgroup
+        _shared_data = shared_data
+        mp_context = multiprocessing.get_context("fork")
+        tasks = {i: (params, subgroup) for i, subgroup in enumerate(refined_settings)}
+        task_function = _refine_subgroup_with_shared_data
+    else:
+        mp_context = None
+        tasks = {
+            i: (params, subgroup, shared_data)
+            for i, subgroup in enumerate(refined_settings)
+        }
+        task_function = _refine_subgroup_with_data
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=params.nproc, mp_context=mp_context
+        ) as pool:
+            futures = {pool.submit(task_function, task): i for i, task in tasks.items()}
+            for future in concurrent.futures.as_completed(futures):
+                refined_settings[futures[future]] = future.result()
+                report(refined_settings[futures[future]])
+    finally:
+        _shared_data = None
 
     identify_likely_solutions(refined_settings)
     return refined_settings
@@ -306,11 +343,95 @@ def identify_likely_solutions(all_solutions):
         solution.recommended = True
 
 
+class _SubgroupRefinementData:
+    """The input data for subgroup refinement that is common to all subgroups.
+
+    The selections of reflections used in refinement and for the calculation of
+    symmetry correlation coefficients, and the intensity / sigma values for the
+    latter, do not depend on the subgroup, so are determined once up front.
+
+    The reflections are shared by the refinement of every subgroup and must not
+    be modified: each subgroup is refined against a table that shares their
+    columns, except for those that refinement updates in place.
+    """
+
+    # The columns that refinement updates in place
+    refined_columns = (
+        "flags",
+        "s1",
+        "xyzcal.mm",
+        "xyzcal.px",
+        "entering",
+        "delpsical.rad",
+        "wavelength_cal",
+    )
+
+    def __init__(self, reflections, experiments):
+        self.reflections = reflections
+        self.experiments = experiments
+        self.refinement_selection = reflections.get_flags(
+            reflections.flags.used_in_refinement
+        )
+        self.cc_selection = None
+        self.cc_data = None
+        if "intensity.sum.value" in reflections:
+            # remove refl with -ve variance
+            self.cc_selection = reflections["intensity.sum.variance"] > 0
+            good_reflections = reflections.select(self.cc_selection)
+            self.cc_data = good_reflections["intensity.sum.value"] / flex.sqrt(
+                good_reflections["intensity.sum.variance"]
+            )
+
+    def reflections_for_subgroup(self):
+        """Return a table for refining a subgroup, sharing the read-only columns."""
+        reflections = flex.reflection_table()
+        for key in self.reflections.keys():
+            if key in self.refined_columns:
+                reflections[key] = self.reflections[key].deep_copy()
+            else:
+                reflections[key] = self.reflections[key]
+        return reflections
+
+    def experiments_for_subgroup(self):
+        """Return a copy of the experiments that can be given a new crystal."""
+        return ExperimentList([copy.copy(expt) for expt in self.experiments])
+
+
+# The data shared with forked worker processes for subgroup refinement
+_shared_data = None
+
+
+def _refine_subgroup_with_shared_data(args):
+    params, subgroup = args
+    return _refine_subgroup_with_data((params, subgroup, _shared_data))
+
+
+def _refine_subgroup_with_data(args):
+    params, subgroup, data = args
+    return _refine_subgroup(
+        params,
+        subgroup,
+        data.reflections_for_subgroup(),
+        data.experiments_for_subgroup(),
+        data,
+    )
+
+
 def refine_subgroup(args):
     assert len(args) == 4
     params, subgroup, used_reflections, experiments = args
 
     used_reflections = copy.deepcopy(used_reflections)
+    return _refine_subgroup(
+        params,
+        subgroup,
+        used_reflections,
+        experiments,
+        _SubgroupRefinementData(used_reflections, experiments),
+    )
+
+
+def _refine_subgroup(params, subgroup, used_reflections, experiments, data):
     triclinic_miller = used_reflections["miller_index"]
     higher_symmetry_miller = subgroup["cb_op_inp_best"].apply(triclinic_miller)
     used_reflections["miller_index"] = higher_symmetry_miller
@@ -326,7 +447,7 @@ def refine_subgroup(args):
     with LoggingContext("dials.algorithms.refinement", level=logging.ERROR):
         try:
             outlier_algorithm = params.refinement.reflections.outlier.algorithm
-            sel = used_reflections.get_flags(used_reflections.flags.used_in_refinement)
+            sel = data.refinement_selection
             if sel.all_eq(False):
                 # Soft outlier rejection if no used_in_refinement flag is set
                 params.refinement.reflections.outlier.algorithm = "tukey"
@@ -370,16 +491,9 @@ def refine_subgroup(args):
             unit_cell=subgroup.refined_crystal.get_unit_cell(),
             space_group=subgroup.refined_crystal.get_space_group(),
         )
-        if "intensity.sum.value" in used_reflections:
-            # remove refl with -ve variance
-            sel = used_reflections["intensity.sum.variance"] > 0
-            good_reflections = used_reflections.select(sel)
-
-            ms = miller.set(cs, good_reflections["miller_index"])
-            ms = ms.array(
-                good_reflections["intensity.sum.value"]
-                / flex.sqrt(good_reflections["intensity.sum.variance"])
-            )
+        if data.cc_selection is not None:
+            ms = miller.set(cs, higher_symmetry_miller.select(data.cc_selection))
+            ms = ms.array(data.cc_data)
             if params.cc_n_bins is not None:
                 ms.setup_binner(n_bins=params.cc_n_bins)
             ccs, nrefs = get_symop_correlation_coefficients(
@@ -125,6 +125,16 @@ def generate_phil_scope():
         .type = bool
         .help = "Use dynamic mask if available"
 
+      reference_profile_cache = None
+        .type = path
+        .help = "A directory in which to save the reference profiles computed"
+                "by the 3d_threaded integrator. The profiles are keyed by the"
+                "experiments, the profile modelling parameters and the"
+                "reference reflections; if profiles for the same input are"
+                "found in the directory, then the profile modelling pass over"
+                "the images is skipped."
+        .expert_level = 2
+
       debug {
 
         reference {
@@ -837,7 +847,6 @@ def __init__(
         :param experiments: The experiment list
         """
         self.experiments = experiments
-        self.overlaps = None
         self.profile_fitter = profile_fitter
         self.valid_foreground_threshold = valid_foreground_threshold
         super().__init__()
@@ -884,9 +893,6 @@ def initialize(self, frame0, frame1, reflections):
             logger.debug(frame_hist(reflections["bbox"], prefix=" ", symbol="*"))
             logger.debug("")
 
-        # Find any overlaps
-        self.overlaps = reflections.find_overlaps(self.experiments)
-
     def process(self, frame, reflections):
         """
         Process the reflections on a frame
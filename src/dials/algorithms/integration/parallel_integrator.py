@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import math
+import os
 import pickle
 
-from libtbx import Auto
+from dxtbx import flumpy
+from libtbx import Auto, phil
 
 import dials.algorithms.integration
 from dials.algorithms.integration.processor import NullTask, execute_parallel_task
@@ -1233,10 +1237,123 @@ def compute_required_memory(imageset, block_size):
     return MultiThreadedIntegrator.compute_required_memory(imageset, block_size)
 
 
+def _phil_extract_items(extract, exclude=()):
+    """Return the parameter values of a phil extract as a nested tuple."""
+    items = []
+    for name, value in sorted(vars(extract).items()):
+        if name.startswith("_") or name in exclude:
+            continue
+        if isinstance(value, phil.scope_extract):
+            value = _phil_extract_items(value, exclude)
+        elif isinstance(value, list):
+            value = tuple(
+                _phil_extract_items(v, exclude)
+                if isinstance(v, phil.scope_extract)
+                else repr(v)
+                for v in value
+            )
+        else:
+            value = repr(value)
+        items.append((name, value))
+    return tuple(items)
+
+
+def reference_profile_cache_key(experiments, reflections, params):
+    """
+    Compute the key of the reference profiles in the reference profile cache.
+
+    The key is a digest of the experiments, the parameters which affect the
+    profile modelling, and the reference reflections used to compute the
+    profiles.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(experiments.to_dict(), sort_keys=True).encode())
+
+    # External lookups (e.g. the mask) are recorded in the experiments; the
+    # processing (e.g. profile.gaussian_rs.nproc), output and debug options do
+    # not change the profiles.
+    exclude = ("lookup", "mp", "nproc", "debug", "reference_profile_cache")
+    digest.update(repr(_phil_extract_items(params.profile, exclude)).encode())
+    digest.update(repr(_phil_extract_items(params.integration, exclude)).encode())
+
+    selection = reflections.get_flags(reflections.flags.reference_spot)
+    reflections = reflections.select(selection)
+    for key in ("id", "panel", "miller_index", "bbox", "s1", "xyzcal.px", "flags"):
+        if key in reflections:
+            digest.update(key.encode())
+            digest.update(flumpy.to_numpy(reflections[key]).tobytes())
+    return digest.hexdigest()
+
+
+def _load_reference_profiles(filename):
+    """Load cached reference profiles, or return None if there are none."""
+    if not os.path.isfile(filename):
+        return None
+    try:
+        with open(filename, "rb") as infile:
+            return pickle.load(infile)
+    except Exception as e:
+        logger.warning("Unable to load reference profiles from %s: %s", filename, e)
+        return None
+
+
+def _save_reference_profiles(filename, profiles):
+    """Save reference profiles to the cache, writing to a temporary file first
+    so that concurrent runs never load a partially written file."""
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(tmp, "wb") as outfile:
+            pickle.dump(profiles, outfile)
+        os.replace(tmp, filename)
+    except OSError as e:
+        logger.warning("Unable to save reference profiles to %s: %s", filename, e)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
 class ReferenceCalculatorProcessor:
     def __init__(self, experiments, reflections, params=None):
         from dials.util import pprint
 
+        # Look for previously computed profiles for the same input
+        cache_filename = None
+        if params.integration.reference_profile_cache:
+            key = reference_profile_cache_key(experiments, reflections, params)
+            cache_filename = os.path.join(
+                params.integration.reference_profile_cache,
+                f"reference_profiles_{key}.pickle",
+            )
+            self._profiles = _load_reference_profiles(cache_filename)
+            if self._profiles is not None:
+                logger.info("Loaded reference profiles from %s", cache_filename)
+                self._reflections = reflections
+            else:
+                self._compute_profiles(experiments, reflections, params)
+                _save_reference_profiles(cache_filename, self._profiles)
+        else:
+            self._compute_profiles(experiments, reflections, params)
+
+        # Write the profiles to file
+        if params.integration.debug.reference.output:
+            with open(params.integration.debug.reference.filename, "wb") as outfile:
+                pickle.dump(self._profiles, outfile)
+
+        # Print the profiles to the debug log
+        for i in range(len(self._profiles)):
+            logger.debug("")
+            logger.debug("Reference Profiles for experiment %d", i)
+            logger.debug("")
+            reference = self._profiles[i].reference()
+            for j in range(len(reference)):
+                data = reference.data(j)
+                logger.debug("Profile %d", j)
+                if len(data) > 0:
+                    logger.debug(pprint.profile3d(data))
+                else:
+                    logger.debug("** NO PROFILE **")
+
+    def _compute_profiles(self, experiments, reflections, params):
         # Create the reference manager
         reference_manager = ReferenceCalculatorManager(experiments, reflections, params)
 
@@ -1280,25 +1397,6 @@ def process_output(result):
         self._reflections = reference_manager.result()
         self._profiles = reference_manager.reference
 
-        # Write the profiles to file
-        if params.integration.debug.reference.output:
-            with open(params.integration.debug.reference.filename, "wb") as outfile:
-                pickle.dump(self._profiles, outfile)
-
-        # Print the profiles to the debug log
-        for i in range(len(self._profiles)):
-            logger.debug("")
-            logger.debug("Reference Profiles for experiment %d", i)
-            logger.debug("")
-            reference = self._profiles[i].reference()
-            for j in range(len(reference)):
-                data = reference.data(j)
-                logger.debug("Profile %d", j)
-                if len(data) > 0:
-                    logger.debug(pprint.profile3d(data))
-                else:
-                    logger.debug("** NO PROFILE **")
-
     def reflections(self):
         return self._reflections
 
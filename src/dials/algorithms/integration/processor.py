@@ -13,7 +13,7 @@
 import dials.util.log
 from dials.array_family import flex
 from dials.model.data import make_image
-from dials.util import tabulate
+from dials.util import instrumentation, tabulate
 from dials.util.log import rehandle_cached_records
 from dials.util.mp import multi_node_parallel_map
 from dials.util.system import CPU_COUNT, MEMORY_LIMIT
@@ -248,6 +248,7 @@ def executor(self, function):
         """
         self.manager.executor = function
 
+    @instrumentation.timed("integration.process")
     def process(self):
         """
         Do all the processing tasks.
@@ -386,6 +387,7 @@ def __init__(self, index, job, experiments, reflections, params, executor=None):
         self.params = params
         self.executor = executor
 
+    @instrumentation.timed("integration.task")
     def __call__(self):
         """
         Do the processing.
@@ -506,6 +508,13 @@ def __call__(self):
         # Finalize the executor
         self.executor.finalize()
 
+        # Record the timing with the instrumentation
+        instrumentation.count("integration.images", len(imageset))
+        instrumentation.count("integration.reflections", len(self.reflections))
+        instrumentation.count("integration.read_time", read_time)
+        instrumentation.count("integration.extract_time", processor.extract_time())
+        instrumentation.count("integration.process_time", processor.process_time())
+
         # Return the result
         return dials.algorithms.integration.Result(
             index=self.index,
@@ -15,6 +15,7 @@
 from dials.algorithms.profile_model.ellipsoid import mosaicity_from_eigen_decomposition
 from dials.algorithms.profile_model.ellipsoid.model import (
     compute_change_of_basis_operation,
+    compute_change_of_basis_operations,
 )
 from dials.algorithms.profile_model.ellipsoid.parameterisation import (
     ReflectionModelState,
@@ -390,6 +391,17 @@ def fisher_information(self):
 
 
 class MaximumLikelihoodTarget(object):
+    """
+    The joint likelihood of a set of reflections.
+
+    All per-reflection quantities are stored as stacked arrays, with the
+    reflection as the first axis, so that the conditional distributions and
+    their derivatives are computed for all reflections at once with batched
+    numpy operations. The results are equal to summing the equivalent
+    ReflectionLikelihood quantities over the reflections.
+
+    """
+
     def __init__(
         self, model, s0, sp_list, h_list, ctot_list, mobs_list, sobs_list, panel_ids
     ):
@@ -402,89 +414,276 @@ def __init__(
         # Save the model
         self.model = model
 
-        # Compute the change of basis for each reflection
-        self.data = []
-        for i in range(len(h_list)):
-            self.data.append(
-                ReflectionLikelihood(
-                    model,
-                    s0,
-                    sp_list[:, i],
-                    matrix.col(h_list[i]),
-                    ctot_list[i],
-                    mobs_list[:, i],
-                    sobs_list[:, :, i],
-                    panel_ids[i],
+        # Save the data as (N, ...) arrays
+        self.s0 = np.array(s0, dtype=np.float64).reshape(3)
+        self.norm_s0 = norm(self.s0)
+        self.h = np.array(list(h_list), dtype=np.float64).reshape(-1, 3)
+        self.ctot = np.array(ctot_list, dtype=np.float64).reshape(-1)
+        self.mobs = np.array(mobs_list, dtype=np.float64).reshape(2, -1).T
+        self.sobs = np.transpose(np.array(sobs_list, dtype=np.float64), (2, 0, 1))
+        self.panel_ids = panel_ids
+
+        # Compute the change of basis for each reflection (const)
+        self.R = compute_change_of_basis_operations(
+            self.s0, np.array(sp_list, dtype=np.float64).reshape(3, -1)
+        )
+        self._R_cctbx = None
+
+        # The offsets of the parameters in the active parameter vector
+        self._n_params = len(model.active_parameters)
+        self._M_offset = 0
+        if not model.is_orientation_fixed:
+            self._M_offset += len(model.U_params)
+        if not model.is_unit_cell_fixed:
+            self._M_offset += len(model.B_params)
+
+        # The derivatives of sigma are zero when the mosaic spread is fixed
+        self._dS = np.zeros(shape=(len(self.h), 3, 3, self._n_params), dtype=np.float64)
+
+        self._update_mean()
+        self._update_sigma()
+        self._update_conditional()
+
+    def __len__(self):
+        return len(self.h)
+
+    def _update_mean(self):
+        """
+        Compute the rotated s2 vectors and their derivatives
+
+        """
+        state = self.model
+        U = state.U_matrix
+        B = state.B_matrix
+        self._r = np.matmul(self.h, np.matmul(U, B).T)
+        self._mu = np.einsum("nij,nj->ni", self.R, self.s0 + self._r)
+
+        dr_dp = np.zeros(shape=(len(self), 3, self._n_params), dtype=np.float64)
+        n_tot = 0
+        if not state.is_orientation_fixed:
+            dUB = np.matmul(state.dU_dp, B)
+            dr_dp[:, :, n_tot : n_tot + dUB.shape[0]] = np.einsum(
+                "lij,nj->nil", dUB, self.h
+            )
+            n_tot += dUB.shape[0]
+        if not state.is_unit_cell_fixed:
+            UdB = np.matmul(U, state.dB_dp)
+            dr_dp[:, :, n_tot : n_tot + UdB.shape[0]] = np.einsum(
+                "lij,nj->nil", UdB, self.h
+            )
+        self._dmu = np.matmul(self.R, dr_dp)
+
+    def _update_sigma(self):
+        """
+        Compute the rotated covariance matrices and their derivatives
+
+        """
+        state = self.model
+        MS = state._M_parameterisation.sigma()  # static sigma
+        if state.is_mosaic_spread_angular:
+            # The angular component is defined w.r.t the frame of r and s0
+            norm_r = norm(self._r, axis=1)
+            e3 = self._r / norm_r[:, None]
+            e1 = np.cross(e3, self.s0 / self.norm_s0)
+            e1 /= norm(e1, axis=1)[:, None]
+            e2 = np.cross(e3, e1)
+            e2 /= norm(e2, axis=1)[:, None]
+            Q = np.stack([e1, e2, e3], axis=1)
+            A = np.zeros(shape=(len(self), 3), dtype=np.float64)
+            A[:, 0:2] = (norm_r**2)[:, None]
+            MA = state._M_parameterisation.sigma_A()
+            sigma = np.einsum("nji,njk,nkl->nil", Q, A[:, :, None] * MA, Q) + MS
+        else:
+            sigma = MS
+
+        if not state.is_mosaic_spread_fixed:
+            dS_dp = np.zeros(shape=(len(self), 3, 3, self._n_params), dtype=np.float64)
+            dM_dp = state.dM_dp
+            n_tot = self._M_offset
+            dS_dp[:, :, :, n_tot : n_tot + dM_dp.shape[0]] = np.transpose(
+                dM_dp, axes=(1, 2, 0)
+            )
+            n_tot += dM_dp.shape[0]
+            if state.is_mosaic_spread_angular:
+                dM_dp_A = state.dM_dp_A
+                AdM = A[:, None, :, None] * dM_dp_A[None, :, :, :]
+                dS_dp[:, :, :, n_tot : n_tot + dM_dp_A.shape[0]] = np.einsum(
+                    "nji,nmjk,nkl->nilm", Q, AdM, Q, optimize=True
                 )
+            self._dS = np.einsum(
+                "nij,njkp,nlk->nilp", self.R, dS_dp, self.R, optimize=True
+            )
+
+        self._S = np.matmul(np.matmul(self.R, sigma), np.transpose(self.R, (0, 2, 1)))
+
+    def _update_conditional(self):
+        """
+        Compute the conditional distribution on the Ewald sphere
+
+        """
+        S = self._S
+        S12 = S[:, 0:2, 2]
+        S21 = S[:, 2, 0:2]
+        self._S22 = S[:, 2, 2]
+        self._epsilon = self.norm_s0 - self._mu[:, 2]
+        self._mubar = self._mu[:, 0:2] + S12 * (self._epsilon / self._S22)[:, None]
+        self._Sbar = (
+            S[:, 0:2, 0:2]
+            - np.einsum("ni,nj->nij", S12, S21) / self._S22[:, None, None]
+        )
+        self._Sbar_inv = inv(self._Sbar)
+
+        # The derivatives are only computed when needed
+        self._dSbar = None
+        self._dmbar = None
+
+    def _conditional_derivatives(self):
+        """
+        Compute the first derivatives of the conditional mean and sigma
+
+        """
+        if self._dSbar is None:
+            S = self._S
+            dS = self._dS
+            S12 = S[:, 0:2, 2]
+            S21 = S[:, 2, 0:2]
+            S22_inv = 1 / self._S22
+            dS12 = dS[:, 0:2, 2, :]
+            dS21 = dS[:, 2, 0:2, :]
+            dS22 = dS[:, 2, 2, :]
+
+            # Derivatives of the conditional sigma (N, 2, 2, n_params)
+            A = dS[:, 0:2, 0:2, :]
+            B = (
+                np.einsum("ni,nj->nij", S12, S21)[:, :, :, None]
+                * (dS22 * (S22_inv**2)[:, None])[:, None, None, :]
+            )
+            C = np.einsum("ni,njp->nijp", S12, dS21) * S22_inv[:, None, None, None]
+            D = np.einsum("nip,nj->nijp", dS12, S21) * S22_inv[:, None, None, None]
+            self._dSbar = A + B - (C + D)
+
+            # Derivatives of the conditional mean (N, 2, n_params)
+            epsilon = self._epsilon
+            dmu2 = self._dmu[:, 2, :]
+            self._dmbar = (
+                self._dmu[:, 0:2, :]
+                + dS12 * (epsilon * S22_inv)[:, None, None]
+                - S12[:, :, None] * (dS22 * (epsilon * S22_inv**2)[:, None])[:, None, :]
+                - S12[:, :, None] * (dmu2 * S22_inv[:, None])[:, None, :]
             )
+        return self._dSbar, self._dmbar
 
     def update(self):
-        for d in self.data:
-            d.modelstate.update()  # update the ReflectionModelState
-            d.update()  # update the ReflectionLikelihood
+        """
+        Update the distributions from the current model state
+
+        """
+        state = self.model
+        if (not state.is_unit_cell_fixed) or (not state.is_orientation_fixed):
+            self._update_mean()
+        if not state.is_mosaic_spread_fixed:
+            self._update_sigma()
+        self._update_conditional()
 
     def mse(self):
         """
         The MSE in local reflection coordinates
 
         """
-        mse = 0
-        for i in range(len(self.data)):
-            mbar = self.data[i].conditional.mean()
-            xobs = self.data[i].mobs
-            mse += np.dot((xobs - mbar).T, xobs - mbar)
-        mse /= len(self.data)
-        return mse
+        c_d = self.mobs - self._mubar
+        return np.sum(c_d**2) / len(self)
 
     def rmsd(self):
         """
         The RMSD in pixels
 
         """
-        mse_x = 0.0
-        mse_y = 0.0
-        for i in range(len(self.data)):
-            R = self.data[i].R_cctbx
-            mbar = tuple(self.data[i].conditional.mean().flatten())
-            xobs = tuple(self.data[i].mobs.flatten())
-            norm_s0 = self.data[i].norm_s0
-            rse_i = rse(R, mbar, xobs, norm_s0, self.model.experiment.detector)
-            mse_x += rse_i[0]
-            mse_y += rse_i[1]
-        mse_x /= len(self.data)
-        mse_y /= len(self.data)
-        return np.sqrt(np.array([mse_x, mse_y]))
+        if self._R_cctbx is None:
+            self._R_cctbx = [matrix.sqr(R.flatten().tolist()) for R in self.R]
+        detector = self.model.experiment.detector
+        mse = np.zeros(2)
+        for R, mbar, xobs in zip(self._R_cctbx, self._mubar, self.mobs):
+            mse += rse(R, tuple(mbar), tuple(xobs), self.norm_s0, detector)
+        return np.sqrt(mse / len(self))
 
     def log_likelihood(self):
         """
         The joint log likelihood
 
         """
-        return sum(d.log_likelihood() for d in self.data)
+        Sbar_det = det(self._Sbar)
+        if np.any(self._S22 <= 0) or np.any(Sbar_det <= 0):
+            raise ValueError("math domain error")
+
+        # Compute the marginal likelihood
+        m_lnL = self.ctot * (np.log(self._S22) + self._epsilon**2 / self._S22)
+
+        # Compute the conditional likelihood
+        c_d = self.mobs - self._mubar
+        V = self.sobs + np.einsum("ni,nj->nij", c_d, c_d)
+        c_lnL = self.ctot * (
+            np.log(Sbar_det) + np.einsum("nij,nji->n", self._Sbar_inv, V)
+        )
+
+        # Return the joint likelihood
+        return -0.5 * float(np.sum(m_lnL + c_lnL))
+
+    def _first_derivatives(self):
+        """
+        The first derivatives of each reflection (N, n_params)
+
+        """
+        dSbar, dmbar = self._conditional_derivatives()
+        ctot = self.ctot[:, None]
+        S22_inv = 1 / self._S22[:, None]
+        epsilon = self._epsilon[:, None]
+        dS22 = self._dS[:, 2, 2, :]
+        dep = -self._dmu[:, 2, :]
+
+        c_d = self.mobs - self._mubar
+        V1 = self.sobs + np.einsum("ni,nj->nij", c_d, c_d)
+        V2 = np.eye(2) - np.matmul(self._Sbar_inv, V1)
+
+        U = ctot * (
+            S22_inv * dS22 * (1.0 - S22_inv * epsilon**2) + 2 * S22_inv * epsilon * dep
+        )
+        V = ctot * np.einsum(
+            "nij,njkp,nki->np", self._Sbar_inv, dSbar, V2, optimize=True
+        )
+        W = -2.0 * ctot * np.einsum("nip,nij,nj->np", dmbar, self._Sbar_inv, c_d)
+        return -0.5 * (U + V + W)
 
     def jacobian(self):
         """
         Return the Jacobian
 
         """
-        return flex.double([list(d.first_derivatives()) for d in self.data])
+        return flumpy.from_numpy(np.ascontiguousarray(self._first_derivatives()))
 
     def first_derivatives(self):
         """
         The joint first derivatives
 
         """
-        dL = 0
-        for d in self.data:
-            dL += d.first_derivatives()
-        return dL
+        return np.sum(self._first_derivatives(), axis=0)
 
     def fisher_information(self):
         """
         The joint fisher information
 
         """
-        return sum(d.fisher_information() for d in self.data)
+        dSbar, dmbar = self._conditional_derivatives()
+        S22_inv = 1 / self._S22
+        dS22 = self._dS[:, 2, 2, :]
+        dmu2 = self._dmu[:, 2, :]
+
+        SdS = np.einsum("nij,njkp->nikp", self._Sbar_inv, dSbar)
+        U = np.einsum("nj,ni->nji", dS22, dS22) * (S22_inv**2)[:, None, None]
+        V = np.einsum("nikj,nkil->njl", SdS, SdS)
+        W = 2 * np.einsum("nkj,nkl,nli->nji", dmbar, self._Sbar_inv, dmbar)
+        X = 2 * np.einsum("nj,ni->nji", dmu2, dmu2) * S22_inv[:, None, None]
+        I = 0.5 * np.einsum("n,nji->ji", self.ctot, U + V + W + X)
+        return flumpy.from_numpy(np.ascontiguousarray(I))
 
 
 def line_search(func, x, p, tau=0.5, delta=1.0, tolerance=1e-7):
@@ -8,10 +8,10 @@
 
 from __future__ import annotations
 
-import collections
 import copy
 import logging
 import math
+import multiprocessing
 
 import numpy as np
 
@@ -315,13 +315,11 @@ def __init__(
                     "Something went wrong. Zero pixels selected for estimation of profile parameters."
                 )
 
-            # Compute intensity
-            self.K = flex.double()
-            self.nj = []
-            for i0, i1 in zip(self.indices[:-1], self.indices[1:]):
-                nj = n[i0:i1]
-                self.K.append(flex.sum(nj))
-                self.nj.append(nj)
+            # Compute intensity. The pixels of each reflection are contiguous,
+            # so the sums over each reflection are computed with reduceat
+            self.n = flumpy.to_numpy(n)
+            self.starts = flumpy.to_numpy(indices)[:-1].astype(np.intp)
+            self.K = np.add.reduceat(self.n, self.starts)
 
             # Set the starting values to try 1, 3 degrees seems sensible for
             # crystal mosaic spread
@@ -379,13 +377,9 @@ def target(self, log_sigma):
             # as a prior for sigma, which accounts for which reflections were actually
             # recorded.
             #
-            L = 0
-            for kj, nj, i0, i1 in zip(
-                self.K, self.nj, self.indices[:-1], self.indices[1:]
-            ):
-                zj = zi[i0:i1]
-                logZ = math.log(flex.sum(zj))
-                L += flex.sum(nj * flex.log(zj)) - kj * logZ + logZ
+            zi = flumpy.to_numpy(zi)
+            logZ = np.log(np.add.reduceat(zi, self.starts))
+            L = np.sum(self.n * np.log(zi)) - np.sum((self.K - 1) * logZ)
             logger.debug("Sigma M: %f, log(L): %f", sigma_m * 180 / math.pi, L)
 
             # Return the logarithm of r
@@ -567,6 +561,63 @@ def sigma_m(self):
         return self._sigma_m
 
 
+# The reflections of each frame and the experimental models, for parallel
+# calculation of a scan varying profile model, inherited by forked processes
+_frame_data = None
+
+
+def _compute_sigmas_for_frame(i):
+    """Compute sigma_b and sigma_m from the reflections of a single frame."""
+    reflection_list, (crystal, beam, detector, goniometer, scan) = _frame_data
+    reflections = reflection_list[i]
+
+    # Calculate the E.S.D of the beam divergence
+    beam_divergence = ComputeEsdBeamDivergence(detector, reflections)
+
+    # Calculate the E.S.D of the reflecting range
+    reflecting_range = ComputeEsdReflectingRange(
+        crystal, beam, detector, goniometer, scan, reflections
+    )
+    return beam_divergence.sigma(), reflecting_range.sigma()
+
+
+def _compute_frame_sigmas(reflection_list, models, nproc=1):
+    """Compute sigma_b and sigma_m for each frame, using nproc processes."""
+    global _frame_data
+    if "fork" not in multiprocessing.get_all_start_methods():
+        nproc = 1
+    nproc = min(nproc, len(reflection_list))
+    _frame_data = (reflection_list, models)
+    try:
+        if nproc <= 1:
+            return [_compute_sigmas_for_frame(i) for i in range(len(reflection_list))]
+        with multiprocessing.get_context("fork").Pool(nproc) as pool:
+            return pool.map(
+                _compute_sigmas_for_frame,
+                range(len(reflection_list)),
+                chunksize=max(1, len(reflection_list) // (4 * nproc)),
+            )
+    finally:
+        _frame_data = None
+
+
+def _convolve(data, kernel):
+    """Convolve the data with a symmetric kernel, extending the data at each
+    end with the first and last values."""
+    assert len(kernel) & 1
+    mid = len(kernel) // 2
+    return np.convolve(np.pad(data, mid, mode="edge"), kernel, mode="valid")
+
+
+def _gaussian_kernel(n):
+    """A normalised Gaussian kernel of (odd) size n, with sigma = (n // 2) / 3."""
+    assert n & 1
+    mid = n // 2
+    sigma = mid / 3.0
+    kernel = np.exp(-((np.arange(n) - mid) ** 2) / (2 * sigma**2))
+    return kernel / np.sum(kernel)
+
+
 class ScanVaryingProfileModelCalculator:
     """Class to help calculate the profile model."""
 
@@ -581,6 +632,7 @@ def __init__(
         min_zeta=0.05,
         algorithm="basic",
         centroid_definition="s1",
+        nproc=1,
     ):
         """Calculate the profile model."""
         from dxtbx.model.experiment_list import Experiment
@@ -612,92 +664,52 @@ def __init__(
         reflections = copy.deepcopy(reflections)
         reflections.split_partials_with_shoebox()
 
-        # Get a list of reflections for each frame
-        bbox = reflections["bbox"]
-        index_list = collections.defaultdict(list)
-        for i, (x0, x1, y0, y1, z0, z1) in enumerate(bbox):
-            assert z1 == z0 + 1
-            index_list[z0].append(i)
-        reflection_list = {
-            key: reflections.select(flex.size_t(value))
-            for key, value in index_list.items()
-        }
+        # Get a list of reflections for each frame, by sorting the partials by
+        # frame once
+        bbox = flumpy.to_numpy(reflections["bbox"])
+        assert np.all(bbox[:, 5] == bbox[:, 4] + 1)
+        perm = np.argsort(bbox[:, 4], kind="stable")
+        frames = bbox[perm, 4]
 
         # The range of frames
         z0, z1 = scan.get_array_range()
-        min_z = min(index_list)
-        max_z = max(index_list)
-        assert z0 == min_z
-        assert z1 == max_z + 1
-
-        # Compute for all frames
-        self._num = []
-        sigma_b = flex.double()
-        sigma_m = flex.double()
-        for i in range(z0, z1):
-            # Get reflections at the index
-            reflections = reflection_list[i]
-
-            self._num.append(len(reflections))
-
-            # Calculate the E.S.D of the beam divergence
-            beam_divergence = ComputeEsdBeamDivergence(detector, reflections)
-
-            # Set the sigma b
-            sigma_b.append(beam_divergence.sigma())
-
-            # Calculate the E.S.D of the reflecting range
-            reflecting_range = ComputeEsdReflectingRange(
-                crystal, beam, detector, goniometer, scan, reflections
-            )
-
+        assert frames[0] == z0
+        assert frames[-1] == z1 - 1
+        bounds = np.searchsorted(frames, np.arange(z0, z1 + 1))
+        assert np.all(bounds[1:] > bounds[:-1]), "No reflections on some frames"
+        perm = flumpy.from_numpy(perm.astype(np.uint64))
+        reflection_list = [
+            reflections.select(perm[int(i0) : int(i1)])
+            for i0, i1 in zip(bounds[:-1], bounds[1:])
+        ]
+
+        # Compute for all frames. The frames are independent, so may be
+        # computed in separate processes.
+        self._num = [len(r) for r in reflection_list]
+        models = (crystal, beam, detector, goniometer, scan)
+        sigmas = _compute_frame_sigmas(reflection_list, models, nproc)
+        sigma_b = flex.double(s[0] for s in sigmas)
+        sigma_m = flex.double(s[1] for s in sigmas)
+        for i, (s_b, s_m) in enumerate(sigmas, start=z0):
             logger.info(
                 "Computing profile model for frame %d: sigma_b = %.4f degrees, sigma_m = %.4f degrees",
                 i,
-                beam_divergence.sigma() * 180 / math.pi,
-                reflecting_range.sigma() * 180 / math.pi,
+                s_b * 180 / math.pi,
+                s_m * 180 / math.pi,
             )
 
-            # Set the sigmas
-            sigma_m.append(reflecting_range.sigma())
-
-        def convolve(data, kernel):
-            assert len(kernel) & 1
-            result = []
-            mid = len(kernel) // 2
-            for i in range(len(data)):
-                r = 0
-                for j in range(len(kernel)):
-                    k = i - mid + j
-                    if k < 0:
-                        r += kernel[j] * data[0]
-                    elif k >= len(data):
-                        r += kernel[j] * data[-1]
-                    else:
-                        r += kernel[j] * data[k]
-                result.append(r)
-            return result
-
-        def gaussian_kernel(n):
-            assert n & 1
-            mid = n // 2
-            sigma = mid / 3.0
-            kernel = [math.exp(-((i - mid) ** 2) / (2 * sigma**2)) for i in range(n)]
-            kernel = [k / sum(kernel) for k in kernel]
-            return kernel
-
         # Smooth the parameters
-        kernel = gaussian_kernel(51)
-        sigma_b_sq_new = convolve(flex.pow2(sigma_b), kernel)
-        sigma_m_sq_new = convolve(flex.pow2(sigma_m), kernel)
+        kernel = _gaussian_kernel(51)
+        sigma_b_sq_new = _convolve(flumpy.to_numpy(flex.pow2(sigma_b)), kernel)
+        sigma_m_sq_new = _convolve(flumpy.to_numpy(flex.pow2(sigma_m)), kernel)
 
         # Print the output - mean as is scan varying
         mean_sigma_b = math.sqrt(sum(flex.pow2(sigma_b)) / len(sigma_b))
         mean_sigma_m = math.sqrt(sum(flex.pow2(sigma_m)) / len(sigma_m))
 
         # Save the smoothed parameters
-        self._sigma_b = flex.sqrt(flex.double(sigma_b_sq_new))
-        self._sigma_m = flex.sqrt(flex.double(sigma_m_sq_new))
+        self._sigma_b = flex.sqrt(flumpy.from_numpy(sigma_b_sq_new))
+        self._sigma_m = flex.sqrt(flumpy.from_numpy(sigma_m_sq_new))
         assert len(self._sigma_b) == len(self._sigma_m)
 
         # Print out smoothed profile parameters
@@ -2,6 +2,9 @@
 
 from collections import namedtuple
 
+import numpy as np
+
+from dxtbx import flumpy
 from scitbx import matrix, sparse
 
 from dials.algorithms.refinement import DialsRefineConfigError
@@ -85,6 +88,9 @@ def __init__(
         self._xl_unit_cell_parameterisations = xl_unit_cell_parameterisations
         self._goniometer_parameterisations = goniometer_parameterisations
 
+        # Cache of experiment to reflection index mappings, keyed by table size
+        self._experiment_index_cache = {}
+
         self._update()
 
     def _update(self):
@@ -322,25 +328,24 @@ def get_gradients(self, reflections, callback=None):
         self._setting_rotation = flex.mat3_double(self._nref)
 
         # Set up experiment to index mapping
-        self._experiment_to_idx = []
+        self._experiment_to_idx = self._get_experiment_to_idx(reflections)
 
         # Populate values in these arrays
-        for iexp, exp in enumerate(self._experiments):
-            sel = reflections["id"] == iexp
-            isel = sel.iselection()
-            self._experiment_to_idx.append(isel)
-            subref = reflections.select(sel)
+        for exp, isel in zip(self._experiments, self._experiment_to_idx):
+            if len(isel) == 0:
+                continue
+            subref = reflections.select(isel)
             states = self._get_model_data_for_experiment(exp, subref)
 
-            self._D.set_selected(sel, states["D"])
-            self._s0.set_selected(sel, states["s0"])
-            self._U.set_selected(sel, states["U"])
-            self._B.set_selected(sel, states["B"])
+            self._D.set_selected(isel, states["D"])
+            self._s0.set_selected(isel, states["s0"])
+            self._U.set_selected(isel, states["U"])
+            self._B.set_selected(isel, states["B"])
             if exp.goniometer:
-                self._setting_rotation.set_selected(sel, states["S"])
-                self._axis.set_selected(sel, exp.goniometer.get_rotation_axis_datum())
+                self._setting_rotation.set_selected(isel, states["S"])
+                self._axis.set_selected(isel, exp.goniometer.get_rotation_axis_datum())
                 self._fixed_rotation.set_selected(
-                    sel, exp.goniometer.get_fixed_rotation()
+                    isel, exp.goniometer.get_fixed_rotation()
                 )
 
         # Other derived values
@@ -384,6 +389,33 @@ def get_gradients(self, reflections, callback=None):
 
         return results
 
+    def _get_experiment_to_idx(self, reflections):
+        """Return a list containing the indices of the reflections belonging to
+        each experiment. The mapping is built by sorting the experiment ids once,
+        rather than by testing the ids against each experiment in turn, and it is
+        reused for as long as the ids of the reflections passed in are unchanged,
+        which is usually the case between steps of refinement."""
+
+        ids = reflections["id"]
+        cached = self._experiment_index_cache.get(len(ids))
+        if cached is not None and (cached[0] == ids).all_eq(True):
+            return cached[1]
+
+        ids_np = flumpy.to_numpy(ids)
+        perm = np.argsort(ids_np, kind="stable")
+        bounds = np.searchsorted(ids_np[perm], np.arange(len(self._experiments) + 1))
+        perm = flumpy.from_numpy(perm.astype(np.uint64))
+        experiment_to_idx = [
+            perm[int(start) : int(end)] for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+
+        # Only a few tables (e.g. all observations and the matches) are in use at
+        # any one time, so stale entries are discarded rather than accumulated
+        if len(self._experiment_index_cache) >= 4:
+            self._experiment_index_cache.clear()
+        self._experiment_index_cache[len(ids)] = (ids.deep_copy(), experiment_to_idx)
+        return experiment_to_idx
+
     @staticmethod
     def _extend_gradient_vectors(results, m, n, keys=("dX_dp", "dY_dp", "dZ_dp")):
         """Extend results list by n empty results. These will each be a dictionary
@@ -1001,25 +1033,24 @@ def get_gradients(self, reflections, callback=None):
         )
 
         # Set up experiment to index mapping
-        self._experiment_to_idx = []
+        self._experiment_to_idx = self._get_experiment_to_idx(reflections)
 
         # Populate values in these arrays
-        for iexp, exp in enumerate(self._experiments):
-            sel = reflections["id"] == iexp
-            isel = sel.iselection()
-            self._experiment_to_idx.append(isel)
-            subref = reflections.select(sel)
+        for exp, isel in zip(self._experiments, self._experiment_to_idx):
+            if len(isel) == 0:
+                continue
+            subref = reflections.select(isel)
             states = self._get_model_data_for_experiment(exp, subref)
 
-            self._D.set_selected(sel, states["D"])
-            self._s0.set_selected(sel, states["s0"])
-            self._U.set_selected(sel, states["U"])
-            self._B.set_selected(sel, states["B"])
+            self._D.set_selected(isel, states["D"])
+            self._s0.set_selected(isel, states["s0"])
+            self._U.set_selected(isel, states["U"])
+            self._B.set_selected(isel, states["B"])
             if exp.goniometer:
-                self._setting_rotation.set_selected(sel, states["S"])
-                self._axis.set_selected(sel, exp.goniometer.get_rotation_axis_datum())
+                self._setting_rotation.set_selected(isel, states["S"])
+                self._axis.set_selected(isel, exp.goniometer.get_rotation_axis_datum())
                 self._fixed_rotation.set_selected(
-                    sel, exp.goniometer.get_fixed_rotation()
+                    isel, exp.goniometer.get_fixed_rotation()
                 )
 
         # Other derived values
@@ -416,10 +416,10 @@ def compose(self, reflections, skip_derivatives=False):
 
         self._prepare_for_compose(reflections, skip_derivatives)
 
+        experiment_to_idx = self._get_experiment_to_idx(reflections)
         for iexp, exp in enumerate(self._experiments):
             # select the reflections of interest
-            sel = reflections["id"] == iexp
-            isel = sel.iselection()
+            isel = experiment_to_idx[iexp]
 
             # skip empty experiments (https://github.com/dials/dials/issues/1417)
             if len(isel) == 0:
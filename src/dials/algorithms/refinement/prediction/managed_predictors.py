@@ -10,6 +10,9 @@
 
 from math import pi
 
+import numpy as np
+
+from dxtbx import flumpy
 from dxtbx.model import tof_helpers
 from scitbx.array_family import flex
 
@@ -79,21 +82,35 @@ def __init__(self, experiments):
     def __call__(self, reflections):
         """Predict for all reflections at the current model geometry"""
 
-        for iexp, e in enumerate(self._experiments):
+        for e, isel in zip(self._experiments, self._experiment_selections(reflections)):
+            if len(isel) == 0:
+                continue
             # select the reflections for this experiment only
-            sel = reflections["id"] == iexp
-            refs = reflections.select(sel)
+            refs = reflections.select(isel)
 
             self._predict_one_experiment(e, refs)
             refs = self._post_predict_one_experiment(e, refs)
 
             # write predictions back to overall reflections
-            reflections.set_selected(sel, refs)
+            reflections.set_selected(isel, refs)
 
         reflections = self._post_prediction(reflections)
 
         return reflections
 
+    def _experiment_selections(self, reflections):
+        """Return the indices of the reflections belonging to each experiment,
+        found by sorting the experiment ids once rather than by comparing all
+        the ids with each experiment id in turn."""
+
+        ids = flumpy.to_numpy(reflections["id"])
+        perm = np.argsort(ids, kind="stable")
+        bounds = np.searchsorted(ids[perm], np.arange(len(self._experiments) + 1))
+        perm = flumpy.from_numpy(perm.astype(np.uint64))
+        return [
+            perm[int(start) : int(end)] for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+
     def _predict_one_experiment(self, experiment, reflections):
         raise NotImplementedError()
 
@@ -142,17 +159,16 @@ def _match_full_turns(self, reflections):
         reflections["xyzcal.mm"] = flex.vec3_double(x_calc, y_calc, phi_calc)
 
         # Update xyzcal.px with the correct z_px values in keeping with above
-        for iexp, e in enumerate(self._experiments):
-            sel = reflections["id"] == iexp
-            x_px, y_px, z_px = reflections["xyzcal.px"].select(sel).parts()
+        for e, isel in zip(self._experiments, self._experiment_selections(reflections)):
+            x_px, y_px, z_px = reflections["xyzcal.px"].select(isel).parts()
             scan = e.scan
             if scan is not None:
-                z_px = scan.get_array_index_from_angle(phi_calc.select(sel), deg=False)
+                z_px = scan.get_array_index_from_angle(phi_calc.select(isel), deg=False)
             else:
                 # must be a still image, z centroid not meaningful
-                z_px = phi_calc.select(sel)
+                z_px = phi_calc.select(isel)
             xyzcal_px = flex.vec3_double(x_px, y_px, z_px)
-            reflections["xyzcal.px"].set_selected(sel, xyzcal_px)
+            reflections["xyzcal.px"].set_selected(isel, xyzcal_px)
 
         return reflections
 
@@ -160,6 +176,32 @@ def _match_full_turns(self, reflections):
 class StillsExperimentsPredictor(ExperimentsPredictor):
     spherical_relp_model = False
 
+    def __call__(self, reflections):
+        """Predict for all reflections at the current model geometry. Prediction
+        for a given reflection only depends on the beam, the detector and the UB
+        matrix, so the reflections of all experiments that share a beam and a
+        detector are predicted together, with a UB matrix per reflection."""
+
+        groups = {}
+        for e, isel in zip(self._experiments, self._experiment_selections(reflections)):
+            if len(isel) == 0:
+                continue
+            key = (id(e.beam), id(e.detector))
+            groups.setdefault(key, []).append((e, isel))
+
+        for group in groups.values():
+            isel = flex.size_t()
+            UB = flex.mat3_double()
+            for e, e_isel in group:
+                isel.extend(e_isel)
+                UB.extend(flex.mat3_double(len(e_isel), e.crystal.get_A()))
+            refs = reflections.select(isel)
+            predictor = st(group[0][0], spherical_relp=self.spherical_relp_model)
+            predictor.for_reflection_table(refs, UB)
+            reflections.set_selected(isel, refs)
+
+        return self._post_prediction(reflections)
+
     def _predict_one_experiment(self, experiment, reflections):
         predictor = st(experiment, spherical_relp=self.spherical_relp_model)
         UB = experiment.crystal.get_A()
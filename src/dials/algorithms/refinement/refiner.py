@@ -37,6 +37,7 @@
 from dials.algorithms.refinement.target import TargetFactory
 from dials.algorithms.refinement.target import phil_str as target_phil_str
 from dials.array_family import flex
+from dials.util import instrumentation
 from dials.util.system import MEMORY_LIMIT
 
 logger = logging.getLogger(__name__)
@@ -1035,6 +1036,7 @@ def print_panel_rmsd_table(self):
 
         return
 
+    @instrumentation.timed("refinement.run")
     def run(self):
         """Run refinement"""
 
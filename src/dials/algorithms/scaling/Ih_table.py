@@ -20,27 +20,22 @@
 
 from dials.algorithms.scaling.error_model.error_model import BasicErrorModel
 from dials.array_family import flex
+from dials.util.asu_index_cache import asu_index_cache
 
 
 def map_indices_to_asu(miller_indices, space_group, anomalous=False):
     """Map the indices to the asymmetric unit."""
-    crystal_symmetry = crystal.symmetry(space_group=space_group)
-    miller_set = miller.set(
-        crystal_symmetry=crystal_symmetry,
-        indices=miller_indices,
-        anomalous_flag=anomalous,
-    )
-    miller_set_in_asu = miller_set.map_to_asu()
-    return miller_set_in_asu.indices()
+    return asu_index_cache.asu_indices(
+        miller_indices, space_group, anomalous
+    ).deep_copy()
 
 
 def get_sorted_asu_indices(asu_indices, space_group, anomalous=False):
     """Return the sorted asu indices and the permutation selection."""
-    crystal_symmetry = crystal.symmetry(space_group=space_group)
-    miller_set_in_asu = miller.set(
-        crystal_symmetry=crystal_symmetry, indices=asu_indices, anomalous_flag=anomalous
+    permutation = asu_index_cache.sort_permutation(
+        asu_indices, space_group, anomalous, in_asu=True
     )
-    permuted = miller_set_in_asu.sort_permutation(by_value="packed_indices")
+    permuted = flumpy.from_numpy(permutation.astype(np.uint64))
     sorted_asu_miller_index = asu_indices.select(permuted)
     return sorted_asu_miller_index, permuted
 
@@ -453,6 +448,91 @@ def extract_free_set(self) -> None:
         self.Ih_table_blocks.append(free_block)
         self.blocked_selection_list.append(free_block.block_selections)
 
+    def remove_datasets(self, dataset_ids: List[int]) -> None:
+        """
+        Remove whole datasets from the Ih_table in place.
+
+        The data for the remaining datasets are selected from the existing
+        blocks, so that the sorting by asu index and the block structure do not
+        need to be redetermined. The remaining datasets are renumbered
+        consecutively, preserving their order.
+        """
+        assert set(dataset_ids).issubset(range(self.n_datasets))
+        to_keep = [i for i in range(self.n_datasets) if i not in set(dataset_ids)]
+        assert to_keep, "Cannot remove all datasets from an Ih_table"
+        self.Ih_table_blocks = [
+            block.select_datasets(to_keep) for block in self.Ih_table_blocks
+        ]
+        self.n_datasets = len(to_keep)
+        self._update_after_selection()
+
+    def remove_reflections(self, dataset_id: int, indices: np.array) -> None:
+        """
+        Remove individual reflections of a dataset from the Ih_table in place.
+
+        The reflections are identified by their indices in the reflection table
+        from which the Ih_table was created (i.e. as used in the block
+        selections). Groups which no longer contain any reflections are removed.
+        """
+        assert dataset_id in range(self.n_datasets)
+        for j, block in enumerate(self.Ih_table_blocks):
+            to_remove = (
+                block.Ih_table["dataset_id"].to_numpy() == dataset_id
+            ) & np.isin(block.Ih_table["loc_indices"].to_numpy(), indices)
+            if to_remove.any():
+                self.Ih_table_blocks[j] = block.select(~to_remove)
+                self.Ih_table_blocks[j].reset_dataset_info()
+        self._update_after_selection()
+
+    def split_free_set(self) -> "IhTable":
+        """
+        Split the free set off from this Ih_table.
+
+        The free set block is removed from this table, leaving just the work
+        set, and is returned as a separate single-block IhTable, avoiding the
+        need to recreate both tables from the reflection data.
+        """
+        assert self.free_Ih_table
+        free_block = self.Ih_table_blocks.pop()
+        free_Ih_table = IhTable.__new__(IhTable)
+        free_Ih_table.anomalous = self.anomalous
+        free_Ih_table.space_group = self.space_group
+        free_Ih_table._asu_index_dict = self._free_asu_index_dict
+        free_Ih_table._free_asu_index_dict = {}
+        free_Ih_table.n_work_blocks = 1
+        free_Ih_table.n_datasets = free_block.n_datasets
+        free_Ih_table.Ih_table_blocks = [free_block]
+        free_Ih_table.free_set_percentage = 0
+        free_Ih_table.free_Ih_table = None
+        free_Ih_table.properties_dict = {
+            "n_unique_in_each_block": [],
+            "n_reflections_in_each_block": {},
+            "miller_index_boundaries": [(10000, 10000, 10000)],
+        }
+        free_Ih_table._update_after_selection()
+
+        self._free_asu_index_dict = {}
+        self.free_set_percentage = 0
+        self.free_Ih_table = None
+        self.properties_dict["n_unique_in_each_block"].pop()
+        self.properties_dict["miller_index_boundaries"].pop()
+        self.generate_block_selections()
+        return free_Ih_table
+
+    def _update_after_selection(self) -> None:
+        """Update the metadata and Ih values after a selection on the blocks."""
+        n_blocks = len(self.Ih_table_blocks)
+        if self.free_Ih_table:
+            n_blocks -= 1
+        self.properties_dict["n_unique_in_each_block"] = [
+            block.n_groups for block in self.Ih_table_blocks
+        ]
+        self.properties_dict["n_reflections_in_each_block"] = {
+            i: block.size for i, block in enumerate(self.Ih_table_blocks[:n_blocks])
+        }
+        self.generate_block_selections()
+        self.calc_Ih()
+
     def as_miller_array(
         self, unit_cell: uctbx.unit_cell, return_free_set_data: bool = False
     ) -> miller.array:
@@ -634,6 +714,37 @@ def select(self, sel: np.array) -> "IhTableBlock":
             newtable.dataset_info[i]["end_index"] = offset
         return newtable
 
+    def select_datasets(self, dataset_ids: List[int]) -> "IhTableBlock":
+        """
+        Select the data for a subset of datasets, returning a new IhTableBlock.
+
+        The selected datasets are renumbered consecutively in the order given,
+        which must be ascending to preserve the order of the data in the block.
+        """
+        assert list(dataset_ids) == sorted(dataset_ids)
+        dataset_id = self.Ih_table["dataset_id"].to_numpy()
+        newtable = self.select(np.isin(dataset_id, dataset_ids))
+        new_ids = np.zeros(self.n_datasets, dtype=np.uint64)
+        new_ids[dataset_ids] = np.arange(len(dataset_ids), dtype=np.uint64)
+        newtable.Ih_table = newtable.Ih_table.assign(
+            dataset_id=new_ids[newtable.Ih_table["dataset_id"].to_numpy()]
+        )
+        newtable.n_datasets = len(dataset_ids)
+        newtable.block_selections = [newtable.block_selections[i] for i in dataset_ids]
+        newtable.reset_dataset_info()
+        return newtable
+
+    def reset_dataset_info(self) -> None:
+        """Set the dataset_info start and end indices from the block selections."""
+        self.dataset_info = {}
+        offset = 0
+        for i, block_sel_i in enumerate(self.block_selections):
+            self.dataset_info[i] = {
+                "start_index": offset,
+                "end_index": offset + len(block_sel_i),
+            }
+            offset += len(block_sel_i)
+
     def select_on_groups(self, sel: np.array) -> "IhTableBlock":
         """Select a subset of the unique groups, returning a new IhTableBlock."""
         reduced_h_idx = self._csc_h_index_matrix[:, sel]
@@ -680,6 +791,15 @@ def calc_nh(self) -> np.array:
         This is a vector of length n_refl."""
         return self.sum_in_groups(np.full(self.size, 1.0), output="per_refl")
 
+    def group_indices(self) -> np.array:
+        """Return the index of the symmetry group to which each reflection belongs.
+
+        This is the column of the h_index_matrix for each reflection."""
+        h_index = self._csc_h_index_matrix.tocoo()
+        group_indices = np.empty(self.size, dtype=np.int64)
+        group_indices[h_index.row] = h_index.col
+        return group_indices
+
     def match_Ih_values_to_target(self, target_Ih_table: IhTable) -> None:
         """
         Use an Ih_table as a target to set Ih values in this table.
@@ -28,6 +28,7 @@
 from dials.algorithms.scaling.scaling_utilities import (
     DialsMergingStatisticsError,
     log_memory_usage,
+    sph_harm_table_cache,
 )
 from dials.algorithms.statistics.cc_half_algorithm import (
     CCHalfFromDials as deltaccscript,
@@ -36,6 +37,7 @@
 from dials.command_line.compute_delta_cchalf import phil_scope as deltacc_phil_scope
 from dials.command_line.cosym import cosym
 from dials.command_line.cosym import phil_scope as cosym_phil_scope
+from dials.util import instrumentation
 from dials.util.exclude_images import (
     exclude_image_ranges_for_scaling,
     get_valid_image_ranges,
@@ -224,6 +226,9 @@ def __init__(self, params, experiments, reflections):
 
     def _create_model_and_scaler(self):
         """Create the scaling models and scaler."""
+        sph_harm_table_cache.configure(
+            directory=self.params.scaling_options.absorption_table_cache
+        )
         self.experiments = create_scaling_model(
             self.params, self.experiments, self.reflections
         )
@@ -234,6 +239,7 @@ def _create_model_and_scaler(self):
 
         self.scaler = create_scaler(self.params, self.experiments, self.reflections)
 
+    @instrumentation.timed("scaling.run")
     def run(self):
         """Run the scaling script."""
         with ScalingHTMLContextManager(self), ScalingSummaryContextManager(self):
@@ -30,6 +30,12 @@
   parameter_values=      (values to test, only optional if parameter= selects a
                           boolean command-line parameter)
 
+The individual runs (one for each option and fold) are independent, and can be
+run in parallel by setting nproc= . The runs are then performed in separate
+processes which inherit the input data from the parent process (on platforms
+supporting the fork start method), rather than each run taking a copy of the
+data, and each process can be limited to max_memory_per_job= GB of memory.
+
 For example
 cross_validation_mode=multi parameter=physical.absorption_correction
 cross_validation_mode=multi parameter=physical.decay_interval parameter_values="5.0 10.0 15.0"
@@ -38,8 +44,11 @@
 
 from __future__ import annotations
 
+import copy
 import itertools
 import logging
+import multiprocessing
+import sys
 import time
 
 from libtbx import phil
@@ -78,17 +87,87 @@
               "allowed is 1/free_set_percentage; if set greater than this then"
               "the repetition will finish after 1/free_set_percentage folds."
       .expert_level = 2
+    nproc = 1
+      .type = int(value_min=1)
+      .help = "Number of cross-validation runs (options and folds) to perform"
+              "in parallel, each in a separate process."
+      .expert_level = 2
+    max_memory_per_job = None
+      .type = float(value_min=0)
+      .help = "Limit the memory (in GB) available to each parallel"
+              "cross-validation run. A run exceeding the limit will fail with a"
+              "MemoryError."
+      .expert_level = 2
   }
 """
 )
 
 
+# The cross validator for parallel runs, inherited by forked worker processes
+_cross_validator = None
+
+
+def _initialise_worker(max_memory_per_job):
+    """Limit the memory of a worker process and quieten its log output."""
+    if max_memory_per_job and sys.platform != "win32":
+        import resource
+
+        limit = int(max_memory_per_job * 1024**3)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    logging.getLogger("dials").setLevel(logging.WARNING)
+
+
+def _run_job(job):
+    config_no, params = job
+    # Each worker process is used for a single run, so the inherited data can
+    # be used (and modified) directly without taking a copy.
+    return config_no, _cross_validator.run_job(params, copy_data=False)
+
+
+def _run_jobs(jobs, cross_validator, nproc=1, max_memory_per_job=None):
+    """Run the cross-validation jobs, adding the results to the results dict.
+
+    With nproc > 1, each job is run in a fresh process forked from this one, so
+    that the input data are shared copy-on-write rather than pickled or copied
+    for each job. Results are added to the results dict as they complete.
+    """
+    if nproc > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning(
+            "Parallel cross validation is not supported on this platform, running serially"
+        )
+        nproc = 1
+    nproc = min(nproc, len(jobs))
+    if nproc <= 1:
+        for config_no, params in jobs:
+            cross_validator.run_script(params, config_no=config_no)
+        return
+
+    global _cross_validator
+    _cross_validator = cross_validator
+    logger.info("Running %s cross-validation jobs using %s processes", len(jobs), nproc)
+    try:
+        with multiprocessing.get_context("fork").Pool(
+            nproc,
+            initializer=_initialise_worker,
+            initargs=(max_memory_per_job,),
+            maxtasksperchild=1,
+        ) as pool:
+            for config_no, results in pool.imap_unordered(_run_job, jobs):
+                cross_validator.add_results_to_results_dict(config_no, results)
+                logger.info(
+                    "Completed cross-validation run for configuration %s", config_no
+                )
+    finally:
+        _cross_validator = None
+
+
 def cross_validate(params, cross_validator):
     """Run cross validation script."""
 
     start_time = time.time()
     free_set_percentage = cross_validator.get_free_set_percentage(params)
     options_dict = {}
+    jobs = []
 
     if params.cross_validation.cross_validation_mode == "single":
         # just run the setup nfolds times
@@ -96,7 +175,7 @@ def cross_validate(params, cross_validator):
         for n in range(params.cross_validation.nfolds):
             if n < 100.0 / free_set_percentage:
                 params = cross_validator.set_free_set_offset(params, n)
-                cross_validator.run_script(params, config_no=0)
+                jobs.append((0, copy.deepcopy(params)))
 
     elif params.cross_validation.cross_validation_mode == "multi":
         # run each option nfolds times
@@ -157,11 +236,18 @@ def cross_validate(params, cross_validator):
             for n in range(params.cross_validation.nfolds):
                 if n < 100.0 / free_set_percentage:
                     params = cross_validator.set_free_set_offset(params, n)
-                    cross_validator.run_script(params, config_no=i)
+                    jobs.append((i, copy.deepcopy(params)))
 
     else:
         raise ValueError("Error in interpreting mode and options.")
 
+    _run_jobs(
+        jobs,
+        cross_validator,
+        nproc=params.cross_validation.nproc,
+        max_memory_per_job=params.cross_validation.max_memory_per_job,
+    )
+
     st = cross_validator.interpret_results()
     logger.info("Summary of the cross validation analysis: \n %s", st.format())
 
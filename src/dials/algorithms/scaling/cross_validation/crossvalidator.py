@@ -37,6 +37,13 @@ def run_script(self, params, config_no):
         """Run the appropriate command line script with the params, get the
         free/work set results and add to the results dict. Indicate the
         configuration number being run."""
+        results = self.run_job(params)
+        self.add_results_to_results_dict(config_no, results)
+
+    def run_job(self, params, copy_data=True):
+        """Run the appropriate command line script with the params and return
+        the free/work set results. If copy_data is False, the script may modify
+        the input experiments and reflections."""
         raise NotImplementedError()
 
     def get_results_from_script(self, script):
@@ -211,17 +218,20 @@ def get_free_set_percentage(self, params):
         """Inspect the free set percentage in the correct place in the scope"""
         return params.scaling_options.free_set_percentage
 
-    def run_script(self, params, config_no):
-        """Run the scaling script with the params, get the free/work set results
-        and add to the results dict"""
+    def run_job(self, params, copy_data=True):
+        """Run the scaling script with the params and return the free/work set
+        results"""
         from dials.algorithms.scaling.algorithm import ScalingAlgorithm
 
         params.scaling_options.__setattr__("use_free_set", True)
+        if copy_data:
+            experiments = deepcopy(self.experiments)
+            reflections = deepcopy(self.reflections)
+        else:
+            experiments = self.experiments
+            reflections = self.reflections
         algorithm = ScalingAlgorithm(
-            params,
-            experiments=deepcopy(self.experiments),
-            reflections=deepcopy(self.reflections),
+            params, experiments=experiments, reflections=reflections
         )
         algorithm.run()
-        results = self.get_results_from_script(algorithm)
-        self.add_results_to_results_dict(config_no, results)
+        return self.get_results_from_script(algorithm)
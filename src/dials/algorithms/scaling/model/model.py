@@ -41,13 +41,12 @@
     plot_relative_Bs,
     plot_smooth_scales,
 )
-from dials.algorithms.scaling.scaling_utilities import sph_harm_table
-from dials.array_family import flex
-from dials_scaling_ext import (
-    calc_lookup_index,
-    calc_theta_phi,
-    create_sph_harm_lookup_table,
+from dials.algorithms.scaling.scaling_utilities import (
+    sph_harm_lookup_table,
+    sph_harm_table,
 )
+from dials.array_family import flex
+from dials_scaling_ext import calc_lookup_index, calc_theta_phi
 
 logger = logging.getLogger("dials")
 
@@ -431,12 +430,12 @@ def _add_absorption_component_to_physically_derived_model(model, reflection_tabl
         s0_lookup_index = calc_lookup_index(theta_phi_0, points_per_degree=2)
         s1_lookup_index = calc_lookup_index(theta_phi_1, points_per_degree=2)
         if SHScaleComponent.coefficients_list is None:
-            SHScaleComponent.coefficients_list = create_sph_harm_lookup_table(
+            SHScaleComponent.coefficients_list = sph_harm_lookup_table(
                 lmax, points_per_degree=2
             )  # set the class variable and share
         elif len(SHScaleComponent.coefficients_list) < (lmax * (2.0 + lmax)):
             # this (rare) case can happen if adding a new dataset with a larger lmax!
-            SHScaleComponent.coefficients_list = create_sph_harm_lookup_table(
+            SHScaleComponent.coefficients_list = sph_harm_lookup_table(
                 lmax, points_per_degree=2
             )  # set the class variable and share
         model.components["absorption"].data = {
@@ -20,7 +20,7 @@
 
 from dials.algorithms.scaling.Ih_table import IhTable
 from dials.util.normalisation import quasi_normalisation
-from dials_scaling_ext import determine_outlier_indices, limit_outlier_weights
+from dials_scaling_ext import limit_outlier_weights
 
 logger = logging.getLogger("dials")
 
@@ -356,30 +356,73 @@ def __init__(self, Ih_table, zmax):
         )
 
     def _do_outlier_rejection(self):
-        """Add indices (w.r.t. the Ih_table data) to self._outlier_indices."""
-        self._round_of_outlier_rejection()
-        n_outliers = self._outlier_indices.size
-        n_new_outliers = n_outliers
-        while n_new_outliers:
-            self._round_of_outlier_rejection()
-            n_new_outliers = self._outlier_indices.size - n_outliers
-            n_outliers = self._outlier_indices.size
-
-    def _round_of_outlier_rejection(self):
-        """
-        Calculate normal deviations from the data in the Ih_table.
+        """Add indices (w.r.t. the Ih_table data) to self._outlier_indices.
+
+        Each round rejects at most one reflection from each symmetry group, and
+        only the groups in which a reflection was rejected are reconsidered in
+        the next round. The rounds work directly on arrays of the reflections
+        still under consideration, labelled by their group index, so that no
+        new Ih_table blocks are created between rounds.
         """
         Ih_table = self._Ih_table_block
         intensity = Ih_table.intensities
         g = Ih_table.inverse_scale_factors
         w = self.weights
-        wgIsum = Ih_table.sum_in_groups(w * g * intensity, output="per_refl")
-        wg2sum = Ih_table.sum_in_groups(w * g * g, output="per_refl")
-        wgIsum_others = wgIsum - (w * g * intensity)
-        wg2sum_others = wg2sum - (w * g * g)
+        rows = np.arange(Ih_table.size)
+        groups = Ih_table.group_indices()
+
+        # Record the round in which each reflection is rejected, or -1.
+        rejection_round = np.full(Ih_table.size, -1)
+        n_round = 0
+        while rows.size:
+            # Relabel the remaining groups as 0..n_groups-1
+            _, groups = np.unique(groups, return_inverse=True)
+            outliers, others = self._round_of_outlier_rejection(
+                intensity[rows], g[rows], w[rows], groups
+            )
+            rejection_round[rows[outliers]] = n_round
+            rows = rows[others]
+            groups = groups[others]
+            n_round += 1
+
+        # Report the outliers in order of rejection
+        outliers = np.flatnonzero(rejection_round >= 0)
+        outliers = outliers[np.argsort(rejection_round[outliers], kind="stable")]
+        self._outlier_indices = np.concatenate(
+            [
+                self._outlier_indices,
+                Ih_table.Ih_table["loc_indices"].to_numpy()[outliers],
+            ]
+        )
+        self._datasets = np.concatenate(
+            [
+                self._datasets,
+                Ih_table.Ih_table["dataset_id"].to_numpy()[outliers],
+            ]
+        )
+
+    def _round_of_outlier_rejection(self, intensity, g, w, groups):
+        """
+        Calculate normal deviations and determine the outliers for a round.
+
+        Args:
+            intensity, g, w: Arrays of the intensities, inverse scale factors and
+                weights of the reflections under consideration.
+            groups: An array of the group index of each reflection, with the
+                groups labelled 0..n_groups-1.
+
+        Returns:
+            A boolean array of the reflections rejected in this round, and a
+            boolean array of the other reflections in the groups that contained
+            an outlier, which must be reconsidered in the next round.
+        """
+        wgI = w * g * intensity
+        wg2 = w * g * g
+        wgIsum_others = np.bincount(groups, weights=wgI)[groups] - wgI
+        wg2sum_others = np.bincount(groups, weights=wg2)[groups] - wg2
         # Now do the rejection analysis if n_in_group > 2
-        nh = Ih_table.calc_nh()
-        sel = nh > 2
+        nh = np.bincount(groups)
+        sel = nh[groups] > 2
         wg2sum_others_sel = wg2sum_others[sel]
         wgIsum_others_sel = wgIsum_others[sel]
 
@@ -398,33 +441,18 @@ def _round_of_outlier_rejection(self):
             np.sqrt((1.0 / w_sel) + (np.square(g_sel) / wg2sum_others_sel))
         )
         norm_dev[zero_sel] = 1000  # to trigger rejection
-        z_score = np.abs(norm_dev)
-        # Want an array same size as Ih table.
-        all_z_scores = np.zeros(Ih_table.size)
-        # all_z_scores.set_selected(sel.iselection(), z_score)
-        all_z_scores[sel] = z_score
-        outlier_indices, other_potential_outliers = determine_outlier_indices(
-            Ih_table.h_index_matrix, flumpy.from_numpy(all_z_scores), self._zmax
-        )
-        sel = np.full(Ih_table.size, False, dtype=bool)
-        outlier_indices = flumpy.to_numpy(outlier_indices)
-        sel[outlier_indices] = True
-        lsel = self._Ih_table_block.Ih_table["loc_indices"].iloc[sel].to_numpy()
-        dsel = self._Ih_table_block.Ih_table["dataset_id"].iloc[sel].to_numpy()
-        self._outlier_indices = np.concatenate(
-            [
-                self._outlier_indices,
-                lsel,
-            ]
-        )
-        self._datasets = np.concatenate(
-            [
-                self._datasets,
-                dsel,
-            ]
-        )
-
-        sel = np.full(Ih_table.size, False, dtype=bool)
-        sel[flumpy.to_numpy(other_potential_outliers)] = True
-        self._Ih_table_block = self._Ih_table_block.select(sel)
-        self.weights = self.weights[sel]
+        z_scores = np.zeros(groups.size)
+        z_scores[sel] = np.abs(norm_dev)
+
+        # Find the reflection with the largest z-score in each group, taking the
+        # first such reflection in the case of ties.
+        order = np.lexsort((np.arange(groups.size), -z_scores, groups))
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = groups[order[1:]] != groups[order[:-1]]
+        max_in_group = order[first]
+        has_outlier = (nh > 2) & (z_scores[max_in_group] > self._zmax)
+
+        outliers = np.full(groups.size, False)
+        outliers[max_in_group[has_outlier]] = True
+        others = has_outlier[groups] & ~outliers
+        return outliers, others
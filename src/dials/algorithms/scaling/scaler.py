@@ -776,20 +776,7 @@ def _create_global_Ih_table(
             )
             self.free_set_selection = flex.bool(self.n_suitable_refl, False)
             self.free_set_selection.set_selected(flumpy.from_numpy(loc_indices), True)
-            global_Ih_table = IhTable(
-                [sel_reflections.select(~self.free_set_selection)],
-                self.experiment.crystal.get_space_group(),
-                [(~self.free_set_selection).iselection()],
-                nblocks=1,
-                anomalous=anomalous,
-            )
-            free_Ih_table = IhTable(
-                [sel_reflections.select(self.free_set_selection)],
-                self.experiment.crystal.get_space_group(),
-                [self.free_set_selection.iselection()],
-                nblocks=1,
-                anomalous=anomalous,
-            )
+            free_Ih_table = global_Ih_table.split_free_set()
         return global_Ih_table, free_Ih_table
 
     def _configure_model_and_datastructures(self, for_multi=False):
@@ -1041,10 +1028,6 @@ def _create_global_Ih_table(self, anomalous=False, remove_outliers=False):
         )
         if free_set_percentage:
             # need to set free_set_selection in individual scalers
-            tables = []
-            free_tables = []
-            indices_list = []
-            free_indices_list = []
             for i, scaler in enumerate(self.active_scalers):
                 sel = (
                     global_Ih_table.Ih_table_blocks[-1]
@@ -1058,24 +1041,7 @@ def _create_global_Ih_table(self, anomalous=False, remove_outliers=False):
                 scaler.free_set_selection.set_selected(
                     flumpy.from_numpy(loc_indices), True
                 )
-                tables.append(scaler.get_work_set_reflections())
-                free_tables.append(scaler.get_free_set_reflections())
-                free_indices_list.append(scaler.free_set_selection.iselection())
-                indices_list.append((~scaler.free_set_selection).iselection())
-            global_Ih_table = IhTable(
-                tables,
-                space_group,
-                indices_list,
-                nblocks=1,
-                anomalous=anomalous,
-            )
-            free_Ih_table = IhTable(
-                free_tables,
-                space_group,
-                free_indices_list,
-                nblocks=1,
-                anomalous=anomalous,
-            )
+            free_Ih_table = global_Ih_table.split_free_set()
         return global_Ih_table, free_Ih_table
 
     def _create_Ih_table(self):
@@ -1114,10 +1080,15 @@ def make_ready_for_scaling(self, outlier=True):
                 datasets_to_remove.append(i)
         if datasets_to_remove:
             self.remove_datasets(self.active_scalers, datasets_to_remove)
-            (
-                self._global_Ih_table,
-                self._free_Ih_table,
-            ) = self._create_global_Ih_table(self.params.anomalous)
+            if self._global_Ih_table:
+                self._global_Ih_table.remove_datasets(datasets_to_remove)
+                if self._free_Ih_table:
+                    self._free_Ih_table.remove_datasets(datasets_to_remove)
+            else:
+                (
+                    self._global_Ih_table,
+                    self._free_Ih_table,
+                ) = self._create_global_Ih_table(self.params.anomalous)
         self._create_Ih_table()
         self._update_model_data()
 
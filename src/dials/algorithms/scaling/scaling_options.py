@@ -180,6 +180,12 @@
               This also sets the number of processes to use if the option is
               available."
       .expert_level = 2
+    absorption_table_cache = None
+      .type = path
+      .help = "Directory in which to save the spherical harmonic lookup tables
+              used by the absorption correction for large datasets, so that
+              later scaling runs can load them rather than recalculate them."
+      .expert_level = 2
     use_free_set = False
       .type = bool
       .help = "Option to use a free set during scaling to check for overbiasing.
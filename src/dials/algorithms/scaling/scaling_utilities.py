@@ -5,6 +5,7 @@
 from __future__ import annotations
 
 import logging
+import os
 from math import acos
 
 import numpy as np
@@ -14,9 +15,11 @@
 from cctbx import miller
 
 from dials.array_family import flex
+from dials.util import instrumentation
 from dials.util.normalisation import quasi_normalisation as _quasi_normalisation
 from dials_scaling_ext import (
     calc_theta_phi,
+    create_sph_harm_lookup_table,
     create_sph_harm_table,
     rotate_vectors_about_axis,
 )
@@ -36,11 +39,12 @@ def log_memory_usage():
             "Memory usage: %.1f MB",
             int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) / units_per_mb,
         )
+        instrumentation.sample_memory()
 
 except ImportError:
 
     def log_memory_usage():
-        pass
+        instrumentation.sample_memory()
 
 
 class DialsMergingStatisticsError(Exception):
@@ -128,6 +132,69 @@ def sph_harm_table(reflection_table, lmax):
     return sph_h_t
 
 
+def sph_harm_lookup_table(lmax, points_per_degree=2):
+    """Return the spherical harmonic lookup table for a spherical harmonic
+    absorption correction, as a list of flex.double arrays (one per parameter)."""
+    return sph_harm_table_cache.lookup_table(lmax, points_per_degree)
+
+
+class SphHarmTableCache:
+    """
+    An on-disk cache of spherical harmonic lookup tables.
+
+    For large datasets, the absorption correction looks up the spherical
+    harmonic coefficients of each reflection in a table tabulated on a
+    (theta, phi) grid. The table only depends on lmax and the grid spacing, but
+    is slow to calculate at high lmax, so if a directory is set the tables are
+    saved there (at double precision) and loaded by later scaling runs.
+
+    Attributes:
+        directory (str): The directory in which to save tables, or None.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+
+    def configure(self, directory=None):
+        """Set the directory in which to save tables."""
+        self.directory = directory
+
+    def lookup_table(self, lmax, points_per_degree=2):
+        """Return the lookup table (a list of flex.double) for lmax."""
+        filename = None
+        if self.directory:
+            filename = os.path.join(
+                self.directory,
+                f"sph_harm_lookup_lmax{lmax}_points{points_per_degree}.npy",
+            )
+        if filename and os.path.isfile(filename):
+            logger.debug("Loading spherical harmonic table from %s", filename)
+            return [flumpy.from_numpy(row) for row in np.load(filename)]
+        table = create_sph_harm_lookup_table(lmax, points_per_degree)
+        if filename:
+            self._save(filename, np.array([flumpy.to_numpy(c) for c in table]))
+        return table
+
+    @staticmethod
+    def _save(filename, table):
+        # write to a temporary file first, so that concurrent runs never see a
+        # partially written table
+        tmp = f"{filename}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(tmp, "wb") as fh:
+                np.save(fh, table)
+            os.replace(tmp, filename)
+        except OSError as e:
+            logger.warning("Unable to save spherical harmonic table: %s", e)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+# The cache shared by the scaling models in this process.
+sph_harm_table_cache = SphHarmTableCache()
+
+
 def quasi_normalisation(reflection_table, experiment):
     """Calculate normalised intensity (Esq) values for reflections, for the purpose
     of selecting subsets based on Esq for scaling. If more involved analyses of
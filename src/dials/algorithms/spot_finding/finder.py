@@ -17,7 +17,7 @@
 
 from dials.array_family import flex
 from dials.model.data import PixelList, PixelListLabeller
-from dials.util import Sorry, log
+from dials.util import Sorry, instrumentation, log
 from dials.util.log import rehandle_cached_records
 from dials.util.mp import batch_multi_node_parallel_map
 from dials.util.system import CPU_COUNT
@@ -58,6 +58,7 @@ def __init__(
             detector = self.imageset.get_detector()
             assert len(self.mask) == len(detector)
 
+    @instrumentation.timed("spot_finding.image")
     def __call__(self, index):
         """
         Extract strong pixels from an image
@@ -403,6 +404,7 @@ def __init__(
         self.min_chunksize = min_chunksize
         self.write_hot_pixel_mask = write_hot_pixel_mask
 
+    @instrumentation.timed("spot_finding.extract_spots")
     def __call__(self, imageset):
         """
         Find the spots in the imageset
@@ -3,7 +3,10 @@
 import collections
 import math
 
+import numpy as np
+
 from cctbx import sgtbx, uctbx
+from dxtbx import flumpy
 from libtbx.math_utils import nearest_integer as nint
 from scitbx import matrix
 
@@ -623,6 +626,23 @@ def stats_for_reflection_table(
     )
 
 
+def split_by_image(reflections, start, end):
+    """Return the reflections observed on each image in the range [start, end).
+
+    The reflections are sorted by image number once, rather than selected by
+    comparing the image number of every reflection with each image in turn.
+    """
+    # sort on the image number, so the order on each image is unchanged
+    image_number = np.floor(flumpy.to_numpy(reflections["xyzobs.px.value"])[:, 2])
+    perm = np.argsort(image_number, kind="stable")
+    bounds = np.searchsorted(image_number[perm], np.arange(start, end + 1))
+    perm = flumpy.from_numpy(perm.astype(np.uint64))
+    return [
+        reflections.select(perm[int(i0) : int(i1)])
+        for i0, i1 in zip(bounds[:-1], bounds[1:])
+    ]
+
+
 def stats_per_image(experiment, reflections, resolution_analysis=True):
     n_spots_total = []
     n_spots_no_ice = []
@@ -634,16 +654,13 @@ def stats_per_image(experiment, reflections, resolution_analysis=True):
     noisiness_method_1 = []
     noisiness_method_2 = []
 
-    image_number = reflections["xyzobs.px.value"].parts()[2]
-    image_number = flex.floor(image_number)
-
     try:
         start, end = experiment.scan.get_array_range()
     except AttributeError:
         start, end = 0, 1
-    for i in range(start, end):
+    for image_reflections in split_by_image(reflections, start, end):
         stats = stats_for_reflection_table(
-            reflections.select(image_number == i),
+            image_reflections,
             resolution_analysis=resolution_analysis,
         )
         n_spots_total.append(stats.n_spots_total)
@@ -15,8 +15,10 @@
 import cctbx.sgtbx.cosets
 from cctbx import miller, sgtbx
 from cctbx.array_family import flex
+from dxtbx import flumpy
 
 from dials.algorithms.scaling.scaling_library import ExtendedDatasetStatistics
+from dials.util.asu_index_cache import asu_index_cache
 
 logger = logging.getLogger(__name__)
 
@@ -291,11 +293,12 @@ def _compute_rij_wij_ccweights(self):
         # this once per cb_op instead of on-the-fly every time we need it.
         indices = {}
         epsilons = {}
-        space_group_type = self._data.space_group().type()
+        space_group = self._data.space_group()
         for cb_op in self.sym_ops:
             cb_op = sgtbx.change_of_basis_op(cb_op)
-            indices_reindexed = cb_op.apply(self._data.indices())
-            miller.map_to_asu(space_group_type, False, indices_reindexed)
+            indices_reindexed = asu_index_cache.asu_indices(
+                self._data.indices(), space_group, cb_op=cb_op
+            )
             cb_op_str = cb_op.as_xyz()
             indices[cb_op_str] = indices_reindexed
             epsilons[cb_op_str] = self._patterson_group.epsilon(indices_reindexed)
@@ -366,18 +369,14 @@ def _compute_rij_wij(self, use_cache=True):
         # this once per cb_op instead of on-the-fly every time we need it.
         indices = {}
         epsilons = {}
-        space_group_type = self._data.space_group().type()
+        space_group = self._data.space_group()
         for cb_op in self.sym_ops:
             cb_op = sgtbx.change_of_basis_op(cb_op)
-            indices_reindexed = cb_op.apply(self._data.indices())
-            miller.map_to_asu(space_group_type, False, indices_reindexed)
+            indices_reindexed = asu_index_cache.asu_indices(
+                self._data.indices(), space_group, cb_op=cb_op
+            )
             cb_op_str = cb_op.as_xyz()
-            indices[cb_op_str] = np.array(
-                [
-                    h.iround().as_numpy_array()
-                    for h in indices_reindexed.as_vec3_double().parts()
-                ]
-            ).transpose()
+            indices[cb_op_str] = flumpy.to_numpy(indices_reindexed).astype(np.int64)
             epsilons[cb_op_str] = self._patterson_group.epsilon(
                 indices_reindexed
             ).as_numpy_array()
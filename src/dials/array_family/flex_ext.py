@@ -23,6 +23,7 @@
 import cctbx.array_family.flex
 import cctbx.miller
 import libtbx.smart_open
+from dxtbx import flumpy
 from dxtbx.model import ExperimentType
 from scitbx import matrix
 
@@ -957,20 +958,29 @@ def compute_corrections(self, experiments):
             self["qe"] = qe
         return lp
 
-    def extract_shoeboxes(self, imageset, mask=None):
+    def extract_shoeboxes(self, imageset, mask=None, background_read=False, prefetch=2):
         """
         Helper function to read a load of shoebox data.
 
+        With background_read, the images are read and decoded in a background
+        thread, up to prefetch images ahead of the extraction, which is done in
+        frame order in the calling thread. The images are always read one at a
+        time, as reading them is not thread-safe.
+
         :param imageset: The imageset
         :param mask: The mask to apply
-        :param nthreads: The number of threads to use
+        :param background_read: Read the images in a background thread
+        :param prefetch: The maximum number of images to read ahead of the
+                         extraction when reading in the background
         :return: A tuple containing read time and extract time
         """
+        from concurrent.futures import ThreadPoolExecutor
         from time import time
 
         from dials.model.data import make_image
 
         assert "shoebox" in self
+        assert prefetch > 0
         detector = imageset.get_detector()
         try:
             frame0, frame1 = imageset.get_array_range()
@@ -979,10 +989,8 @@ def extract_shoeboxes(self, imageset, mask=None):
         extractor = dials_array_family_flex_ext.ShoeboxExtractor(
             self, len(detector), frame0, frame1
         )
-        logger.info(" Beginning to read images")
-        read_time = 0
-        extract_time = 0
-        for i in range(len(imageset)):
+
+        def read_image(i):
             logger.debug("  reading image %d", i)
             st = time()
             image = imageset.get_corrected_data(i)
@@ -990,7 +998,31 @@ def extract_shoeboxes(self, imageset, mask=None):
             if mask is not None:
                 assert len(mask) == len(mask2)
                 mask2 = tuple(m1 & m2 for m1, m2 in zip(mask, mask2))
-            read_time += time() - st
+            return image, mask2, time() - st
+
+        def read_images():
+            if not background_read:
+                for i in range(len(imageset)):
+                    yield read_image(i)
+                return
+            # Keep a bounded queue of images being read, in frame order
+            indices = iter(range(len(imageset)))
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pending = collections.deque(
+                    pool.submit(read_image, i)
+                    for i in itertools.islice(indices, prefetch)
+                )
+                while pending:
+                    result = pending.popleft().result()
+                    for i in itertools.islice(indices, 1):
+                        pending.append(pool.submit(read_image, i))
+                    yield result
+
+        logger.info(" Beginning to read images")
+        read_time = 0
+        extract_time = 0
+        for image, mask2, image_read_time in read_images():
+            read_time += image_read_time
             st = time()
             extractor.next(make_image(image, mask2))
             extract_time += time() - st
@@ -1083,15 +1115,17 @@ def find_overlaps(self, experiments=None, border=0):
             )
 
             # Get the experiment ids we're to treat together
-            lookup = {}
+            lookup = np.zeros(len(experiments), dtype=np.uint64)
             for j, (key, indices) in enumerate(groups):
-                for i in indices:
-                    lookup[i] = j
-            group_id = cctbx.array_family.flex.size_t([lookup[i] for i in self["id"]])
+                lookup[list(indices)] = j
+            ids = flumpy.to_numpy(self["id"])
+            if ids.size and (ids.min() < 0 or ids.max() >= len(experiments)):
+                raise KeyError("Reflection experiment ids do not match experiments")
+            group_id = flumpy.from_numpy(lookup[ids])
         elif "imageset_id" in self:
             imageset_id = self["imageset_id"]
             assert imageset_id.all_ge(0)
-            group_id = cctbx.array_family.flex.size_t(list(imageset_id))
+            group_id = flumpy.from_numpy(flumpy.to_numpy(imageset_id).astype(np.uint64))
         else:
             raise RuntimeError("Either need to supply experiments or have imageset_id")
 
@@ -16,10 +16,12 @@
 from dials.util.combine_experiments import (
     CombineWithReference,  # noqa
     combine_experiments,
+    combine_experiments_in_batches,
     combine_experiments_no_reflections,
     do_unit_cell_clustering,
 )
 from dials.util.options import ArgumentParser
+from dials.util.phil import LazyFilenameDataWrapper
 from dials.util.version import dials_version
 
 T = TypeVar("T")
@@ -331,6 +333,47 @@ def _save_experiments_and_reflections(
                 batch_refls.as_file(ref_filename)
 
 
+class _ReflectionTables(Sequence):
+    """The input reflection tables, read from file each time they are accessed."""
+
+    def __init__(self, wrappers):
+        self._wrappers = wrappers
+
+    def __len__(self):
+        return len(self._wrappers)
+
+    def __getitem__(self, i):
+        wrapper = self._wrappers[i]
+        if isinstance(wrapper, LazyFilenameDataWrapper):
+            return wrapper.read()
+        return wrapper.data
+
+
+def save_combined_experiments_in_batches(
+    params,
+    experiment_lists: List[ExperimentList],
+    reflection_tables: Sequence[flex.reflection_table],
+    max_batch_size: int,
+    experiments_filename="combined.expt",
+    reflections_filename="combined.refl",
+):
+    """
+    Combine the experiments and reflections and save them in batches of at
+    most max_batch_size experiments, writing each batch as soon as it is full.
+    """
+    for i, (batch_expts, batch_refls) in enumerate(
+        combine_experiments_in_batches(
+            params, experiment_lists, reflection_tables, max_batch_size
+        )
+    ):
+        exp_filename = os.path.splitext(experiments_filename)[0] + "_%03d.expt" % i
+        ref_filename = os.path.splitext(reflections_filename)[0] + "_%03d.refl" % i
+        logger.info(f"Saving combined experiments to {exp_filename}")
+        batch_expts.as_file(exp_filename)
+        logger.info(f"Saving combined reflections to {ref_filename}")
+        batch_refls.as_file(ref_filename)
+
+
 @dials.util.show_mail_handle_errors()
 def run(args=None) -> None:
     usage = (
@@ -347,6 +390,8 @@ def run(args=None) -> None:
         read_experiments=True,
         check_format=False,
         epilog=help_message,
+        lazy_load=True,
+        load_nproc=min(8, os.cpu_count() or 1),
     )
     params, options = parser.parse_args(args, show_diff_phil=True)
 
@@ -380,6 +425,25 @@ def run(args=None) -> None:
     experiment_lists: List[ExperimentList] = [
         ExperimentList(o.data) for o in params.input.experiments
     ]
+
+    # Stream the reflection tables through the combination if the output is
+    # only split into batches, so that not all of the tables are in memory
+    if (
+        params.input.reflections
+        and params.output.max_batch_size is not None
+        and params.output.n_subset is None
+        and not params.clustering.use
+    ):
+        save_combined_experiments_in_batches(
+            params,
+            experiment_lists,
+            _ReflectionTables(params.input.reflections),
+            params.output.max_batch_size,
+            experiments_filename=params.output.experiments_filename,
+            reflections_filename=params.output.reflections_filename,
+        )
+        return
+
     reflection_tables: List[flex.reflection_table] = [
         o.data for o in params.input.reflections
     ]
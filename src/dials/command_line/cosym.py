@@ -24,6 +24,7 @@
     median_unit_cell,
 )
 from dials.util import Sorry, log, show_mail_handle_errors
+from dials.util.asu_index_cache import asu_index_cache
 from dials.util.exclude_images import get_selection_for_valid_image_ranges
 from dials.util.filter_reflections import filtered_arrays_from_experiments_reflections
 from dials.util.multi_dataset_handling import (
@@ -209,6 +210,7 @@ def reflections(self):
     @Subject.notify_event(event="run_cosym")
     def run(self):
         self.cosym_analysis.run()
+        asu_index_cache.clear()
         reindexing_ops = self.cosym_analysis.reindexing_ops
         datasets_ = list(set(self.cosym_analysis.dataset_ids))
 
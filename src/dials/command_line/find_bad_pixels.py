@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-import math
+import multiprocessing
 import pickle
 import sys
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import time
+
+import numpy as np
 
 import iotbx.phil
+from dxtbx import flumpy
 from scitbx.array_family import flex
 
 import dials.util
@@ -43,6 +46,18 @@
   .type = int(value_min=1)
     .help = "The number of processes to use."
 
+convergence {
+    check_interval = 0
+        .type = int(value_min=0)
+        .help = "Check whether the bad pixel mask has converged every"
+                "check_interval images, and stop processing images once it"
+                "has. The default of 0 processes every image."
+    stable_checks = 3
+        .type = int(value_min=1)
+        .help = "The number of consecutive checks for which the bad pixel"
+                "mask must be unchanged to be considered converged."
+}
+
 output {
     mask = pixels.mask
         .type = path
@@ -55,64 +70,195 @@
 )
 
 
-def find_constant_signal_pixels(imageset, images):
-    """Find pixels which are constantly reporting as signal through the
-    images in imageset: on every image the pixel dispersion index is computed,
-    and signal pixels identified using the default settings. A map is then
-    calculated of the number of times a pixel is identified as signal: if this
-    is >= 50% of the images (say) that pixel is untrustworthy."""
+def _n_pixels(detector):
+    """The number of pixels in the (composite) image of the detector."""
+    nx, ny = detector[0].get_image_size()
+    if len(detector) == 1:
+        return nx * ny
+    # the I23 Pilatus 12M modules are stacked with 17 pixel gaps between them
+    return (24 * ny + 23 * 17) * nx
 
-    panels = imageset.get_detector()
 
-    # only cope with monilithic detectors or the I23 Pilatus 12M
-    assert len(panels) in (1, 24)
+class SignalPixelCounter:
+    """Identify the signal pixels on individual images of an imageset.
 
-    # trusted range the same for all panels anyway
-    detector = panels[0]
-    trusted = detector.get_trusted_range()
+    The threshold algorithm, the blank blocks for the panel masks and (for the
+    I23 Pilatus 12M) the composite image buffer are set up once on construction
+    and reused for every image, rather than being reconfigured per image."""
 
-    # construct an integer array same shape as image; accumulate number of
-    # "signal" pixels in each pixel across data
+    def __init__(self, imageset):
+        self.imageset = imageset
+        self.panels = imageset.get_detector()
 
-    total = None
+        # only cope with monilithic detectors or the I23 Pilatus 12M
+        assert len(self.panels) in (1, 24)
 
-    for idx in images:
-        pixels = imageset.get_raw_data(idx - 1)
-        known_mask = imageset.get_mask(idx - 1)
+        # trusted range the same for all panels anyway
+        trusted = self.panels[0].get_trusted_range()
+        self.trusted = int(round(trusted[0])), int(round(trusted[1]))
+
+        self.blanks = [
+            [
+                (flex.int(flex.grid(s1 - s0, f1 - f0), 0), s0, f0)
+                for f0, s0, f1, s1 in panel.get_mask()
+            ]
+            for panel in self.panels
+        ]
+
+        if len(self.panels) == 1:
+            self.buffer = None
+        else:
+            nx, ny = self.panels[0].get_image_size()
+            self.buffer = flex.int(flex.grid(24 * ny + 23 * 17, nx), -1)
+
+        spot_params = spot_phil.fetch(
+            source=iotbx.phil.parse("min_spot_size=1")
+        ).extract()
+        self.threshold_function = SpotFinderFactory.configure_threshold(spot_params)
+
+    @property
+    def n_pixels(self):
+        """The number of pixels in the (composite) image."""
+        return _n_pixels(self.panels)
+
+    def __call__(self, idx):
+        """Return a 1D flex.bool marking the signal pixels on image idx, where
+        idx counts from 1 as for get_raw_data(idx - 1)."""
+        pixels = self.imageset.get_raw_data(idx - 1)
+        known_mask = self.imageset.get_mask(idx - 1)
 
         # apply known mask
-        for _pixel, _panel, _mask in zip(pixels, panels, known_mask):
+        for _pixel, _blanks, _mask in zip(pixels, self.blanks, known_mask):
             _pixel.set_selected(~_mask, -1)
-            for f0, s0, f1, s1 in _panel.get_mask():
-                blank = flex.int(flex.grid(s1 - s0, f1 - f0), 0)
+            for blank, s0, f0 in _blanks:
                 _pixel.matrix_paste_block_in_place(blank, s0, f0)
 
-        if len(pixels) == 1:
+        if self.buffer is None:
             data = pixels[0]
         else:
-            ny, nx = pixels[0].focus()
-            data = flex.int(flex.grid(24 * ny + 23 * 17, nx), -1)
+            ny = pixels[0].focus()[0]
+            data = self.buffer
             for j in range(24):
                 data.matrix_paste_block_in_place(pixels[j], j * (ny + 17), 0)
 
-        negative = data < int(round(trusted[0]))
-        hot = data > int(round(trusted[1]))
-        bad = negative | hot
-
-        data = data.as_double()
-
-        spot_params = spot_phil.fetch(
-            source=iotbx.phil.parse("min_spot_size=1")
-        ).extract()
-        threshold_function = SpotFinderFactory.configure_threshold(spot_params)
-        peak_pixels = threshold_function.compute_threshold(data, ~bad)
-
-        if total is None:
-            total = peak_pixels.as_1d().as_int()
+        bad = (data < self.trusted[0]) | (data > self.trusted[1])
+        peak_pixels = self.threshold_function.compute_threshold(data.as_double(), ~bad)
+        return peak_pixels.as_1d()
+
+
+class _ConvergenceMonitor:
+    """Track the set of bad pixels as images are accumulated, to decide when
+    further images will no longer change the result.
+
+    Every check_interval images the current bad pixel mask (signal on at least
+    half of the images processed so far) is compared with the mask at the
+    previous check: once it has been unchanged for stable_checks consecutive
+    checks the per-pixel signal fractions are considered converged."""
+
+    def __init__(self, check_interval, stable_checks):
+        self.check_interval = check_interval
+        self.stable_checks = stable_checks
+        self._next_check = check_interval
+        self._stable = 0
+        self._previous = None
+
+    def converged(self, total, n_images):
+        if not self.check_interval or n_images < self._next_check:
+            return False
+        self._next_check = n_images + self.check_interval
+        current = total >= (n_images // 2)
+        if self._previous is not None and np.array_equal(current, self._previous):
+            self._stable += 1
         else:
-            total += peak_pixels.as_1d().as_int()
-
-    return total
+            self._stable = 0
+        self._previous = current
+        return self._stable >= self.stable_checks
+
+
+def _count_signal_pixels_worker(imageset, queue, counts, n_done, stop):
+    """Pull image indices from queue until it is exhausted (or stop is set),
+    adding the signal pixels found on each image into the shared counts."""
+    counter = SignalPixelCounter(imageset)
+    total = np.frombuffer(counts.get_obj(), dtype=np.int32)
+    while not stop.is_set():
+        idx = queue.get()
+        if idx is None:
+            break
+        signal = flumpy.to_numpy(counter(idx))
+        with counts.get_lock():
+            np.add(total, signal, out=total, casting="unsafe")
+            n_done.value += 1
+
+
+def accumulate_signal_pixels(
+    imageset, images, nproc=1, check_interval=0, stable_checks=3
+):
+    """Count the number of images on which each pixel is identified as signal.
+
+    Images are handed out to nproc worker processes through a shared queue,
+    and every worker adds its results into a single shared-memory accumulator.
+    If check_interval is set, stop as soon as the bad pixel mask has converged
+    (see _ConvergenceMonitor) rather than processing every image.
+
+    Returns:
+        A tuple (total, n_images) of the per-pixel signal counts as a flex.int
+        and the number of images these were accumulated over.
+    """
+    monitor = _ConvergenceMonitor(check_interval, stable_checks)
+
+    if nproc == 1:
+        counter = SignalPixelCounter(imageset)
+        total = np.zeros(counter.n_pixels, dtype=np.int32)
+        n_images = 0
+        for idx in images:
+            np.add(total, flumpy.to_numpy(counter(idx)), out=total, casting="unsafe")
+            n_images += 1
+            if monitor.converged(total, n_images):
+                break
+        return flumpy.from_numpy(total), n_images
+
+    n_pixels = _n_pixels(imageset.get_detector())
+    counts = multiprocessing.Array("i", n_pixels)
+    n_done = multiprocessing.Value("i", 0, lock=False)
+    stop = multiprocessing.Event()
+    queue = multiprocessing.Queue()
+    for idx in images:
+        queue.put(idx)
+    for _ in range(nproc):
+        queue.put(None)
+
+    workers = [
+        multiprocessing.Process(
+            target=_count_signal_pixels_worker,
+            args=(imageset, queue, counts, n_done, stop),
+        )
+        for _ in range(nproc)
+    ]
+    for worker in workers:
+        worker.start()
+
+    total = np.frombuffer(counts.get_obj(), dtype=np.int32)
+    while any(worker.is_alive() for worker in workers):
+        time.sleep(0.1)
+        if check_interval and not stop.is_set():
+            with counts.get_lock():
+                snapshot = total.copy()
+                n_images = n_done.value
+            if monitor.converged(snapshot, n_images):
+                stop.set()
+
+    # any images left on the queue after early termination are discarded
+    queue.cancel_join_thread()
+    queue.close()
+
+    for worker in workers:
+        worker.join()
+        if worker.exitcode:
+            raise RuntimeError(
+                f"Signal pixel counting failed in worker process (exit code {worker.exitcode})"
+            )
+
+    return flumpy.from_numpy(total.copy()), n_done.value
 
 
 @dials.util.show_mail_handle_errors()
@@ -166,29 +312,20 @@ def run(args=None):
         # work around dxtbx "features" to do with counting from (0, 1, -1, n)
         images = [i - first + 1 for i in images]
 
-        n = int(math.ceil(len(images) / params.nproc))
-        chunks = [images[i : i + n] for i in range(0, len(images), n)]
-
-        assert len(images) == sum(len(chunk) for chunk in chunks)
-
-        if len(chunks) < params.nproc:
-            params.nproc = len(chunks)
-
-        total = None
-        with ProcessPoolExecutor(max_workers=params.nproc) as p:
-            jobs = []
-            for j in range(params.nproc):
-                jobs.append(p.submit(find_constant_signal_pixels, imageset, chunks[j]))
-            for job in as_completed(jobs):
-                if total is None:
-                    total = job.result()
-                else:
-                    total += job.result()
+        total, n_images = accumulate_signal_pixels(
+            imageset,
+            images,
+            nproc=min(params.nproc, len(images)),
+            check_interval=params.convergence.check_interval,
+            stable_checks=params.convergence.stable_checks,
+        )
+        if n_images < len(images):
+            print(f"Bad pixel mask converged after {n_images} of {len(images)} images")
 
         if hot_mask is None:
-            hot_mask = total >= (len(images) // 2)
+            hot_mask = total >= (n_images // 2)
         else:
-            hot_mask = hot_mask & (total >= (len(images) // 2))
+            hot_mask = hot_mask & (total >= (n_images // 2))
 
     hot_pixels = hot_mask.iselection()
 
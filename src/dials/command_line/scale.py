@@ -45,6 +45,7 @@
 
 from dials.algorithms.scaling.algorithm import ScaleAndFilterAlgorithm, ScalingAlgorithm
 from dials.util import Sorry, log, show_mail_handle_errors
+from dials.util.asu_index_cache import asu_index_cache
 from dials.util.export_mtz import log_summary
 from dials.util.options import ArgumentParser, reflections_and_experiments_from_files
 from dials.util.version import dials_version
@@ -181,6 +182,7 @@ def run_scaling(params, experiments, reflections):
 
         cross_validator = DialsScaleCrossValidator(experiments, reflections)
         cross_validate(params, cross_validator)
+        asu_index_cache.clear()
 
         logger.info(
             "Cross validation analysis does not produce scaling output files, rather\n"
@@ -198,6 +200,7 @@ def run_scaling(params, experiments, reflections):
         algorithm.run()
 
         experiments, joint_table = algorithm.finish()
+        asu_index_cache.clear()
 
         return experiments, joint_table
 
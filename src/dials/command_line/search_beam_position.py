@@ -8,8 +8,12 @@
 import math
 import random
 
+import numpy as np
+
 import iotbx.phil
 import libtbx
+from dxtbx import flumpy
+from dxtbx.model import ExperimentType
 from libtbx.test_utils import approx_equal
 from libtbx.utils import plural_s
 from rstbx.dps_core import Direction, Directional_FFT
@@ -66,6 +70,11 @@
 wide_search_binning = 2
   .help = "Modify the coarseness of the wide grid search for the beam centre."
   .type = float(value_min=0)
+wide_search_coarse_step = 1
+  .help = "First score every nth point of the wide search grid, then repeatedly"
+          "score the points around the best scores with half the step, until"
+          "the step is one. A step of 1 scores every point of the grid."
+  .type = int(value_min=1)
 n_macro_cycles = 1
   .type = int
   .help = "Number of macro cycles for an iterative beam centre search."
@@ -93,6 +102,8 @@ def optimize_origin_offset_local_scope(
     mm_search_scope=4,
     wide_search_binning=1,
     plot_search_scope=False,
+    nproc=1,
+    wide_search_coarse_step=1,
 ):
     """Local scope: find the optimal origin-offset closest to the current overall detector position
     (local minimum, simple minimization)"""
@@ -110,30 +121,25 @@ def optimize_origin_offset_local_scope(
     assert approx_equal(beamr2.dot(beamr1), 0.0)
     # so the orthonormal vectors are s0, beamr1 and beamr2
 
+    scorer = _OriginOffsetScorer(
+        experiments, reflection_lists, solution_lists, amax_lists
+    )
+
+    def score_grid_points(points, px_sz):
+        offsets = [(x * px_sz * beamr1 + y * px_sz * beamr2).elems for x, y in points]
+        return _score_offsets(scorer, offsets, nproc)
+
     if mm_search_scope:
         plot_px_sz = experiments[0].detector[0].get_pixel_size()[0]
         plot_px_sz *= wide_search_binning
         grid = max(1, int(mm_search_scope / plot_px_sz))
         widegrid = 2 * grid + 1
 
-        def get_experiment_score_for_coord(x, y):
-            new_origin_offset = x * plot_px_sz * beamr1 + y * plot_px_sz * beamr2
-            return sum(
-                _get_origin_offset_score(
-                    new_origin_offset,
-                    solution_lists[i],
-                    amax_lists[i],
-                    reflection_lists[i],
-                    experiment,
-                )
-                for i, experiment in enumerate(experiments)
-            )
-
-        scores = flex.double(
-            get_experiment_score_for_coord(x, y)
-            for y in range(-grid, grid + 1)
-            for x in range(-grid, grid + 1)
-        )
+        scores = _search_grid(
+            lambda points: score_grid_points(points, plot_px_sz),
+            grid,
+            coarse_step=wide_search_coarse_step,
+        ).ravel()
 
         def igrid(x):
             return x - (widegrid // 2)
@@ -141,12 +147,13 @@ def igrid(x):
         idxs = [igrid(i) * plot_px_sz for i in range(widegrid)]
 
         # if there are several similarly high scores, then choose the closest
-        # one to the current beam centre
+        # one to the current beam centre. Points of the grid that were not
+        # scored are NaN, so are never selected.
         potential_offsets = flex.vec3_double()
-        if scores.all_eq(0):
+        if np.all(scores[~np.isnan(scores)] == 0):
             raise Sorry("No valid scores")
-        sel = scores > (0.9 * flex.max(scores))
-        for i in sel.iselection():
+        sel = scores > (0.9 * np.nanmax(scores))
+        for i in np.flatnonzero(sel):
             offset = (idxs[i % widegrid]) * beamr1 + (idxs[i // widegrid]) * beamr2
             potential_offsets.append(offset.elems)
             # print offset.length(), scores[i]
@@ -177,36 +184,17 @@ def target(self, vector):
             trial_origin_offset = vector[0] * 0.2 * beamr1 + vector[1] * 0.2 * beamr2
             if self.wide_search_offset is not None:
                 trial_origin_offset += self.wide_search_offset
-            target = 0
-            for i, experiment in enumerate(experiments):
-                target -= _get_origin_offset_score(
-                    trial_origin_offset,
-                    solution_lists[i],
-                    amax_lists[i],
-                    reflection_lists[i],
-                    experiment,
-                )
-            return target
+            return -float(scorer([trial_origin_offset.elems])[0])
 
     new_offset = simplex_minimizer(wide_search_offset).offset
 
     if plot_search_scope:
         plot_px_sz = experiments[0].get_detector()[0].get_pixel_size()[0]
         grid = max(1, int(mm_search_scope / plot_px_sz))
-        scores = flex.double()
-        for y in range(-grid, grid + 1):
-            for x in range(-grid, grid + 1):
-                new_origin_offset = x * plot_px_sz * beamr1 + y * plot_px_sz * beamr2
-                score = 0
-                for i, experiment in enumerate(experiments):
-                    score += _get_origin_offset_score(
-                        new_origin_offset,
-                        solution_lists[i],
-                        amax_lists[i],
-                        reflection_lists[i],
-                        experiment,
-                    )
-                scores.append(score)
+        points = [
+            (x, y) for y in range(-grid, grid + 1) for x in range(-grid, grid + 1)
+        ]
+        scores = flex.double(score_grid_points(points, plot_px_sz))
 
         def show_plot(widegrid, excursi):
             excursi.reshape(flex.grid(widegrid, widegrid))
@@ -255,6 +243,174 @@ def igrid(x):
     return new_experiments
 
 
+def _search_grid(score_points, grid, coarse_step=1):
+    """
+    Score the points (x, y) of a square grid, with x and y from -grid to grid.
+
+    If coarse_step is greater than one, only every coarse_step-th point is
+    scored at first. Then the points around those scoring within 90% of the
+    maximum are scored with half the step, and so on until the step is one.
+
+    Args:
+        score_points: A function returning the scores for a list of (x, y) points
+        grid (int): The half-width of the grid
+        coarse_step (int): The initial step between scored points
+
+    Returns:
+        A (2 * grid + 1, 2 * grid + 1) array of scores indexed by [y, x], with
+        NaN for the points that were not scored.
+    """
+    scores = np.full((2 * grid + 1, 2 * grid + 1), np.nan)
+    step = max(1, coarse_step)
+    coarse = np.arange(-grid, grid + 1)
+    coarse = coarse[coarse % step == 0]
+    points = np.stack(np.meshgrid(coarse, coarse), axis=-1).reshape(-1, 2)
+    while True:
+        points = np.unique(points[np.all(np.abs(points) <= grid, axis=1)], axis=0)
+        points = points[np.isnan(scores[points[:, 1] + grid, points[:, 0] + grid])]
+        if len(points):
+            scores[points[:, 1] + grid, points[:, 0] + grid] = score_points(
+                points.tolist()
+            )
+        if step == 1:
+            return scores
+        # the points with the best scores, as (x, y)
+        best = np.argwhere(scores > 0.9 * np.nanmax(scores))[:, ::-1] - grid
+        new_step = step // 2
+        around = np.arange(-step, step + 1, new_step)
+        around = np.stack(np.meshgrid(around, around), axis=-1).reshape(-1, 2)
+        points = (best[:, None, :] + around[None, :, :]).reshape(-1, 2)
+        step = new_step
+
+
+class _OriginOffsetScorer:
+    """
+    Score trial origin offsets of the detectors against the DPS solutions.
+
+    The trial detector for an origin offset is the original detector translated
+    by that offset, so the laboratory coordinates of the spots are computed just
+    once, and the reciprocal lattice points for many offsets are computed at
+    once with numpy rather than by building and mapping to a new detector for
+    each offset.
+    """
+
+    # The number of offsets for which the reciprocal lattice points are held at once
+    batch_size = 64
+
+    def __init__(self, experiments, reflection_lists, solution_lists, amax_lists):
+        self._spots = []
+        self.solution_lists = solution_lists
+        self.amax_lists = amax_lists
+        for experiment, spots_mm in zip(experiments, reflection_lists):
+            # Key point for this is that the spots must correspond to detector
+            # positions not to the correct RS position => reset any fixed rotation
+            # to identity
+            experiment.goniometer.set_fixed_rotation((1, 0, 0, 0, 1, 0, 0, 0, 1))
+            if experiment.get_type() in (ExperimentType.LAUE, ExperimentType.TOF):
+                # polychromatic spots are mapped with a new detector per offset
+                self._spots.append((experiment, spots_mm))
+            else:
+                self._spots.append(self._spot_geometry(experiment, spots_mm))
+
+    @staticmethod
+    def _spot_geometry(experiment, spots_mm):
+        panels = flumpy.to_numpy(spots_mm["panel"])
+        x, y, z = spots_mm["xyzobs.mm.value"].parts()
+        lab = np.zeros((len(spots_mm), 3))
+        for i_panel, panel in enumerate(experiment.detector):
+            sel = panels == i_panel
+            isel = flumpy.from_numpy(np.flatnonzero(sel).astype(np.uint64))
+            xy = flex.vec2_double(x.select(isel), y.select(isel))
+            lab[sel] = flumpy.to_numpy(panel.get_lab_coord(xy))
+
+        geometry = {
+            "lab": lab,
+            "wavelength": experiment.beam.get_wavelength(),
+            "s0": np.array(experiment.beam.get_s0()),
+            "setting_rotation_inverse": None,
+            "rotation_axis": None,
+        }
+        goniometer = experiment.goniometer
+        if goniometer is not None:
+            geometry["setting_rotation_inverse"] = np.linalg.inv(
+                np.reshape(goniometer.get_setting_rotation(), (3, 3))
+            )
+            scan = experiment.scan
+            if scan is not None and scan.has_property("oscillation"):
+                axis = np.array(goniometer.get_rotation_axis_datum())
+                geometry["rotation_axis"] = axis / np.linalg.norm(axis)
+                geometry["angle"] = -flumpy.to_numpy(z)
+        return geometry
+
+    @staticmethod
+    def _reciprocal_lattice_points(geometry, offsets):
+        """The reciprocal lattice points (n_offsets, n_spots, 3) for the offsets,
+        as map_centroids_to_reciprocal_space with the translated detectors."""
+        s1 = geometry["lab"][None, :, :] + offsets[:, None, :]
+        s1 /= np.linalg.norm(s1, axis=2, keepdims=True) * geometry["wavelength"]
+        rlp = s1 - geometry["s0"]
+        if geometry["setting_rotation_inverse"] is not None:
+            rlp = np.matmul(rlp, geometry["setting_rotation_inverse"].T)
+        if geometry["rotation_axis"] is not None:
+            # rotate each point around the axis by its angle
+            k = geometry["rotation_axis"]
+            cos = np.cos(geometry["angle"])[None, :, None]
+            sin = np.sin(geometry["angle"])[None, :, None]
+            k_dot = np.matmul(rlp, k)[:, :, None]
+            rlp = rlp * cos + np.cross(k, rlp) * sin + k * k_dot * (1 - cos)
+        return rlp
+
+    def __call__(self, offsets):
+        """Return the total score over the experiments for each origin offset."""
+        offsets = np.asarray(offsets, dtype=np.float64).reshape(-1, 3)
+        scores = np.zeros(len(offsets))
+        for i, spots in enumerate(self._spots):
+            solutions = self.solution_lists[i]
+            amax = self.amax_lists[i]
+            if isinstance(spots, tuple):
+                experiment, spots_mm = spots
+                for j, offset in enumerate(offsets):
+                    scores[j] += _get_origin_offset_score(
+                        matrix.col(offset), solutions, amax, spots_mm, experiment
+                    )
+                continue
+            for start in range(0, len(offsets), self.batch_size):
+                batch = offsets[start : start + self.batch_size]
+                rlps = self._reciprocal_lattice_points(spots, batch)
+                for j, rlp in enumerate(rlps, start=start):
+                    scores[j] += _sum_score_detail(
+                        flumpy.vec_from_numpy(np.ascontiguousarray(rlp)),
+                        solutions,
+                        amax=amax,
+                    )
+        return scores
+
+
+# The scorer used by the worker processes of _score_offsets
+_scorer = None
+
+
+def _init_scorer(scorer):
+    global _scorer
+    _scorer = scorer
+
+
+def _score_offsets_with_scorer(offsets):
+    return _scorer(offsets)
+
+
+def _score_offsets(scorer, offsets, nproc=1):
+    """Score the origin offsets, split over nproc processes."""
+    offsets = np.asarray(offsets, dtype=np.float64).reshape(-1, 3)
+    if nproc <= 1 or len(offsets) < 2:
+        return scorer(offsets)
+    chunks = np.array_split(offsets, min(len(offsets), 4 * nproc))
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=nproc, initializer=_init_scorer, initargs=(scorer,)
+    ) as pool:
+        return np.concatenate(list(pool.map(_score_offsets_with_scorer, chunks)))
+
+
 def _get_origin_offset_score(
     trial_origin_offset, solutions, amax, spots_mm, experiment
 ):
@@ -367,6 +523,7 @@ def discover_better_experimental_model(
     mm_search_scope=4.0,
     wide_search_binning=1,
     plot_search_scope=False,
+    wide_search_coarse_step=1,
 ):
     assert len(experiments) == len(reflections)
     assert len(experiments) > 0
@@ -437,6 +594,8 @@ def discover_better_experimental_model(
         mm_search_scope=mm_search_scope,
         wide_search_binning=wide_search_binning,
         plot_search_scope=plot_search_scope,
+        nproc=nproc,
+        wide_search_coarse_step=wide_search_coarse_step,
     )
     new_detector = new_experiments[0].detector
     old_panel, old_beam_centre = detector.get_ray_intersection(beam.get_s0())
@@ -528,6 +687,7 @@ def run(args=None):
             mm_search_scope=params.mm_search_scope,
             wide_search_binning=params.wide_search_binning,
             plot_search_scope=params.plot_search_scope,
+            wide_search_coarse_step=params.wide_search_coarse_step,
         )
         logger.info("")
 
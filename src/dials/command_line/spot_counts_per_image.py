@@ -3,7 +3,10 @@
 import json
 import sys
 
+import numpy as np
+
 import iotbx.phil
+from dxtbx import flumpy
 
 import dials.util
 from dials.algorithms.spot_finding import per_image_analysis
@@ -75,15 +78,25 @@ def run(args=None):
     if any(experiments.crystals()):
         sys.exit("Only unindexed experiments are currently supported")
 
+    # The shoeboxes are not needed, so free their memory before processing
+    if "shoebox" in reflections:
+        del reflections["shoebox"]
+
     reflections.centroid_px_to_mm(experiments)
     reflections.map_centroids_to_reciprocal_space(experiments)
 
     if params.id is not None:
         reflections = reflections.select(reflections["id"] == params.id)
 
+    # Split the reflections by experiment with a single sort of the ids
+    ids = flumpy.to_numpy(reflections["id"])
+    perm = np.argsort(ids, kind="stable")
+    bounds = np.searchsorted(ids[perm], np.arange(len(experiments) + 1))
+    perm = flumpy.from_numpy(perm.astype(np.uint64))
+
     all_stats = []
     for i, expt in enumerate(experiments):
-        refl = reflections.select(reflections["id"] == i)
+        refl = reflections.select(perm[int(bounds[i]) : int(bounds[i + 1])])
         stats = per_image_analysis.stats_per_image(
             expt, refl, resolution_analysis=params.resolution_analysis
         )
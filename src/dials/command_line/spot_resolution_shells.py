@@ -68,6 +68,10 @@ def run(args=None):
 
     reflections = reflections[0]
 
+    # The shoeboxes are not needed, so free their memory before processing
+    if "shoebox" in reflections:
+        del reflections["shoebox"]
+
     spot_resolution_shells(experiments, reflections, params)
 
 
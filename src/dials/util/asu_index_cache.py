@@ -0,0 +1,189 @@
+"""
+A memoised service for mapping Miller indices to the asymmetric unit.
+
+Several stages of a multi-dataset pipeline (cosym, symmetry, scaling, merging)
+repeatedly reindex and map identical Miller index arrays to the asymmetric
+unit, and sort them by asu index. The AsuIndexCache stores the results of
+these transformations keyed by (dataset, cb_op, space group, anomalous), where
+the dataset is identified by a digest of the input Miller indices, so that
+each transformation is only computed once per process. The least recently used
+entries are evicted once the cache grows beyond its memory budget, arrays too
+large to fit in the budget are not cached at all, and the command line
+programs clear the cache once they are done with it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from cctbx import miller, sgtbx
+from dxtbx import flumpy
+
+from dials.array_family import flex
+
+# Miller indices are packed into a single int64 with 21 bits per component
+_PACK_BITS = 21
+_PACK_OFFSET = 1 << (_PACK_BITS - 1)
+
+
+def pack_miller_indices(hkl: np.ndarray) -> np.ndarray:
+    """Pack an (n, 3) array of Miller indices into an array of int64 keys.
+
+    The packing preserves the lexicographic (h, k, l) ordering of the indices,
+    so sorting the keys is equivalent to sorting the Miller indices.
+    """
+    hkl = np.asarray(hkl, dtype=np.int64) + _PACK_OFFSET
+    return (hkl[:, 0] << (2 * _PACK_BITS)) | (hkl[:, 1] << _PACK_BITS) | hkl[:, 2]
+
+
+def unpack_miller_indices(keys: np.ndarray) -> np.ndarray:
+    """Unpack an array of int64 keys into an (n, 3) array of Miller indices."""
+    keys = np.asarray(keys, dtype=np.int64)
+    mask = (1 << _PACK_BITS) - 1
+    hkl = np.column_stack(
+        (keys >> (2 * _PACK_BITS), (keys >> _PACK_BITS) & mask, keys & mask)
+    )
+    return (hkl - _PACK_OFFSET).astype(np.int32)
+
+
+class _AsuIndexEntry:
+    """The cached transformations of one Miller index array."""
+
+    def __init__(self, asu_indices: flex.miller_index, key):
+        self.asu_indices = asu_indices
+        self.key = key
+        self.keys = pack_miller_indices(flumpy.to_numpy(asu_indices))
+        self._permutation = None
+        self.aliases = []
+
+    @property
+    def permutation(self) -> np.ndarray:
+        if self._permutation is None:
+            self._permutation = np.argsort(self.keys, kind="stable")
+        return self._permutation
+
+    @property
+    def nbytes(self) -> int:
+        nbytes = 12 * self.asu_indices.size() + self.keys.nbytes
+        if self._permutation is not None:
+            nbytes += self._permutation.nbytes
+        return nbytes
+
+
+class AsuIndexCache:
+    """
+    A least-recently-used cache of asu-mapped Miller indices.
+
+    The cached arrays are shared between callers and so must be treated as
+    read-only; take a copy before modifying any returned array in place.
+
+    Attributes:
+        max_bytes (int): The memory budget for the cached arrays.
+        nbytes (int): The current size of the cached arrays.
+    """
+
+    def __init__(self, max_bytes: int = 2**27):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._aliases = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        self._entries.clear()
+        self._aliases.clear()
+        self.nbytes = 0
+
+    @staticmethod
+    def _key(miller_indices, space_group, anomalous, cb_op):
+        digest = hashlib.blake2b(
+            flumpy.to_numpy(miller_indices).tobytes(), digest_size=16
+        ).digest()
+        symops = tuple(sorted(op.as_xyz() for op in space_group.all_ops()))
+        if cb_op is not None:
+            cb_op = sgtbx.change_of_basis_op(cb_op)
+            cb_op = None if cb_op.is_identity_op() else cb_op.as_xyz()
+        return (digest, miller_indices.size(), cb_op, symops, bool(anomalous))
+
+    def _entry(self, miller_indices, space_group, anomalous, cb_op, in_asu=False):
+        key = self._key(miller_indices, space_group, anomalous, cb_op)
+        key = self._aliases.get(key, key)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        if in_asu:
+            assert key[2] is None, "in_asu indices cannot be reindexed"
+            asu_indices = miller_indices.deep_copy()
+        else:
+            if key[2] is not None:
+                asu_indices = sgtbx.change_of_basis_op(cb_op).apply(miller_indices)
+            else:
+                asu_indices = miller_indices.deep_copy()
+            miller.map_to_asu(space_group.type(), anomalous, asu_indices)
+        entry = _AsuIndexEntry(asu_indices, key)
+        if entry.nbytes > self.max_bytes:
+            # too large to cache without evicting everything else
+            return entry
+        self._entries[key] = entry
+        self.nbytes += entry.nbytes
+        if not in_asu:
+            # mapping to the asu is idempotent, so the asu indices themselves
+            # can be looked up as the same entry, e.g. when sorting an
+            # asu_miller_index column computed earlier.
+            alias = self._key(asu_indices, space_group, anomalous, None)
+            if alias != key:
+                self._aliases[alias] = key
+                entry.aliases.append(alias)
+        self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        while self.nbytes > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self.nbytes -= entry.nbytes
+            for alias in entry.aliases:
+                if self._aliases.get(alias) == key:
+                    del self._aliases[alias]
+
+    def asu_indices(
+        self, miller_indices, space_group, anomalous=False, cb_op=None
+    ) -> flex.miller_index:
+        """Return the Miller indices, reindexed by cb_op, mapped to the asu."""
+        return self._entry(miller_indices, space_group, anomalous, cb_op).asu_indices
+
+    def packed_asu_indices(
+        self, miller_indices, space_group, anomalous=False, cb_op=None
+    ) -> np.ndarray:
+        """Return the asu indices as packed int64 keys (see pack_miller_indices)."""
+        return self._entry(miller_indices, space_group, anomalous, cb_op).keys
+
+    def sort_permutation(
+        self, miller_indices, space_group, anomalous=False, cb_op=None, in_asu=False
+    ) -> np.ndarray:
+        """Return the (stable) permutation that sorts the asu indices.
+
+        If in_asu is True, the Miller indices must already be in the asu, and
+        are sorted as given rather than being mapped to the asu again.
+        """
+        entry = self._entry(miller_indices, space_group, anomalous, cb_op, in_asu)
+        nbytes = entry.nbytes
+        permutation = entry.permutation
+        if self._entries.get(entry.key) is entry:
+            self.nbytes += entry.nbytes - nbytes
+            self._evict()
+        return permutation
+
+
+# The cache shared by the scaling and symmetry algorithms in this process.
+asu_index_cache = AsuIndexCache()
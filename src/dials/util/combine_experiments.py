@@ -4,10 +4,13 @@
 import random
 import sys
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 import dxtbx.model
 import dxtbx.model.compare as compare
+from dxtbx import flumpy
 from dxtbx.model.experiment_list import (
     BeamComparison,
     DetectorComparison,
@@ -404,8 +407,8 @@ def select_subset(
     return subset_exp, subset_refls
 
 
-def combine_experiments_no_reflections(params, experiment_lists):
-    """Run combine_experiments, without corresponding reflection tables"""
+def _reference_combiner(params, experiment_lists) -> CombineWithReference:
+    """Create the combiner replacing the experiment models with the references."""
     flat_exps = ExperimentList()
     try:
         for elist in experiment_lists:
@@ -420,7 +423,7 @@ def combine_experiments_no_reflections(params, experiment_lists):
     ref_beam, ref_goniometer, ref_scan, ref_crystal, ref_detector = parse_ref_models(
         flat_exps, params.reference_from_experiment
     )
-    combine = CombineWithReference(
+    return CombineWithReference(
         beam=ref_beam,
         goniometer=ref_goniometer,
         scan=ref_scan,
@@ -428,20 +431,79 @@ def combine_experiments_no_reflections(params, experiment_lists):
         detector=ref_detector,
         params=params,
     )
+
+
+def _combine_experiment(combine, experiment, experiment_lists) -> Experiment:
+    try:
+        return combine(experiment)
+    except ComparisonError as e:
+        # When we failed tolerance checks, give a useful error message
+        (i, index) = find_experiment_in(experiment, experiment_lists)
+        sys.exit(  # FIXME - raise RuntimeError?
+            "Model didn't match reference within required tolerance for experiment {} in input file {}:"
+            "\n{}\nAdjust tolerances or set compare_models=False to ignore differences.".format(
+                index, i, str(e)
+            )
+        )
+
+
+def _reflection_count_rejection(params, n_refl: int) -> Optional[str]:
+    """Return "min" or "max" if an experiment with n_refl reflections is to be
+    removed by the min/max_reflections_per_experiment options, else None."""
+    if (
+        params.output.min_reflections_per_experiment is not None
+        and n_refl < params.output.min_reflections_per_experiment
+    ):
+        return "min"
+    if (
+        params.output.max_reflections_per_experiment is not None
+        and n_refl > params.output.max_reflections_per_experiment
+    ):
+        return "max"
+    return None
+
+
+def _log_reflection_counts(
+    params, nrefs_per_exp, skipped_expts_min_refl, skipped_expts_max_refl
+):
+    if (
+        params.output.min_reflections_per_experiment is not None
+        and skipped_expts_min_refl > 0
+    ):
+        logger.info(
+            f"Removed {skipped_expts_min_refl} experiments with fewer than {params.output.min_reflections_per_experiment} reflections"
+        )
+    if (
+        params.output.max_reflections_per_experiment is not None
+        and skipped_expts_max_refl > 0
+    ):
+        logger.info(
+            f"Removed {skipped_expts_max_refl} experiments with more than {params.output.max_reflections_per_experiment} reflections"
+        )
+
+    # print number of reflections per experiment
+
+    header = ["Experiment", "Number of reflections"]
+    rows = [(str(i), str(n)) for (i, n) in enumerate(nrefs_per_exp)]
+    logger.info(tabulate(rows, header))
+
+
+def _rows_by_experiment(reflections, n_experiments: int) -> List[flex.size_t]:
+    """Split the rows of a table by id 0..n_experiments-1 with a single sort."""
+    ids = flumpy.to_numpy(reflections["id"])
+    perm = np.argsort(ids, kind="stable")
+    bounds = np.searchsorted(ids[perm], np.arange(n_experiments + 1))
+    perm = flumpy.from_numpy(perm.astype(np.uint64))
+    return [perm[int(i0) : int(i1)] for i0, i1 in zip(bounds[:-1], bounds[1:])]
+
+
+def combine_experiments_no_reflections(params, experiment_lists):
+    """Run combine_experiments, without corresponding reflection tables"""
+    combine = _reference_combiner(params, experiment_lists)
     experiments = ExperimentList()
     for elist in experiment_lists:
         for expt in elist:
-            try:
-                experiments.append(combine(expt))
-            except ComparisonError as e:
-                # When we failed tolerance checks, give a useful error message
-                (i, index) = find_experiment_in(expt, experiment_lists)
-                sys.exit(  # FIXME - raise RuntimeError?
-                    "Model didn't match reference within required tolerance for experiment {} in input file {}:"
-                    "\n{}\nAdjust tolerances or set compare_models=False to ignore differences.".format(
-                        index, i, str(e)
-                    )
-                )
+            experiments.append(_combine_experiment(combine, expt, experiment_lists))
     # select a subset if requested
     if params.output.n_subset is not None and len(experiments) > params.output.n_subset:
         assert (
@@ -458,29 +520,7 @@ def combine_experiments_no_reflections(params, experiment_lists):
 def combine_experiments(params, experiment_lists, reflection_tables):
     """Run combine_experiments"""
 
-    flat_exps = ExperimentList()
-    try:
-        for elist in experiment_lists:
-            flat_exps.extend(elist)
-    except RuntimeError:
-        sys.exit(  # FIXME
-            "Unable to combine experiments. Are experiment IDs unique? "
-            "You may need to run dials.assign_experiment_identifiers first to "
-            "reset IDs."
-        )
-
-    ref_beam, ref_goniometer, ref_scan, ref_crystal, ref_detector = parse_ref_models(
-        flat_exps, params.reference_from_experiment
-    )
-
-    combine = CombineWithReference(
-        beam=ref_beam,
-        goniometer=ref_goniometer,
-        scan=ref_scan,
-        crystal=ref_crystal,
-        detector=ref_detector,
-        params=params,
-    )
+    combine = _reference_combiner(params, experiment_lists)
 
     # set up global experiments and reflections lists
     reflections = flex.reflection_table()
@@ -499,20 +539,15 @@ def combine_experiments(params, experiment_lists, reflection_tables):
 
         for k in refs.experiment_identifiers().keys():
             del refs.experiment_identifiers()[k]
+        rows = _rows_by_experiment(refs, len(exps))
         for i, exp in enumerate(exps):
-            sel = refs["id"] == i
-            sub_ref = refs.select(sel)
+            sub_ref = refs.select(rows[i])
             n_sub_ref = len(sub_ref)
-            if (
-                params.output.min_reflections_per_experiment is not None
-                and n_sub_ref < params.output.min_reflections_per_experiment
-            ):
+            rejection = _reflection_count_rejection(params, n_sub_ref)
+            if rejection == "min":
                 skipped_expts_min_refl += 1
                 continue
-            if (
-                params.output.max_reflections_per_experiment is not None
-                and n_sub_ref > params.output.max_reflections_per_experiment
-            ):
+            if rejection == "max":
                 skipped_expts_max_refl += 1
                 continue
 
@@ -525,17 +560,7 @@ def combine_experiments(params, experiment_lists, reflection_tables):
             if params.output.delete_shoeboxes and "shoebox" in sub_ref:
                 del sub_ref["shoebox"]
 
-            try:
-                experiments.append(combine(exp))
-            except ComparisonError as e:
-                # When we failed tolerance checks, give a useful error message
-                (i, index) = find_experiment_in(exp, experiment_lists)
-                sys.exit(  # FIXME - raise RuntimeError?
-                    "Model didn't match reference within required tolerance for experiment {} in input file {}:"
-                    "\n{}\nAdjust tolerances or set compare_models=False to ignore differences.".format(
-                        index, i, str(e)
-                    )
-                )
+            experiments.append(_combine_experiment(combine, exp, experiment_lists))
 
             # Rewrite imageset_id, if the experiment has an imageset
             if exp.imageset and "imageset_id" in sub_ref:
@@ -569,26 +594,9 @@ def combine_experiments(params, experiment_lists, reflection_tables):
 
     # Finished building global lists
 
-    if (
-        params.output.min_reflections_per_experiment is not None
-        and skipped_expts_min_refl > 0
-    ):
-        logger.info(
-            f"Removed {skipped_expts_min_refl} experiments with fewer than {params.output.min_reflections_per_experiment} reflections"
-        )
-    if (
-        params.output.max_reflections_per_experiment is not None
-        and skipped_expts_max_refl > 0
-    ):
-        logger.info(
-            f"Removed {skipped_expts_max_refl} experiments with more than {params.output.max_reflections_per_experiment} reflections"
-        )
-
-    # print number of reflections per experiment
-
-    header = ["Experiment", "Number of reflections"]
-    rows = [(str(i), str(n)) for (i, n) in enumerate(nrefs_per_exp)]
-    logger.info(tabulate(rows, header))
+    _log_reflection_counts(
+        params, nrefs_per_exp, skipped_expts_min_refl, skipped_expts_max_refl
+    )
 
     # select a subset if requested
     if params.output.n_subset is not None and len(experiments) > params.output.n_subset:
@@ -602,3 +610,104 @@ def combine_experiments(params, experiment_lists, reflection_tables):
         )
 
     return experiments, reflections
+
+
+def combine_experiments_in_batches(
+    params,
+    experiment_lists: List[ExperimentList],
+    reflection_tables: Sequence[flex.reflection_table],
+    max_batch_size: int,
+) -> Iterator[Tuple[ExperimentList, flex.reflection_table]]:
+    """
+    Combine the experiments and reflections, yielding the result in batches.
+
+    This gives the same batches as splitting the output of combine_experiments
+    into parts of at most max_batch_size experiments, of as equal size as
+    possible, without unindexed reflections. However, each batch is yielded
+    as soon as it is complete and the reflection tables are accessed one at a
+    time, so only one input table and one output batch need be held in memory
+    if the tables are loaded on access. If experiments are filtered on their
+    number of reflections, the tables are accessed twice, to count the
+    experiments that are kept before the batch sizes can be known.
+    """
+    combine = _reference_combiner(params, experiment_lists)
+
+    n_kept = sum(len(exps) for exps in experiment_lists)
+    if (
+        params.output.min_reflections_per_experiment is not None
+        or params.output.max_reflections_per_experiment is not None
+    ):
+        n_kept = 0
+        for refs, exps in zip(reflection_tables, experiment_lists):
+            ids = flumpy.to_numpy(refs["id"])
+            counts = np.bincount(ids[ids >= 0], minlength=len(exps))[: len(exps)]
+            n_kept += sum(
+                _reflection_count_rejection(params, n) is None for n in counts.tolist()
+            )
+    n_batches = (n_kept // max_batch_size) + 1
+    batch_size, n_larger = divmod(n_kept, n_batches)
+    batch_sizes = [batch_size + (i < n_larger) for i in range(n_batches)]
+
+    batch_expts = ExperimentList()
+    batch_refls = flex.reflection_table()
+    imagesets = []
+    skipped_expts_min_refl = 0
+    skipped_expts_max_refl = 0
+    nrefs_per_exp = []
+    for refs, exps in zip(reflection_tables, experiment_lists):
+        ids_map = dict(refs.experiment_identifiers())
+        for k in refs.experiment_identifiers().keys():
+            del refs.experiment_identifiers()[k]
+        rows = _rows_by_experiment(refs, len(exps))
+        for i, exp in enumerate(exps):
+            sub_ref = refs.select(rows[i])
+            rejection = _reflection_count_rejection(params, len(sub_ref))
+            if rejection == "min":
+                skipped_expts_min_refl += 1
+                continue
+            if rejection == "max":
+                skipped_expts_max_refl += 1
+                continue
+            nrefs_per_exp.append(len(sub_ref))
+
+            # Renumber the reflections from 0..n-1 within the batch
+            batch_id = len(batch_expts)
+            sub_ref["id"] = flex.int(len(sub_ref), batch_id)
+            if i in ids_map:
+                sub_ref.experiment_identifiers()[batch_id] = ids_map[i]
+            if params.output.delete_shoeboxes and "shoebox" in sub_ref:
+                del sub_ref["shoebox"]
+
+            expt = _combine_experiment(combine, exp, experiment_lists)
+            batch_expts.append(expt)
+
+            # The imageset_id is the index of the imageset in the whole of the
+            # combined experiments, as for combine_experiments
+            if expt.imageset is not None and expt.imageset not in imagesets:
+                imagesets.append(expt.imageset)
+            if exp.imageset and "imageset_id" in sub_ref:
+                if len(np.unique(flumpy.to_numpy(sub_ref["imageset_id"]))) != 1:
+                    logger.warning(
+                        "Warning: Experiment %d reflections appear to have come from multiple imagesets - output may be incorrect",
+                        i,
+                    )
+                else:
+                    sub_ref["imageset_id"] = flex.int(
+                        len(sub_ref), imagesets.index(expt.imageset)
+                    )
+            batch_refls.extend(sub_ref)
+
+            if len(batch_expts) == batch_sizes[0]:
+                yield batch_expts, batch_refls
+                batch_sizes.pop(0)
+                batch_expts = ExperimentList()
+                batch_refls = flex.reflection_table()
+        del refs
+
+    _log_reflection_counts(
+        params, nrefs_per_exp, skipped_expts_min_refl, skipped_expts_max_refl
+    )
+
+    # Any remaining batches are empty
+    for _ in batch_sizes:
+        yield ExperimentList(), flex.reflection_table()
@@ -11,7 +11,6 @@
 
 import gemmi
 import numpy as np
-import pandas as pd
 
 from cctbx import uctbx
 from dxtbx import flumpy
@@ -358,14 +357,17 @@ def add_batch_list(
     return
 
 
-def write_columns(mtz, reflection_table):
-    """Write the column definitions AND data to the current dataset."""
+def write_columns(mtz, reflection_table, chunk_size=1000000):
+    """Write the column definitions AND data to the current dataset.
+
+    The data are converted to float32 directly into a preallocated array, in
+    chunks of rows, so that the intermediate copies of each column are never
+    larger than a chunk.
+    """
 
     nref = len(reflection_table["miller_index"])
     assert nref
-    xdet, ydet, _ = [
-        flex.double(x) for x in reflection_table["xyzobs.px.value"].parts()
-    ]
+    xyzobs = flumpy.to_numpy(reflection_table["xyzobs.px.value"])
 
     type_table = {
         "H": "H",
@@ -391,47 +393,33 @@ def write_columns(mtz, reflection_table):
         "QE": "R",
     }
 
-    mtz_data = pd.DataFrame(
-        flumpy.to_numpy(reflection_table["miller_index"]).astype("float32"),
-        columns=["H", "K", "L"],
-    )
-    mtz_data.insert(3, "M/ISYM", np.zeros(nref, dtype="float32"))
+    # The source data for each column after H, K, L: either a constant, or an
+    # array (without copying) and a function to apply to each chunk of it.
+    columns = []
+
+    def add_column(label, mtz_type, values, transform=None):
+        mtz.add_column(label, mtz_type)
+        if not (np.isscalar(values) or isinstance(values, np.ndarray)):
+            values = flumpy.to_numpy(values)
+        columns.append((values, transform))
 
     # H, K, L are in the base dataset, but we have to add M/ISYM
-    mtz.add_column("M/ISYM", type_table["M_ISYM"])
-    mtz.add_column("BATCH", type_table["BATCH"])
-    mtz_data.insert(
-        4, "BATCH", flumpy.to_numpy(reflection_table["batch"]).astype("float32")
-    )
+    add_column("M/ISYM", type_table["M_ISYM"], 0.0)
+    add_column("BATCH", type_table["BATCH"], reflection_table["batch"])
 
     # if intensity values used in scaling exist, then just export these as I, SIGI
     if "intensity.scale.value" in reflection_table:
         I_scaling = reflection_table["intensity.scale.value"]
         V_scaling = reflection_table["intensity.scale.variance"]
         assert V_scaling.all_gt(0)  # Trap negative variances
-        mtz.add_column("I", type_table["I"])
-        mtz_data.insert(
-            len(mtz_data.columns), "I", flumpy.to_numpy(I_scaling).astype("float32")
-        )
-        mtz.add_column("SIGI", type_table["SIGI"])
-        mtz_data.insert(
-            len(mtz_data.columns),
-            "SIGI",
-            flumpy.to_numpy(flex.sqrt(V_scaling)).astype("float32"),
-        )
-        mtz.add_column("SCALEUSED", "R")
-        mtz_data.insert(
-            len(mtz_data.columns),
-            "SCALEUSED",
-            flumpy.to_numpy(reflection_table["inverse_scale_factor"]).astype("float32"),
-        )
-        mtz.add_column("SIGSCALEUSED", "R")
-        mtz_data.insert(
-            len(mtz_data.columns),
+        add_column("I", type_table["I"], I_scaling)
+        add_column("SIGI", type_table["SIGI"], V_scaling, np.sqrt)
+        add_column("SCALEUSED", "R", reflection_table["inverse_scale_factor"])
+        add_column(
             "SIGSCALEUSED",
-            flumpy.to_numpy(
-                flex.sqrt(reflection_table["inverse_scale_factor_variance"])
-            ).astype("float32"),
+            "R",
+            reflection_table["inverse_scale_factor_variance"],
+            np.sqrt,
         )
     else:
         if "intensity.prf.value" in reflection_table:
@@ -442,33 +430,15 @@ def write_columns(mtz, reflection_table):
             I_profile = reflection_table["intensity.prf.value"]
             V_profile = reflection_table["intensity.prf.variance"]
             assert V_profile.all_gt(0)  # Trap negative variances
-            mtz.add_column(col_names[0], type_table["I"])
-            mtz_data.insert(
-                len(mtz_data.columns),
-                col_names[0],
-                flumpy.to_numpy(I_profile.as_float()).astype("float32"),
-            )
-            mtz.add_column(col_names[1], type_table["SIGI"])
-            mtz_data.insert(
-                len(mtz_data.columns),
-                col_names[1],
-                flumpy.to_numpy(flex.sqrt(V_profile)).astype("float32"),
-            )
+            add_column(col_names[0], type_table["I"], I_profile)
+            add_column(col_names[1], type_table["SIGI"], V_profile, np.sqrt)
 
         if "intensity.sum.value" in reflection_table:
             I_sum = reflection_table["intensity.sum.value"]
             V_sum = reflection_table["intensity.sum.variance"]
             assert V_sum.all_gt(0)  # Trap negative variances
-            mtz.add_column("I", type_table["I"])
-            mtz_data.insert(
-                len(mtz_data.columns), "I", flumpy.to_numpy(I_sum).astype("float32")
-            )
-            mtz.add_column("SIGI", type_table["SIGI"])
-            mtz_data.insert(
-                len(mtz_data.columns),
-                "SIGI",
-                flumpy.to_numpy(flex.sqrt(V_sum)).astype("float32"),
-            )
+            add_column("I", type_table["I"], I_sum)
+            add_column("SIGI", type_table["SIGI"], V_sum, np.sqrt)
 
     if (
         "background.sum.value" in reflection_table
@@ -477,61 +447,36 @@ def write_columns(mtz, reflection_table):
         bg = reflection_table["background.sum.value"]
         varbg = reflection_table["background.sum.variance"]
         assert (varbg >= 0).count(False) == 0
-        sigbg = flex.sqrt(varbg)
-        mtz.add_column("BG", type_table["BG"])
-        mtz_data.insert(
-            len(mtz_data.columns), "BG", flumpy.to_numpy(bg).astype("float32")
-        )
-        mtz.add_column("SIGBG", type_table["SIGBG"])
-        mtz_data.insert(
-            len(mtz_data.columns), "SIGBG", flumpy.to_numpy(sigbg).astype("float32")
-        )
+        add_column("BG", type_table["BG"], bg)
+        add_column("SIGBG", type_table["SIGBG"], varbg, np.sqrt)
 
-    mtz.add_column("FRACTIONCALC", type_table["FRACTIONCALC"])
-    mtz_data.insert(
-        len(mtz_data.columns),
-        "FRACTIONCALC",
-        flumpy.to_numpy(reflection_table["fractioncalc"]).astype("float32"),
-    )
-
-    mtz.add_column("XDET", type_table["XDET"])
-    mtz_data.insert(
-        len(mtz_data.columns), "XDET", flumpy.to_numpy(xdet).astype("float32")
-    )
-    mtz.add_column("YDET", type_table["YDET"])
-    mtz_data.insert(
-        len(mtz_data.columns), "YDET", flumpy.to_numpy(ydet).astype("float32")
-    )
-    mtz.add_column("ROT", type_table["ROT"])
-    mtz_data.insert(
-        len(mtz_data.columns),
-        "ROT",
-        flumpy.to_numpy(reflection_table["ROT"]).astype("float32"),
+    add_column(
+        "FRACTIONCALC", type_table["FRACTIONCALC"], reflection_table["fractioncalc"]
     )
+    add_column("XDET", type_table["XDET"], xyzobs[:, 0])
+    add_column("YDET", type_table["YDET"], xyzobs[:, 1])
+    add_column("ROT", type_table["ROT"], reflection_table["ROT"])
     if "lp" in reflection_table:
-        mtz.add_column("LP", type_table["LP"])
-        mtz_data.insert(
-            len(mtz_data.columns),
-            "LP",
-            flumpy.to_numpy(reflection_table["lp"]).astype("float32"),
-        )
+        add_column("LP", type_table["LP"], reflection_table["lp"])
     if "qe" in reflection_table:
-        mtz.add_column("QE", type_table["QE"])
-        mtz_data.insert(
-            len(mtz_data.columns),
-            "QE",
-            flumpy.to_numpy(reflection_table["qe"]).astype("float32"),
-        )
+        add_column("QE", type_table["QE"], reflection_table["qe"])
     elif "dqe" in reflection_table:
-        mtz.add_column("QE", type_table["QE"])
-        mtz_data.insert(
-            len(mtz_data.columns),
-            "QE",
-            flumpy.to_numpy(reflection_table["dqe"]).astype("float32"),
-        )
+        add_column("QE", type_table["QE"], reflection_table["dqe"])
     else:
-        mtz.add_column("QE", type_table["QE"])
-        mtz_data.insert(len(mtz_data.columns), "QE", np.ones(nref).astype("float32"))
+        add_column("QE", type_table["QE"], 1.0)
+
+    miller_indices = flumpy.to_numpy(reflection_table["miller_index"])
+    mtz_data = np.empty((nref, len(columns) + 3), dtype=np.float32)
+    for start in range(0, nref, chunk_size):
+        rows = slice(start, min(start + chunk_size, nref))
+        mtz_data[rows, 0:3] = miller_indices[rows]
+        for i, (values, transform) in enumerate(columns, start=3):
+            if np.isscalar(values):
+                mtz_data[rows, i] = values
+            elif transform is not None:
+                mtz_data[rows, i] = transform(values[rows])
+            else:
+                mtz_data[rows, i] = values[rows]
 
     mtz.switch_to_original_hkl()
     mtz.set_data(mtz_data)
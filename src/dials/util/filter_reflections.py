@@ -44,10 +44,12 @@
 from __future__ import annotations
 
 import logging
-from collections import defaultdict
 from typing import Any, List, Type
 
+import numpy as np
+
 from cctbx import crystal, miller
+from dxtbx import flumpy
 
 from dials.algorithms.scaling.outlier_rejection import reject_outliers
 from dials.array_family import flex
@@ -820,136 +822,158 @@ def sum_partial_reflections(reflection_table):
 
     for intensity in intensities:
         sel = sel & (reflection_table["intensity." + intensity + ".variance"] > 0)
-    isel = sel.iselection()
-
-    # create map of partial_id to reflections
-    delete = flex.size_t()
-    partial_map = defaultdict(list)
-    for j in isel:
-        partial_map[reflection_table["partial_id"][j]].append(j)
-
-    # now work through this map - get total partiality for every reflection;
-    # here only consider reflections with > 1 component;
-    partial_ids = []
-    for p_id in partial_map:
-        if len(partial_map[p_id]) > 1:
-            partial_ids.append(p_id)
-
-    header = ["Partial id", "Partiality"]
-    for i in intensities:
-        header.extend([str(i) + " intensity", str(i) + " variance"])
-    rows = []
-
-    # Now loop through 'matched' partials, summing and then deleting before return
-    for p_id in partial_ids:
-        j = partial_map[p_id]
-        for i in j:
-            data = [str(p_id), str(reflection_table["partiality"][i])]
-            for intensity in intensities:
-                data.extend(
-                    [
-                        str(reflection_table["intensity." + intensity + ".value"][i]),
-                        str(
-                            reflection_table["intensity." + intensity + ".variance"][i]
-                        ),
-                    ]
-                )
-            rows.append(data)
-
-        # do the summing of the partiality values separately to allow looping
-        # over multiple times
-        total_partiality = sum(reflection_table["partiality"][i] for i in j)
-        if "prf" in intensities:
-            reflection_table = _sum_prf_partials(reflection_table, j)
-        if "sum" in intensities:
-            reflection_table = _sum_sum_partials(reflection_table, j)
-        if "scale" in intensities:
-            reflection_table = _sum_scale_partials(reflection_table, j)
-        # FIXME now that the partials have been summed, should fractioncalc be set
-        # to one (except for summation case?)
-        reflection_table["partiality"][j[0]] = total_partiality
-        delete.extend(flex.size_t(j[1:]))
-        data = ["combined " + str(p_id), str(total_partiality)]
-        for intensity in intensities:
-            data.extend(
-                [
-                    str(reflection_table["intensity." + intensity + ".value"][j[0]]),
-                    str(reflection_table["intensity." + intensity + ".variance"][j[0]]),
-                ]
-            )
-        rows.append(data)
-    reflection_table.del_selected(delete)
+    isel = flumpy.to_numpy(sel.iselection())
+    if not isel.size:
+        return reflection_table
+
+    # group the partials by partial_id with a single sort, keeping the
+    # reflections within each group in their original order
+    partial_id = flumpy.to_numpy(reflection_table["partial_id"])[isel]
+    perm = np.argsort(partial_id, kind="stable")
+    isel = isel[perm]
+    partial_id = partial_id[perm]
+    starts = np.flatnonzero(np.r_[True, partial_id[1:] != partial_id[:-1]])
+    counts = np.diff(np.append(starts, isel.size))
+
+    # only consider reflections with > 1 component
+    multiple = counts > 1
+    if not multiple.any():
+        return reflection_table
+    isel = isel[np.repeat(multiple, counts)]
+    counts = counts[multiple]
+    starts = np.cumsum(counts) - counts
+    first = flumpy.from_numpy(isel[starts].astype(np.uint64))
+
+    # Formatting this table can be sloooow for large numbers of reflections, so skip
+    # this unless debug output has been requested
+    debug = logger.getEffectiveLevel() <= logging.DEBUG
+    if debug:
+        partials_rows = _partials_summary_rows(reflection_table, intensities, isel)
+
+    # Sum each group of partials into its first entry
+    total_partiality = np.add.reduceat(
+        flumpy.to_numpy(reflection_table["partiality"])[isel], starts
+    )
+    if "prf" in intensities:
+        reflection_table = _sum_prf_partials(reflection_table, isel, starts)
+    if "sum" in intensities:
+        reflection_table = _sum_sum_partials(reflection_table, isel, starts)
+    if "scale" in intensities:
+        reflection_table = _sum_scale_partials(reflection_table, isel, starts)
+    # FIXME now that the partials have been summed, should fractioncalc be set
+    # to one (except for summation case?)
+    reflection_table["partiality"].set_selected(
+        first, flumpy.from_numpy(total_partiality)
+    )
+
+    if debug:
+        header = ["Partial id", "Partiality"]
+        for i in intensities:
+            header.extend([str(i) + " intensity", str(i) + " variance"])
+        combined_rows = _partials_summary_rows(
+            reflection_table, intensities, isel[starts]
+        )
+        rows = []
+        for i0, i1, combined in zip(starts, starts + counts, combined_rows):
+            rows.extend(partials_rows[i0:i1])
+            rows.append(["combined " + combined[0]] + combined[1:])
+
+    delete = np.ones(isel.size, dtype=bool)
+    delete[starts] = False
+    reflection_table.del_selected(flumpy.from_numpy(isel[delete].astype(np.uint64)))
     if nrefl > reflection_table.size():
         logger.info(
             "Combined %s partial reflections with other partial reflections",
             nrefl - reflection_table.size(),
         )
 
-    # Formatting this table can be sloooow for large numbers of reflections, so skip
-    # this unless debug output has been requested
-    if logger.getEffectiveLevel() <= logging.DEBUG:
+    if debug:
         logger.debug("\nSummary of combination of partial reflections")
         logger.debug(tabulate(rows, header))
     return reflection_table
 
 
+def _partials_summary_rows(reflection_table, intensities, isel):
+    """Format the partial id, partiality and intensities of the selected rows."""
+    isel = flumpy.from_numpy(isel.astype(np.uint64))
+    columns = [reflection_table["partial_id"], reflection_table["partiality"]]
+    for intensity in intensities:
+        columns.append(reflection_table["intensity." + intensity + ".value"])
+        columns.append(reflection_table["intensity." + intensity + ".variance"])
+    columns = [column.select(isel) for column in columns]
+    return [[str(v) for v in row] for row in zip(*columns)]
+
+
 # FIXME what are the correct weights to use for the different cases? - why
 # weighting by (I/sig(I))^2 not just 1/variance for prf. See tests?
 
+# The functions below sum groups of partials at once. partials_isel lists the
+# indices of the partials ordered by group, and group_starts gives the offset of
+# each group in partials_isel (by default, all partials form a single group).
+# The combined value is set in the first entry of each group.
+
+
+def _partials_values(reflection_table, intensity, partials_isel, group_starts):
+    isel = np.asarray(partials_isel, dtype=np.uint64)
+    starts = np.asarray(group_starts, dtype=np.intp)
+    value = reflection_table["intensity." + intensity + ".value"]
+    variance = reflection_table["intensity." + intensity + ".variance"]
+    return (
+        flumpy.to_numpy(value)[isel],
+        flumpy.to_numpy(variance)[isel],
+        starts,
+        flumpy.from_numpy(isel[starts]),
+    )
 
-def _sum_prf_partials(reflection_table, partials_isel_for_pid):
-    """Sum prf partials and set the updated value in the first entry."""
-    j = partials_isel_for_pid
-    value = reflection_table["intensity.prf.value"][j[0]]
-    variance = reflection_table["intensity.prf.variance"][j[0]]
-    weight = value * value / variance
-    value *= weight
-    variance *= weight
-    total_weight = weight
-    for i in j[1:]:
-        _value = reflection_table["intensity.prf.value"][i]
-        _variance = reflection_table["intensity.prf.variance"][i]
-        _weight = _value * _value / _variance
-        value += _weight * _value
-        variance += _weight * _variance
-        total_weight += _weight
-    # now write these back into original reflection
-    if total_weight:
-        reflection_table["intensity.prf.value"][j[0]] = value / total_weight
-        reflection_table["intensity.prf.variance"][j[0]] = variance / total_weight
-    else:
-        variance = sum(reflection_table["intensity.prf.variance"][_j] for _j in j)
-        reflection_table["intensity.prf.value"][j[0]] = 0
-        reflection_table["intensity.prf.variance"][j[0]] = variance
+
+def _set_partials_values(reflection_table, intensity, first, value, variance):
+    reflection_table["intensity." + intensity + ".value"].set_selected(
+        first, flumpy.from_numpy(np.ascontiguousarray(value, dtype=np.float64))
+    )
+    reflection_table["intensity." + intensity + ".variance"].set_selected(
+        first, flumpy.from_numpy(np.ascontiguousarray(variance, dtype=np.float64))
+    )
     return reflection_table
 
 
-def _sum_sum_partials(reflection_table, partials_isel_for_pid):
+def _sum_prf_partials(reflection_table, partials_isel, group_starts=(0,)):
+    """Sum prf partials and set the updated value in the first entry."""
+    value, variance, starts, first = _partials_values(
+        reflection_table, "prf", partials_isel, group_starts
+    )
+    weight = value * value / variance
+    total_weight = np.add.reduceat(weight, starts)
+    total_variance = np.add.reduceat(variance, starts)
+    value = np.add.reduceat(weight * value, starts)
+    variance = np.add.reduceat(weight * variance, starts)
+    # where the total weight is zero, set the value to zero and sum the variances
+    weighted = total_weight != 0
+    divisor = np.where(weighted, total_weight, 1.0)
+    value = np.where(weighted, value / divisor, 0.0)
+    variance = np.where(weighted, variance / divisor, total_variance)
+    return _set_partials_values(reflection_table, "prf", first, value, variance)
+
+
+def _sum_sum_partials(reflection_table, partials_isel, group_starts=(0,)):
     """Sum sum partials and set the updated value in the first entry."""
-    j = partials_isel_for_pid
-    value = reflection_table["intensity.sum.value"][j[0]]
-    variance = reflection_table["intensity.sum.variance"][j[0]]
-    for i in j[1:]:
-        value += reflection_table["intensity.sum.value"][i]
-        variance += reflection_table["intensity.sum.variance"][i]
-    reflection_table["intensity.sum.value"][j[0]] = value
-    reflection_table["intensity.sum.variance"][j[0]] = variance
-    return reflection_table
+    value, variance, starts, first = _partials_values(
+        reflection_table, "sum", partials_isel, group_starts
+    )
+    value = np.add.reduceat(value, starts)
+    variance = np.add.reduceat(variance, starts)
+    return _set_partials_values(reflection_table, "sum", first, value, variance)
 
 
-def _sum_scale_partials(reflection_table, partials_isel_for_pid):
+def _sum_scale_partials(reflection_table, partials_isel, group_starts=(0,)):
     """Sum scale partials and set the updated value in the first entry."""
     # Weight scaled intensity partials by 1/variance. See
     # https://en.wikipedia.org/wiki/Weighted_arithmetic_mean, section
     # 'Dealing with variance'
-    j = partials_isel_for_pid
-    variance = reflection_table["intensity.scale.variance"][j[0]]
-    value = reflection_table["intensity.scale.value"][j[0]] / variance
-    total_weight = 1.0 / variance
-    for i in j[1:]:
-        _variance = reflection_table["intensity.scale.variance"][i]
-        value += reflection_table["intensity.scale.value"][i] / _variance
-        total_weight += 1.0 / _variance
-    reflection_table["intensity.scale.value"][j[0]] = value / total_weight
-    reflection_table["intensity.scale.variance"][j[0]] = 1.0 / total_weight
-    return reflection_table
+    value, variance, starts, first = _partials_values(
+        reflection_table, "scale", partials_isel, group_starts
+    )
+    total_weight = np.add.reduceat(1.0 / variance, starts)
+    value = np.add.reduceat(value / variance, starts)
+    return _set_partials_values(
+        reflection_table, "scale", first, value / total_weight, 1.0 / total_weight
+    )
@@ -390,6 +390,9 @@ def groupings(self) -> Dict[str, ParsedGrouping]:
         return self._groupings
 
     def _parse_metadata(self, metadata: dict):
+        # Share the metadata for images that refer to the same HDF5 dataset, so
+        # that each dataset is only read once.
+        metadata_in_files: dict[Tuple[str, str], MetadataInFile] = {}
         for name, metadict in metadata.items():
             # name is e.g. timepoint, metadict is image : file
             self.metadata_items[name] = ImgToMetadataDict()
@@ -435,9 +438,13 @@ def _parse_metadata(self, metadata: dict):
                                 f"Unable to understand value: {meta}, expected format file:item e.g. /data/file.h5:/entry/data/timepoint. Specific exception: {e}"
                             )
                         else:
-                            self.metadata_items[name][imgfile] = MetadataInFile(
-                                metafile, loc
-                            )
+                            if (metafile, loc) not in metadata_in_files:
+                                metadata_in_files[(metafile, loc)] = MetadataInFile(
+                                    metafile, loc
+                                )
+                            self.metadata_items[name][imgfile] = metadata_in_files[
+                                (metafile, loc)
+                            ]
                 else:
                     raise TypeError(
                         "Only float, int and string metadata items are allowed"
@@ -530,6 +537,36 @@ def __getitem__(self, key):
                 + "check that the metadata array sizes match the number of images in the nexus files"
             )
 
+    def group_ids_for(self, keys: np.array) -> np.array:
+        """Return the group ids for an array of image indices, as a uint64 array."""
+        keys = np.asarray(keys, dtype=np.int64)
+        if self.single_return_val is not None:
+            return np.full(keys.size, self.single_return_val, dtype=np.uint64)
+        elif self.key_to_group_id:
+            return np.asarray(self.key_to_group_id(keys)).astype(np.uint64)
+        group_ids = flumpy.to_numpy(self.group_ids)
+        invalid = (keys < 0) | (keys >= group_ids.size)
+        if np.any(invalid):
+            raise ValueError(
+                f"Unable to index data array of size {group_ids.size} with index {keys[invalid][0]}, \n"
+                + "check that the metadata array sizes match the number of images in the nexus files"
+            )
+        return group_ids[keys].astype(np.uint64)
+
+
+def _group_ids_for_images(
+    images: List[str], keys: List[int], img_idx_to_group_id: Dict[str, _ImgIdxToGroupId]
+) -> np.array:
+    """Look up the group ids of images, given by image file or template and
+    image index, with one array lookup per image file or template."""
+    images = np.array(images)
+    keys = np.array(keys, dtype=np.int64)
+    groups_array = np.zeros(keys.size, dtype=np.uint64)
+    for image in np.unique(images):
+        sel = images == image
+        groups_array[sel] = img_idx_to_group_id[image].group_ids_for(keys[sel])
+    return groups_array
+
 
 class _GroupInfo(TypedDict):
     group_ids: List[int]
@@ -643,6 +680,15 @@ class SplittingIterable(object):
     params: Optional[Any] = None
 
 
+@dataclass
+class _FileSplittingIterable(object):
+    working_directory: Path
+    fp: FilePair
+    fileindex: int
+    groupnames: Dict[int, str]  # the names of the groups in this file, by index
+    groupdata: GroupsForExpt
+
+
 def save_subset(input_: SplittingIterable) -> Optional[Tuple[str, FilePair]]:
     expts = load.experiment_list(input_.fp.expt, check_format=False)
     refls = flex.reflection_table.from_file(input_.fp.refl)
@@ -674,6 +720,36 @@ def save_subset(input_: SplittingIterable) -> Optional[Tuple[str, FilePair]]:
     return None
 
 
+def _save_subsets(input_: _FileSplittingIterable) -> List[Tuple[str, FilePair]]:
+    """Split a pair of files into all of its groups, reading the files once."""
+    expts = load.experiment_list(input_.fp.expt, check_format=False)
+    refls = flex.reflection_table.from_file(input_.fp.refl)
+    groupdata = input_.groupdata
+    results = []
+    for groupindex, name in input_.groupnames.items():
+        if groupdata.single_group is not None:
+            group_expts = expts
+            group_refls = refls
+        else:
+            sel = groupdata.groups_array == groupindex
+            group_expts = ExperimentList([expts[i] for i in np.flatnonzero(sel)])
+            group_refls = refls.select_on_experiment_identifiers(
+                list(group_expts.identifiers())
+            )
+            group_refls.reset_ids()
+        if group_expts:
+            exptout = (
+                input_.working_directory / f"group_{groupindex}_{input_.fileindex}.expt"
+            )
+            reflout = (
+                input_.working_directory / f"group_{groupindex}_{input_.fileindex}.refl"
+            )
+            group_expts.as_file(exptout)
+            group_refls.as_file(reflout)
+            results.append((name, FilePair(exptout, reflout)))
+    return results
+
+
 class GroupingImageTemplates(object):
     """Class that takes a parsed group and determines the groupings and mappings
     required to split input data into groups.
@@ -777,34 +853,33 @@ def _get_expt_file_to_groupsdata(self, data_file_pairs: List[FilePair]):
                 else:
                     # the image goes to several groups, we just need to know the groups
                     # relevant for these images
-                    groups_for_this = []
+                    keys = []
                     for expt in expts:
                         if expt.scan:
-                            start = expt.scan.get_image_range()[0]
-                            groups_for_this.append(group_indices[start])
+                            keys.append(expt.scan.get_image_range()[0])
                         else:
                             p = expt.imageset.paths()[0]
-                            t = template_regex(p)
-                            groups_for_this.append(group_indices[t[1]])
-                    groupdata.groups_array = np.array(groups_for_this, dtype=np.uint64)
-                    groupdata.unique_group_numbers = set(groupdata.groups_array)
+                            keys.append(template_regex(p)[1])
+                    groupdata.groups_array = group_indices.group_ids_for(keys)
+                    groupdata.unique_group_numbers = set(
+                        np.unique(groupdata.groups_array)
+                    )
             else:
                 # the expt list contains data from more than one image/template
-                groups_for_this = []
+                templates = []
+                keys = []
                 for expt in expts:
+                    p = expt.imageset.paths()[0]
+                    t = template_regex(p)
+                    templates.append(t[0])
                     if expt.scan:
-                        p = expt.imageset.paths()[0]
-                        t = template_regex(p)
-                        group_indices = template_to_group_indices[t[0]]
-                        start = expt.scan.get_image_range()[0]
-                        groups_for_this.append(group_indices[start])
+                        keys.append(expt.scan.get_image_range()[0])
                     else:
-                        p = expt.imageset.paths()[0]
-                        t = template_regex(p)
-                        group_indices = template_to_group_indices[t[0]]
-                        groups_for_this.append(group_indices[t[1]])
-                groupdata.groups_array = np.array(groups_for_this, dtype=np.uint64)
-                groupdata.unique_group_numbers = set(groupdata.groups_array)
+                        keys.append(t[1])
+                groupdata.groups_array = _group_ids_for_images(
+                    templates, keys, template_to_group_indices
+                )
+                groupdata.unique_group_numbers = set(np.unique(groupdata.groups_array))
             expt_file_to_groupsdata[fp.expt] = groupdata
         return expt_file_to_groupsdata
 
@@ -825,16 +900,22 @@ def set_group_id_column(
                 group_id = groupdata.single_group
                 refls["group_id"] = flex.int(refls.size(), group_id)
             else:
-                identifiers_map = refls.experiment_identifiers()
-                list_of_identifiers: List = list(expts.identifiers())
-                groups_array = flumpy.from_numpy(groupdata.groups_array)
-
-                def table_id_to_group_id(table_id):
-                    identifier = identifiers_map[table_id]
-                    idx = list_of_identifiers.index(identifier)
-                    return groups_array[idx]
-
-                refls["group_id"] = flex.int(map(table_id_to_group_id, refls["id"]))
+                # Map the table ids to group ids through the experiment identifiers
+                identifiers_map = dict(refls.experiment_identifiers())
+                table_ids = flumpy.to_numpy(refls["id"])
+                missing = set(np.unique(table_ids).tolist()) - set(identifiers_map)
+                assert not missing, f"No experiment identifiers for ids {sorted(missing)}: {filepair.refl}"
+                expt_index = {
+                    identifier: i for i, identifier in enumerate(expts.identifiers())
+                }
+                table_id_to_group_id = np.zeros(
+                    max(identifiers_map, default=-1) + 1, dtype=np.int32
+                )
+                for table_id, identifier in identifiers_map.items():
+                    table_id_to_group_id[table_id] = groupdata.groups_array[
+                        expt_index[identifier]
+                    ]
+                refls["group_id"] = flumpy.from_numpy(table_id_to_group_id[table_ids])
 
             refls.as_file(filepair.refl)
             return filepair
@@ -868,6 +949,29 @@ def split_files_to_groups(
         ]
         filesdict: dict[str, List[FilePair]] = {name: [] for name in names}
 
+        if function_to_apply is save_subset:
+            # Read each pair of files once, and write all of its groups
+            file_iterable = []
+            for fileindex, fp in enumerate(data_file_pairs):
+                groupdata = expt_file_to_groupsdata[fp.expt]
+                groupnames = {
+                    groupindex: name
+                    for groupindex, name in enumerate(names)
+                    if groupindex in groupdata.unique_group_numbers
+                }
+                if groupnames:
+                    file_iterable.append(
+                        _FileSplittingIterable(
+                            working_directory, fp, fileindex, groupnames, groupdata
+                        )
+                    )
+            if file_iterable:
+                with Pool(min(self.nproc, len(file_iterable))) as pool:
+                    for results in pool.imap(_save_subsets, file_iterable):
+                        for name, fp in results:
+                            filesdict[name].append(fp)
+            return filesdict
+
         input_iterable = []
         for groupindex, name in enumerate(names):
             for fileindex, fp in enumerate(data_file_pairs):
@@ -1002,22 +1106,27 @@ def _get_expt_file_to_groupsdata(self, data_file_pairs: List[FilePair]):
                     ]  # all data from this expt goes to a single group
                     groupdata.unique_group_numbers = set(group_info["group_ids"])
                 else:  # one h5 image, but more than one group
-                    groups_for_this = []
                     group_indices = group_info["img_idx_to_group_id"]
-                    for expt in expts:
-                        index = expt.imageset.indices()[0]
-                        idx = group_indices[index]
-                        groups_for_this.append(idx)
-                    groupdata.groups_array = np.array(groups_for_this, dtype=np.uint64)
-                    groupdata.unique_group_numbers = set(groupdata.groups_array)
+                    keys = [expt.imageset.indices()[0] for expt in expts]
+                    groupdata.groups_array = group_indices.group_ids_for(keys)
+                    groupdata.unique_group_numbers = set(
+                        np.unique(groupdata.groups_array)
+                    )
             else:  # multiple h5 images
-                groups_for_this = []
+                imgs = []
+                keys = []
                 for expt in expts:
-                    img, index = expt.imageset.paths()[0], expt.imageset.indices()[0]
-                    idx = image_to_group_info[img]["img_idx_to_group_id"][index]
-                    groups_for_this.append(idx)
-                groupdata.groups_array = np.array(groups_for_this, dtype=np.uint64)
-                groupdata.unique_group_numbers = set(groupdata.groups_array)
+                    imgs.append(expt.imageset.paths()[0])
+                    keys.append(expt.imageset.indices()[0])
+                groupdata.groups_array = _group_ids_for_images(
+                    imgs,
+                    keys,
+                    {
+                        img: info["img_idx_to_group_id"]
+                        for img, info in image_to_group_info.items()
+                    },
+                )
+                groupdata.unique_group_numbers = set(np.unique(groupdata.groups_array))
 
             expt_file_to_groupsdata[fp.expt] = groupdata
         return expt_file_to_groupsdata
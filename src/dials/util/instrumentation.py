@@ -0,0 +1,298 @@
+"""
+Lightweight instrumentation of the time and memory spent in DIALS.
+
+Named spans time regions of code, which may be nested, and named counters
+accumulate numbers of events or items. Nothing is recorded unless the
+instrumentation is enabled, so that instrumenting the hot paths costs no
+more than a function call otherwise. Every command that parses its arguments
+with dials.util.options.ArgumentParser accepts the PHIL parameters
+
+    instrumentation.enable=True instrumentation.trace=dials.trace.json
+
+to enable the instrumentation and write the record at exit as a JSON trace in
+the Chrome trace event format, which can be viewed with chrome://tracing or
+https://ui.perfetto.dev. A summary of the total time per span is logged at
+debug level.
+
+The record is per process. Other processes started from an instrumented
+process are not instrumented, except for the workers running the functions
+mapped by dials.util.mp: these start with an empty record, and return it to
+the parent process, where it is merged.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import functools
+import json
+import logging
+import os
+import platform
+import threading
+import time
+from collections import defaultdict
+
+from libtbx.phil import parse
+
+from dials.util import tabulate
+
+logger = logging.getLogger(__name__)
+
+phil_scope = parse(
+    """
+instrumentation
+  .expert_level = 3
+{
+  enable = False
+    .type = bool
+    .help = "Record the time spent in the instrumented parts of the program,"
+            "and the peak memory usage."
+  trace = dials.trace.json
+    .type = path
+    .help = "The file to write the record to at exit, in the Chrome trace"
+            "event format."
+}
+"""
+)
+
+
+def _peak_memory_mb():
+    """The peak resident memory of the process in MB, if known."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # getrusage returns kb on linux, bytes on mac
+    units_per_mb = 1024 * 1024 if platform.system() == "Darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / units_per_mb
+
+
+class _Recorder:
+    """The record of the spans, counters and memory samples of a process."""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reset()
+
+    def _forked(self):
+        # A forked process is only instrumented if it is a worker wrapped with
+        # collecting(), which enables the instrumentation again
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.events = []
+        self.counters = defaultdict(float)
+
+    def _check_pid(self):
+        # Discard any record inherited by a forked process
+        if os.getpid() != self.pid:
+            self._reset()
+
+    def stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def add_event(self, event):
+        with self._lock:
+            self._check_pid()
+            self.events.append(event)
+
+    def add_count(self, name, value):
+        with self._lock:
+            self._check_pid()
+            self.counters[name] += value
+
+    def collect(self):
+        with self._lock:
+            self._check_pid()
+            collected = {"events": self.events, "counters": dict(self.counters)}
+            self._reset()
+        return collected
+
+    def merge(self, collected):
+        with self._lock:
+            self._check_pid()
+            self.events.extend(collected["events"])
+            for name, value in collected["counters"].items():
+                self.counters[name] += value
+
+
+_recorder = _Recorder()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_recorder._forked)
+
+
+def enable(trace=None):
+    """
+    Enable the instrumentation in this process.
+
+    :param trace: If set, the file to write the trace to at exit
+    """
+    _recorder.enabled = True
+    if trace:
+        atexit.register(_finish, trace, os.getpid())
+
+
+def disable():
+    """Disable the instrumentation."""
+    _recorder.enabled = False
+
+
+def is_enabled():
+    """Whether the instrumentation is enabled."""
+    return _recorder.enabled
+
+
+def configure(params):
+    """Enable the instrumentation if requested by the instrumentation PHIL."""
+    if params.instrumentation.enable and not is_enabled():
+        enable(trace=params.instrumentation.trace)
+
+
+@contextlib.contextmanager
+def span(name, **args):
+    """
+    Time the enclosed block of code as a span with the given name.
+
+    Spans may be nested, and the names of the enclosing spans are recorded.
+    Any keyword arguments are recorded with the span.
+    """
+    if not _recorder.enabled:
+        yield
+        return
+    stack = _recorder.stack()
+    stack.append(name)
+    timestamp = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        _recorder.add_event(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": timestamp * 1e6,
+                "dur": duration * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": dict(args, path="/".join(stack + [name])),
+            }
+        )
+
+
+def timed(name=None):
+    """A decorator to time each call of a function as a span."""
+
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, value=1):
+    """Add value to the counter with the given name."""
+    if _recorder.enabled:
+        _recorder.add_count(name, value)
+
+
+def sample_memory():
+    """Record the peak resident memory of the process so far."""
+    if not _recorder.enabled:
+        return
+    peak = _peak_memory_mb()
+    if peak is not None:
+        _recorder.add_event(
+            {
+                "name": "memory",
+                "ph": "C",
+                "ts": time.time() * 1e6,
+                "pid": os.getpid(),
+                "args": {"peak_rss_mb": peak},
+            }
+        )
+
+
+def collect():
+    """Remove and return the record of this process, to be merged elsewhere."""
+    sample_memory()
+    return _recorder.collect()
+
+
+def merge(collected):
+    """Merge the record collected from another process into this process."""
+    _recorder.merge(collected)
+
+
+class _Collecting:
+    """A picklable wrapper of a function, which instruments the process calling
+    it and also returns the record of that process."""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        _recorder.enabled = True
+        return self.func(*args, **kwargs), collect()
+
+
+def collecting(func):
+    """
+    Wrap a function to be called in another process, so that the process is
+    instrumented and the function returns a tuple of its result and the record
+    of that process, to pass to merge.
+    """
+    return _Collecting(func)
+
+
+def summary():
+    """A table of the total time and number of calls of each span, by path."""
+    totals = defaultdict(lambda: [0, 0.0])
+    for event in _recorder.events:
+        if event["ph"] == "X":
+            total = totals[event["args"]["path"]]
+            total[0] += 1
+            total[1] += event["dur"] / 1e6
+    rows = [
+        (path, str(n), f"{seconds:.3f}")
+        for path, (n, seconds) in sorted(totals.items(), key=lambda x: -x[1][1])
+    ]
+    rows.extend((name, f"{value:g}", "") for name, value in _recorder.counters.items())
+    return tabulate(rows, ["Span or counter", "Count", "Time (s)"])
+
+
+def write_trace(filename):
+    """Write the record as a JSON trace in the Chrome trace event format."""
+    sample_memory()
+    trace = {
+        "traceEvents": _recorder.events,
+        "displayTimeUnit": "ms",
+        "otherData": {"counters": dict(_recorder.counters)},
+    }
+    with open(filename, "w") as f:
+        json.dump(trace, f)
+
+
+def _finish(filename, pid):
+    if os.getpid() != pid:
+        # Only the process that enabled the instrumentation writes the trace
+        return
+    logger.debug("Instrumentation summary:\n%s", summary())
+    logger.info("Writing instrumentation trace to %s", filename)
+    write_trace(filename)
@@ -5,6 +5,8 @@
 
 import libtbx.easy_mp
 
+from dials.util import instrumentation
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,6 +58,22 @@ def __call__(self, iterable):
         return [self.__function(item) for item in iterable]
 
 
+class _merging_callback:
+    """
+    Merge the instrumentation record returned by a worker before calling the
+    callback with the result.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __call__(self, result):
+        result, collected = result
+        instrumentation.merge(collected)
+        if self.callback is not None:
+            self.callback(result)
+
+
 def multi_node_parallel_map(
     func,
     iterable,
@@ -71,6 +89,12 @@ def multi_node_parallel_map(
     multiple processors on each node
     """
 
+    # Return the instrumentation record of each call to this process
+    instrumented = instrumentation.is_enabled()
+    if instrumented:
+        func = instrumentation.collecting(func)
+        callback = _merging_callback(callback)
+
     # The function to all on the cluster
     cluster_func = __cluster_function_wrapper(
         func=func,
@@ -117,7 +141,10 @@ def multi_node_parallel_map(
         )
 
     # return result
-    return [item for rlist in result for item in rlist]
+    result = [item for rlist in result for item in rlist]
+    if instrumented:
+        result = [item for item, _ in result]
+    return result
 
 
 def batch_multi_node_parallel_map(
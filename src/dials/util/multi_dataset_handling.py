@@ -5,12 +5,13 @@
 
 from __future__ import annotations
 
-import copy
 import logging
 
+import numpy as np
 from orderedset import OrderedSet
 
 import iotbx.phil
+from dxtbx import flumpy
 from dxtbx.util import ersatz_uuid4
 
 from dials.array_family import flex
@@ -103,6 +104,24 @@ def sort_tables_to_experiments_order(reflection_tables, experiments):
     return reflection_tables
 
 
+def _split_indices_by_id(ids):
+    """Split the row indices of a table by the value of its id column.
+
+    The rows are grouped with a single stable sort of the ids, rather than a
+    selection per id value.
+
+    Args:
+        ids: A numpy array of the id values
+
+    Returns:
+        (tuple): The sorted unique id values, and a list of the (ascending) row
+            indices for each.
+    """
+    perm = np.argsort(ids, kind="stable")
+    unique_ids, starts = np.unique(ids[perm], return_index=True)
+    return unique_ids, np.split(perm, starts[1:])
+
+
 def renumber_table_id_columns(reflection_tables):
     """Renumber the id columns in the tables from 0..n-1
     If set, the experiment identifiers mapping is updated.
@@ -118,21 +137,23 @@ def renumber_table_id_columns(reflection_tables):
     for table in reflection_tables:
         if not table:
             continue
-        table_id_values = sorted(set(table["id"]).difference({-1}), reverse=True)
-        highest_new_id = new_id_ + len(table_id_values) - 1
+        orig_id = flumpy.to_numpy(table["id"])
+        indexed = np.flatnonzero(orig_id != -1)
+        table_id_values, new_id_values = np.unique(
+            orig_id[indexed], return_inverse=True
+        )
         expt_ids_dict = table.experiment_identifiers()
         new_ids_dict = {}
-        new_id_ = highest_new_id
-        orig_id = copy.deepcopy(table["id"])
-        for val in table_id_values:
-            sel = orig_id == val
+        for new_id, val in enumerate(table_id_values.tolist(), start=new_id_):
             if val in expt_ids_dict:
                 # only delete here, add new at end to avoid clashes of new/old ids
-                new_ids_dict[new_id_] = expt_ids_dict[val]
+                new_ids_dict[new_id] = expt_ids_dict[val]
                 del expt_ids_dict[val]
-            table["id"].set_selected(sel.iselection(), new_id_)
-            new_id_ -= 1
-        new_id_ = highest_new_id + 1
+        table["id"].set_selected(
+            flumpy.from_numpy(indexed.astype(np.uint64)),
+            flumpy.from_numpy((new_id_values + new_id_).astype(np.int32)),
+        )
+        new_id_ += len(table_id_values)
         if new_ids_dict:
             for i, v in new_ids_dict.items():
                 expt_ids_dict[i] = v
@@ -156,20 +177,22 @@ def parse_multiple_datasets(reflections):
     single_reflection_tables = []
     dataset_id_list = []
     for refl_table in reflections:
-        dataset_ids = set(refl_table["id"]).difference({-1})
-        dataset_id_list.extend(list(dataset_ids))
+        unique_ids, indices = _split_indices_by_id(flumpy.to_numpy(refl_table["id"]))
+        dataset_ids = [
+            (id_, isel) for id_, isel in zip(unique_ids.tolist(), indices) if id_ != -1
+        ]
+        dataset_id_list.extend(id_ for id_, _ in dataset_ids)
         if len(dataset_ids) > 1:
             logger.info(
                 "Detected existence of a multi-dataset reflection table \n"
                 "containing %s datasets. \n",
                 len(dataset_ids),
             )
-            # FIXME fix split_by_experiment_id so that don't need to filter
-            # unindxeded reflections here to get rid of id = -1
-            if -1 in refl_table["id"]:
-                refl_table = refl_table.select(refl_table["id"] != -1)
-            result = refl_table.split_by_experiment_id()
-            single_reflection_tables.extend(result)
+            # Split by id, dropping unindexed reflections with id = -1
+            single_reflection_tables.extend(
+                refl_table.select(flumpy.from_numpy(isel.astype(np.uint64)))
+                for _, isel in dataset_ids
+            )
         else:
             single_reflection_tables.append(refl_table)
     if len(dataset_id_list) != len(set(dataset_id_list)):  # need to reset some ids
@@ -392,7 +415,7 @@ def update_imageset_ids(experiments, reflections):
     imagesets_found = OrderedSet()
     for expt, table in zip(experiments, reflections):
         if "imageset_id" in table:
-            assert len(set(table["imageset_id"])) == 1
+            assert len(np.unique(flumpy.to_numpy(table["imageset_id"]))) == 1
         iset = expt.imageset
         if iset not in imagesets_found:
             imagesets_found.add(iset)
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import copy
 import itertools
 import logging
 import os
 import pickle
+import struct
 import sys
+import threading
 import traceback
 import warnings
 from collections import defaultdict, namedtuple
@@ -15,17 +18,18 @@
 from orderedset import OrderedSet
 
 import libtbx.phil
+import libtbx.smart_open
 from dxtbx.model import ExperimentList
 from dxtbx.model.experiment_list import ExperimentListFactory
 from dxtbx.util import get_url_scheme
 
 from dials.array_family import flex
-from dials.util import Sorry
+from dials.util import Sorry, instrumentation
 from dials.util.multi_dataset_handling import (
     renumber_table_id_columns,
     sort_tables_to_experiments_order,
 )
-from dials.util.phil import FilenameDataWrapper
+from dials.util.phil import FilenameDataWrapper, LazyFilenameDataWrapper
 
 
 class InvalidPhilError(ValueError):
@@ -156,6 +160,204 @@ class InvalidPhilError(ValueError):
 )
 
 
+def _load_files(func, filenames, nproc=1, max_bytes=2**30):
+    """
+    Apply func to each file name, using a pool of nproc threads.
+
+    A file is only started while the total size of the files being loaded at
+    once is within max_bytes, although a single larger file is always allowed.
+
+    :returns: The result of each call, or the exception that it raised, in order
+    """
+
+    def call(filename):
+        try:
+            return func(filename)
+        except Exception as e:
+            return e
+
+    if nproc <= 1 or len(filenames) <= 1:
+        return [call(filename) for filename in filenames]
+
+    condition = threading.Condition()
+    in_flight = 0
+
+    def task(filename):
+        nonlocal in_flight
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            size = 0
+        with condition:
+            condition.wait_for(lambda: not in_flight or in_flight + size <= max_bytes)
+            in_flight += size
+        try:
+            return call(filename)
+        finally:
+            with condition:
+                in_flight -= size
+                condition.notify_all()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=nproc) as pool:
+        return list(pool.map(task, filenames))
+
+
+class _MsgpackHeaderReader:
+    """Read the scalars, strings and container sizes at the start of a msgpack
+    stream, and skip over the values that follow without decoding them."""
+
+    def __init__(self, infile):
+        self._infile = infile
+
+    def _read(self, n):
+        data = self._infile.read(n)
+        if len(data) != n:
+            raise ValueError("Unexpected end of msgpack data")
+        return data
+
+    def _unpack(self, fmt):
+        return struct.unpack(fmt, self._read(struct.calcsize(fmt)))[0]
+
+    def _size(self, fixed_base, fixed_max, formats):
+        code = self._read(1)[0]
+        if fixed_base <= code <= fixed_max:
+            return code - fixed_base
+        if code in formats:
+            return self._unpack(formats[code])
+        raise ValueError(f"Unexpected msgpack type {code:#x}")
+
+    def array_size(self):
+        return self._size(0x90, 0x9F, {0xDC: ">H", 0xDD: ">I"})
+
+    def map_size(self):
+        return self._size(0x80, 0x8F, {0xDE: ">H", 0xDF: ">I"})
+
+    def value(self):
+        code = self._read(1)[0]
+        if code <= 0x7F:
+            return code
+        if code >= 0xE0:
+            return code - 0x100
+        if 0xA0 <= code <= 0xBF:
+            return self._read(code - 0xA0).decode()
+        if code in (0xD9, 0xDA, 0xDB):
+            return self._read(
+                self._unpack({0xD9: ">B", 0xDA: ">H", 0xDB: ">I"}[code])
+            ).decode()
+        integer_formats = {
+            0xCC: ">B",
+            0xCD: ">H",
+            0xCE: ">I",
+            0xCF: ">Q",
+            0xD0: ">b",
+            0xD1: ">h",
+            0xD2: ">i",
+            0xD3: ">q",
+        }
+        if code in integer_formats:
+            return self._unpack(integer_formats[code])
+        raise ValueError(f"Unexpected msgpack type {code:#x}")
+
+    def _seek(self, n):
+        # seek to the last byte and read it, so that truncated data are detected
+        if n:
+            self._infile.seek(n - 1, os.SEEK_CUR)
+            self._read(1)
+
+    def skip(self):
+        """Skip the next value, seeking past any string or binary data."""
+        code = self._read(1)[0]
+        if code <= 0x7F or code >= 0xE0 or code in (0xC0, 0xC2, 0xC3):
+            return
+        if 0x80 <= code <= 0x8F:
+            n_values = 2 * (code - 0x80)
+        elif 0x90 <= code <= 0x9F:
+            n_values = code - 0x90
+        elif 0xA0 <= code <= 0xBF:
+            return self._seek(code - 0xA0)
+        elif code in self._fixed_sizes:
+            return self._seek(self._fixed_sizes[code])
+        elif code in self._length_formats:
+            n = self._unpack(self._length_formats[code])
+            # extension types are followed by a type byte before the data
+            return self._seek(n + 1 if code in (0xC7, 0xC8, 0xC9) else n)
+        elif code in (0xDC, 0xDD):
+            n_values = self._unpack(">H" if code == 0xDC else ">I")
+        elif code in (0xDE, 0xDF):
+            n_values = 2 * self._unpack(">H" if code == 0xDE else ">I")
+        else:
+            raise ValueError(f"Unexpected msgpack type {code:#x}")
+        for _ in range(n_values):
+            self.skip()
+
+    # The sizes of the numbers and fixext values, after the type byte
+    _fixed_sizes = {
+        0xCA: 4,
+        0xCB: 8,
+        0xCC: 1,
+        0xCD: 2,
+        0xCE: 4,
+        0xCF: 8,
+        0xD0: 1,
+        0xD1: 2,
+        0xD2: 4,
+        0xD3: 8,
+        0xD4: 2,
+        0xD5: 3,
+        0xD6: 5,
+        0xD7: 9,
+        0xD8: 17,
+    }
+    # The formats of the lengths of the bin, ext and str values
+    _length_formats = {
+        0xC4: ">B",
+        0xC5: ">H",
+        0xC6: ">I",
+        0xC7: ">B",
+        0xC8: ">H",
+        0xC9: ">I",
+        0xD9: ">B",
+        0xDA: ">H",
+        0xDB: ">I",
+    }
+
+
+def _read_reflection_identifiers(filename):
+    """
+    Read the experiment identifiers from the header of a msgpack reflection
+    file, without reading the reflection data.
+
+    The rest of the file is skipped over value by value, so that a file that is
+    truncated or does not have the structure of a reflection file is not
+    accepted, although the column data themselves are not decoded.
+
+    :returns: A dict of experiment id to identifier, or None if the file is not
+        a complete msgpack reflection file
+    """
+    try:
+        with libtbx.smart_open.for_reading(filename, "rb") as infile:
+            reader = _MsgpackHeaderReader(infile)
+            if reader.array_size() != 3:
+                return None
+            if reader.value() != "dials::af::reflection_table":
+                return None
+            reader.value()  # version
+            n_items = reader.map_size()
+            if reader.value() != "identifiers":
+                return None
+            identifiers = {}
+            for _ in range(reader.map_size()):
+                key = reader.value()
+                identifiers[key] = reader.value()
+            for _ in range(2 * (n_items - 1)):
+                reader.skip()
+            if infile.read(1):
+                return None
+            return identifiers
+    except (OSError, ValueError):
+        return None
+
+
 class Importer:
     """A class to import the command line arguments."""
 
@@ -173,6 +375,9 @@ def __init__(
         scan_tolerance=None,
         format_kwargs=None,
         load_models=True,
+        lazy=False,
+        nproc=1,
+        max_bytes=2**30,
     ):
         """
         Parse the arguments. Populates its instance attributes in an intelligent way
@@ -193,12 +398,23 @@ def __init__(
         :param check_format: Check the format when reading images
         :param verbose: True/False print out some stuff
         :param load_models: Whether to load all models for ExperimentLists
+        :param lazy: Only read the identifiers from reflection files, deferring
+                     loading the data until first used. Experiment files are
+                     always read in full, as the identifiers can only be found
+                     by parsing the whole file.
+        :param nproc: The number of threads used to read files. Experiment
+                      files are only read in threads if check_format is False,
+                      as reading the image formats is not thread-safe.
+        :param max_bytes: The maximum total size of the files read at once
         """
 
         # Initialise output
         self.experiments = []
         self.reflections = []
         self.unhandled = args
+        self._lazy = lazy
+        self._nproc = nproc
+        self._max_bytes = max_bytes
         # Keep track of any errors whilst handling arguments
         self.handling_errors = defaultdict(list)
 
@@ -312,17 +528,22 @@ def try_read_experiments(self, args, check_format, verbose):
         """
         from dxtbx.model.experiment_list import InvalidExperimentListError
 
+        def read(argument):
+            return FilenameDataWrapper(
+                filename=argument,
+                data=ExperimentListFactory.from_json_file(
+                    argument, check_format=check_format
+                ),
+            )
+
         unhandled = []
-        for argument in args:
+        nproc = 1 if check_format else self._nproc
+        results = _load_files(read, args, nproc, self._max_bytes)
+        for argument, result in zip(args, results):
             try:
-                self.experiments.append(
-                    FilenameDataWrapper(
-                        filename=argument,
-                        data=ExperimentListFactory.from_json_file(
-                            argument, check_format=check_format
-                        ),
-                    )
-                )
+                if isinstance(result, Exception):
+                    raise result
+                self.experiments.append(result)
             except InvalidExperimentListError as e:
                 # This is a validation-related error: The file appears not to be in the correct format
                 self._handle_converter_error(
@@ -341,17 +562,27 @@ def try_read_reflections(self, args, verbose):
         :param verbose: Print verbose output
         :returns: Unhandled arguments
         """
+
+        def read(argument):
+            if not os.path.exists(argument):
+                raise Sorry(f"File {argument} does not exist")
+            if self._lazy:
+                identifiers = _read_reflection_identifiers(argument)
+                if identifiers is not None:
+                    return LazyFilenameDataWrapper(
+                        argument, flex.reflection_table.from_file, identifiers
+                    )
+            return FilenameDataWrapper(
+                filename=argument, data=flex.reflection_table.from_file(argument)
+            )
+
         unhandled = []
-        for argument in args:
+        results = _load_files(read, args, self._nproc, self._max_bytes)
+        for argument, result in zip(args, results):
             try:
-                if not os.path.exists(argument):
-                    raise Sorry(f"File {argument} does not exist")
-                self.reflections.append(
-                    FilenameDataWrapper(
-                        filename=argument,
-                        data=flex.reflection_table.from_file(argument),
-                    )
-                )
+                if isinstance(result, Exception):
+                    raise result
+                self.reflections.append(result)
             except pickle.UnpicklingError:
                 self._handle_converter_error(
                     argument,
@@ -376,6 +607,8 @@ def __init__(
         read_reflections=False,
         read_experiments_from_images=False,
         check_format=True,
+        lazy_load=False,
+        load_nproc=1,
     ):
         """
         Initialise the parser.
@@ -385,6 +618,8 @@ def __init__(
         :param read_reflections: Try to read the reflections
         :param read_experiments_from_images: Try to read the experiments from images
         :param check_format: Check the format when reading images
+        :param lazy_load: Defer loading reflection files until used
+        :param load_nproc: The number of threads used to read the files
         """
         from dials.util.phil import parse
 
@@ -399,12 +634,18 @@ def __init__(
         self._read_reflections = read_reflections
         self._read_experiments_from_images = read_experiments_from_images
         self._check_format = check_format
+        self._lazy_load = lazy_load
+        self._load_nproc = load_nproc
 
         # Adopt the input scope
         input_phil_scope = self._generate_input_scope()
         if input_phil_scope is not None:
             self.system_phil.adopt_scope(input_phil_scope)
 
+        # Adopt the instrumentation scope, common to all programs
+        if "instrumentation" not in (obj.name for obj in self.system_phil.objects):
+            self.system_phil.adopt_scope(instrumentation.phil_scope)
+
         # Set the working phil scope
         self._phil = self.system_phil.fetch(source=parse(""))
 
@@ -568,6 +809,8 @@ def _is_a_phil_file(filename):
             scan_tolerance=scan_tolerance,
             format_kwargs=format_kwargs,
             load_models=load_models,
+            lazy=self._lazy_load,
+            nproc=self._load_nproc,
         )
 
         # Grab a copy of the errors that occurred in case the caller wants them
@@ -779,6 +1022,8 @@ def __init__(
         check_format=True,
         sort_options=False,
         formatter_class=argparse.RawDescriptionHelpFormatter,
+        lazy_load=False,
+        load_nproc=1,
         **kwargs,
     ):
         """
@@ -790,6 +1035,9 @@ def __init__(
         :param read_experiments_from_images: Try to read the experiments from images
         :param check_format: Check the format when reading images
         :param sort_options: Show argument sorting options
+        :param lazy_load: Only read the identifiers of reflection files,
+                          deferring loading the data until first used
+        :param load_nproc: The number of threads used to read the files
         """
 
         # Create the phil parser
@@ -799,6 +1047,8 @@ def __init__(
             read_reflections=read_reflections,
             read_experiments_from_images=read_experiments_from_images,
             check_format=check_format,
+            lazy_load=lazy_load,
+            load_nproc=load_nproc,
         )
 
         # Initialise the option parser
@@ -881,6 +1131,7 @@ def parse_args(
             )
         except InvalidPhilError as e:
             self.error(message=f"Invalid phil parameter: {e}")
+        instrumentation.configure(params)
 
         # Print the diff phil
         if show_diff_phil:
@@ -13,6 +13,47 @@
 FilenameDataWrapper = collections.namedtuple("FilenameDataWrapper", "filename, data")
 
 
+class LazyFilenameDataWrapper:
+    """
+    A filename and data pair, where the data are only loaded on first access.
+
+    The experiment identifiers are read from the file header up front, so that
+    they are available without loading the data.
+    """
+
+    def __init__(self, filename, loader, identifiers=None):
+        """
+        :param filename: The file name
+        :param loader: A function to load the data from the file name
+        :param identifiers: The experiment identifiers in the file
+        """
+        self.filename = filename
+        self.identifiers = identifiers
+        self._loader = loader
+        self._data = None
+
+    def __repr__(self):
+        return f"LazyFilenameDataWrapper(filename={self.filename!r})"
+
+    @property
+    def loaded(self):
+        """Whether the data have been loaded."""
+        return self._loader is None
+
+    @property
+    def data(self):
+        if self._loader is not None:
+            self._data = self._loader(self.filename)
+            self._loader = None
+        return self._data
+
+    def read(self):
+        """Return the data, without keeping them if not already loaded."""
+        if self._loader is not None:
+            return self._loader(self.filename)
+        return self._data
+
+
 class ExperimentListConverters:
     """A phil converter for the experiment list class."""
 
@@ -424,3 +424,41 @@ def check_job(index):
     check_job(2)
     check_job(3)
     check_job(4)
+
+
+def test_reference_profile_cache(data, tmp_path):
+    from dials.algorithms.integration.parallel_integrator import (
+        _load_reference_profiles,
+        _save_reference_profiles,
+        reference_profile_cache_key,
+    )
+    from dials.command_line.integrate import phil_scope
+
+    params = phil_scope.extract()
+    reflections = data.reflections.copy()
+    reflections.set_flags(
+        flex.bool(len(reflections), True), reflections.flags.reference_spot
+    )
+    key = reference_profile_cache_key(data.experiments, reflections, params)
+    assert key == reference_profile_cache_key(data.experiments, reflections, params)
+
+    # output and processing options do not change the key
+    params.integration.mp.nproc = 4
+    params.profile.gaussian_rs.nproc = 4
+    params.integration.reference_profile_cache = str(tmp_path)
+    assert key == reference_profile_cache_key(data.experiments, reflections, params)
+
+    # modelling options and reference reflections do
+    params.profile.gaussian_rs.fitting.grid_size = 7
+    assert key != reference_profile_cache_key(data.experiments, reflections, params)
+    params = phil_scope.extract()
+    reflections.set_flags(
+        flex.bool(len(reflections), False), reflections.flags.reference_spot
+    )
+    assert key != reference_profile_cache_key(data.experiments, reflections, params)
+
+    filename = str(tmp_path / f"reference_profiles_{key}.pickle")
+    assert _load_reference_profiles(filename) is None
+    _save_reference_profiles(filename, data.reference)
+    assert os.listdir(tmp_path) == [f"reference_profiles_{key}.pickle"]
+    assert len(_load_reference_profiles(filename)) == len(data.reference)
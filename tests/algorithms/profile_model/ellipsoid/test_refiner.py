@@ -26,6 +26,7 @@
     Simple6MosaicityParameterisation,
 )
 from dials.algorithms.profile_model.ellipsoid.refiner import (
+    MaximumLikelihoodTarget,
     Refiner,
     RefinerData,
     ReflectionLikelihood,
@@ -463,6 +464,69 @@ def f(x):
     )
 
 
+@pytest.mark.parametrize(
+    "parameterisation",
+    [
+        Simple6ProfileModel.from_sigma_d(0.02**2).parameterisation(),
+        Simple1Angular1MosaicityParameterisation(np.array([0.01, 0.002])),
+        Simple6Angular3MosaicityParameterisation(
+            np.array([0.01, 0.005, 0.02, 0.015, 0.03, 0.025, 0.002, 0.001, 0.003])
+        ),
+    ],
+    ids=["Simple6", "Simple1Angular1", "Simple6Angular3"],
+)
+def test_MaximumLikelihoodTarget(testdata, refinerdata_testdata, parameterisation):
+    experiment = testdata.experiment
+    data = refinerdata_testdata
+
+    state = ModelState(
+        experiment, copy.deepcopy(parameterisation), fix_wavelength_spread=True
+    )
+
+    target = MaximumLikelihoodTarget(
+        state,
+        data.s0,
+        data.sp_list,
+        data.h_list,
+        data.ctot_list,
+        data.mobs_list,
+        data.sobs_list,
+        data.panel_ids,
+    )
+    reflections = [
+        ReflectionLikelihood(
+            state,
+            data.s0,
+            data.sp_list[:, i],
+            matrix.col(data.h_list[i]),
+            data.ctot_list[i],
+            data.mobs_list[:, i],
+            data.sobs_list[:, :, i],
+        )
+        for i in range(len(data.h_list))
+    ]
+
+    # Perturb the model and check the batched target matches the sum of the
+    # per-reflection likelihoods
+    parameters = state.active_parameters
+    state.active_parameters = parameters * 1.01
+    target.update()
+    for r in reflections:
+        r.modelstate.update()
+        r.update()
+
+    assert target.log_likelihood() == pytest.approx(
+        sum(r.log_likelihood() for r in reflections)
+    )
+    dL = sum(r.first_derivatives() for r in reflections)
+    assert list(target.first_derivatives()) == pytest.approx(list(dL))
+    I = sum(r.fisher_information() for r in reflections)
+    assert list(target.fisher_information()) == pytest.approx(list(I))
+    J = target.jacobian()
+    assert J.all() == (len(reflections), len(parameters))
+    assert list(J[0:1, :]) == pytest.approx(list(reflections[0].first_derivatives()))
+
+
 def test_Refiner(testdata, refinerdata_testdata):
     experiment = testdata.experiment
     data = refinerdata_testdata
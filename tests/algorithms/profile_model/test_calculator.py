@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+import numpy as np
+import pytest
+
 from dials.algorithms.profile_model.gaussian_rs.calculator import (
+    _convolve,
+    _gaussian_kernel,
     _select_reflections_for_sigma_calc,
 )
 from dials.array_family import flex
@@ -40,3 +45,17 @@ def test_select_reflections_for_sigma_calc():
     )
     assert reflections.size() > 700
     assert reflections.size() < 1000
+
+
+def test_smoothing():
+    """Test the smoothing of scan varying profile parameters."""
+    kernel = _gaussian_kernel(5)
+    assert np.sum(kernel) == pytest.approx(1)
+    assert list(kernel) == list(kernel[::-1])
+    assert np.argmax(kernel) == 2
+
+    # constant data is unchanged, the ends are extended with the end values
+    assert _convolve(np.full(3, 2.0), kernel) == pytest.approx([2.0, 2.0, 2.0])
+    data = np.array([0.0, 0.0, 1.0, 0.0, 0.0, 0.0])
+    expected = [kernel[4], kernel[3], kernel[2], kernel[1], kernel[0], 0]
+    assert _convolve(data, kernel) == pytest.approx(expected)
@@ -398,3 +398,32 @@ def test_laue_prediction_parameters(dials_data):
 
     # return to the initial state
     pred_param.set_param_vals(p_vals)
+
+
+def test_get_experiment_to_idx():
+    # only the experiment list is needed to build the index
+    pred_param = XYPhiPredictionParameterisation.__new__(
+        XYPhiPredictionParameterisation
+    )
+    pred_param._experiments = ExperimentList([Experiment() for _ in range(4)])
+    pred_param._experiment_index_cache = {}
+
+    reflections = {"id": flex.int([2, 0, -1, 2, 1, 0, 2])}
+    experiment_to_idx = pred_param._get_experiment_to_idx(reflections)
+    assert [list(isel) for isel in experiment_to_idx] == [
+        [1, 5],
+        [4],
+        [0, 3, 6],
+        [],
+    ]
+    for iexp, isel in enumerate(experiment_to_idx):
+        assert list(isel) == list((reflections["id"] == iexp).iselection())
+
+    # the index is reused for a table with the same ids
+    assert (
+        pred_param._get_experiment_to_idx({"id": reflections["id"].deep_copy()})
+        is experiment_to_idx
+    )
+    reflections["id"][2] = 3
+    experiment_to_idx = pred_param._get_experiment_to_idx(reflections)
+    assert list(experiment_to_idx[3]) == [2]
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import copy
+
 import pytest
 
 from cctbx.sgtbx import space_group, space_group_symbols
@@ -341,3 +343,31 @@ def test_spherical_relp_stills_pred_param(tc):
                 else:
                     assert a == pytest.approx(b, abs=5e-6)
             print("OK")
+
+
+def test_stills_experiments_predictor_shared_models(tc):
+    """Reflections of experiments sharing a beam and a detector are predicted
+    together, which must give the same result as predicting them separately"""
+
+    crystal2 = copy.deepcopy(tc.crystal)
+    crystal2.rotate_around_origin((0, 1, 0), 0.5)
+    experiments = ExperimentList()
+    for crystal in (tc.crystal, crystal2):
+        experiments.append(
+            Experiment(beam=tc.beam, detector=tc.detector, crystal=crystal)
+        )
+
+    reflections = tc.reflections.deep_copy()
+    reflections["id"] = flex.int(len(reflections), 0)
+    reflections["id"].set_selected(flex.size_t(range(1, len(reflections), 2)), 1)
+    StillsExperimentsPredictor(experiments)(reflections)
+
+    for i, experiment in enumerate(experiments):
+        sel = reflections["id"] == i
+        expected = reflections.select(sel)
+        expected["id"] = flex.int(len(expected), 0)
+        single = ExperimentList([experiment])
+        expected = StillsExperimentsPredictor(single)(expected)
+        refs = reflections.select(sel)
+        for key in ("xyzcal.mm", "xyzcal.px", "s1", "delpsical.rad"):
+            assert list(refs[key]) == list(expected[key])
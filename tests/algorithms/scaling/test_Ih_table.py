@@ -204,6 +204,7 @@ def test_IhTableblock_onedataset(large_reflection_table, test_sg):
         )
 
     assert list(block.calc_nh()) == [2, 1, 2, 1, 1, 2, 2]
+    assert list(block.group_indices()) == [0, 1, 0, 2, 3, 4, 4]
 
     # Test update error model
     block.update_weights(mock_error_model())
@@ -222,6 +223,7 @@ def test_IhTableblock_onedataset(large_reflection_table, test_sg):
     assert new_block.h_index_matrix[0, 0] == 1
     assert new_block.h_index_matrix[1, 0] == 1
     assert new_block.h_index_matrix[2, 1] == 1
+    assert list(new_block.group_indices()) == [0, 0, 1]
 
     assert new_block.h_expand_matrix.n_cols == 3
     assert new_block.h_expand_matrix.n_rows == 2
@@ -452,6 +454,58 @@ def test_IhTable_split_into_blocks(
     ]
 
 
+def test_IhTable_remove_datasets_and_reflections(
+    large_reflection_table, small_reflection_table, test_sg
+):
+    """Test the in-place removal of datasets and reflections from an IhTable."""
+
+    sel1 = flex.bool(7, True)
+    sel1[6] = False
+    sel2 = flex.bool(4, True)
+    sel2[1] = False
+
+    def make_Ih_table():
+        return IhTable(
+            reflection_tables=[
+                large_reflection_table.select(sel1),
+                small_reflection_table.select(sel2),
+            ],
+            indices_lists=[sel1.iselection(), sel2.iselection()],
+            space_group=test_sg,
+            nblocks=2,
+        )
+
+    Ih_table = make_Ih_table()
+    Ih_table.remove_datasets([1])
+    assert Ih_table.n_datasets == 1
+    assert Ih_table.size == 6
+    block_list = Ih_table.Ih_table_blocks
+    assert [list(s) for s in block_list[0].block_selections] == [[1, 5, 3]]
+    assert [list(s) for s in block_list[1].block_selections] == [[4, 0, 2]]
+    assert list(block_list[1].asu_miller_index) == [(0, 4, 0), (1, 0, 0), (1, 0, 0)]
+    assert block_list[1].n_groups == 2
+    assert list(block_list[1].Ih_table["dataset_id"]) == [0, 0, 0]
+    assert block_list[1].dataset_info == {0: {"start_index": 0, "end_index": 3}}
+    block_sels_0 = Ih_table.get_block_selections_for_dataset(dataset=0)
+    assert [list(s) for s in block_sels_0] == [[1, 5, 3], [4, 0, 2]]
+    with pytest.raises(AssertionError):
+        _ = Ih_table.get_block_selections_for_dataset(dataset=1)
+
+    Ih_table = make_Ih_table()
+    Ih_table.remove_reflections(dataset_id=0, indices=np.array([0]))
+    assert Ih_table.n_datasets == 2
+    assert Ih_table.size == 8
+    block_list = Ih_table.Ih_table_blocks
+    assert [list(s) for s in block_list[0].block_selections] == [[1, 5, 3], []]
+    assert [list(s) for s in block_list[1].block_selections] == [[4, 2], [3, 0, 2]]
+    assert block_list[1].dataset_info == {
+        0: {"start_index": 0, "end_index": 2},
+        1: {"start_index": 2, "end_index": 5},
+    }
+    assert block_list[1].n_groups == 3
+    assert list(block_list[1].group_multiplicities()) == [2.0, 2.0, 1.0]
+
+
 def test_IhTable_freework(large_reflection_table, small_reflection_table, test_sg):
     sel1 = flex.bool(7, True)
     sel1[6] = False
@@ -537,6 +591,19 @@ def update_vars_side_effect(*args):
 
     Ih_table.calc_Ih(1)
 
+    # test splitting the free set off into a separate table
+    free_Ih_table = Ih_table.split_free_set()
+    assert not Ih_table.free_Ih_table
+    assert len(Ih_table.blocked_data_list) == 2
+    assert Ih_table.size == 4
+    assert free_Ih_table.n_work_blocks == 1
+    assert free_Ih_table.n_datasets == 2
+    assert free_Ih_table.size == 5
+    assert [list(s) for s in free_Ih_table.get_block_selections_for_dataset(0)] == [
+        [1, 3, 0, 2]
+    ]
+    assert [list(s) for s in free_Ih_table.get_block_selections_for_dataset(1)] == [[0]]
+
     # now test free set with offset
     Ih_table = IhTable(
         reflection_tables=[
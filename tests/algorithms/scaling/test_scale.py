@@ -1101,14 +1101,17 @@ def test_incremental_scale_workflow(dials_data, tmp_path):
 
 
 @pytest.mark.parametrize(
-    ("mode", "parameter", "parameter_values"),
+    ("mode", "parameter", "parameter_values", "nproc"),
     [
-        ("single", None, None),
-        ("multi", "physical.absorption_correction", None),
-        ("multi", "model", "physical array"),
+        ("single", None, None, 1),
+        ("multi", "physical.absorption_correction", None, 1),
+        ("multi", "model", "physical array", 1),
+        ("multi", "physical.absorption_correction", None, 2),
     ],
 )
-def test_scale_cross_validate(dials_data, tmp_path, mode, parameter, parameter_values):
+def test_scale_cross_validate(
+    dials_data, tmp_path, mode, parameter, parameter_values, nproc
+):
     """Test standard scaling of one dataset."""
     data_dir = dials_data("l_cysteine_dials_output", pathlib=True)
     refl = data_dir / "20_integrated.pickle"
@@ -1118,6 +1121,7 @@ def test_scale_cross_validate(dials_data, tmp_path, mode, parameter, parameter_v
         "nfolds=2",
         "full_matrix=0",
         "error_model=None",
+        f"cross_validation.nproc={nproc}",
     ]
     if parameter:
         extra_args += [f"parameter={parameter}"]
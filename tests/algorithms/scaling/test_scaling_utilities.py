@@ -24,6 +24,7 @@
 from dials.algorithms.scaling.scaling_library import create_scaling_model
 from dials.algorithms.scaling.scaling_utilities import (
     Reasons,
+    SphHarmTableCache,
     align_axis_along_z,
     calc_crystal_frame_vectors,
     calculate_prescaling_correction,
@@ -395,6 +396,30 @@ def test_create_sph_harm_table(test_reflection_table, test_experiment_singleaxis
     # Now test that you get the same by just calling the function.
 
 
+def test_sph_harm_table_cache(tmp_path):
+    """Test the on disk caching of spherical harmonic lookup tables."""
+    expected = create_sph_harm_lookup_table(2, 1)
+
+    cache = SphHarmTableCache()
+    table = cache.lookup_table(2, points_per_degree=1)
+    assert len(table) == len(expected) == 8
+    assert all(t.all_eq(e) for t, e in zip(table, expected))
+
+    # save and reload from disk, at double precision
+    cache = SphHarmTableCache(directory=str(tmp_path))
+    cache.lookup_table(2, points_per_degree=1)
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+    reloaded = SphHarmTableCache(directory=str(tmp_path)).lookup_table(
+        2, points_per_degree=1
+    )
+    assert all(isinstance(t, flex.double) for t in reloaded)
+    assert all(t.all_eq(e) for t, e in zip(reloaded, expected))
+    values, _ = calculate_harmonic_tables_from_selections(
+        flex.size_t([0, 100]), flex.size_t([200, 300]), reloaded
+    )
+    assert len(values) == 8
+
+
 def test_calculate_wilson_outliers(wilson_test_reflection_table):
     """Test the set wilson outliers function."""
     reflection_table = set_wilson_outliers(wilson_test_reflection_table)
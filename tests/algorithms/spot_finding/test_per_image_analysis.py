@@ -129,6 +129,17 @@ def test_stats_per_image(centroid_test_data):
     assert [tt[0] for tt in t[1:]] == [str(i + 1) for i in perm]
 
 
+def test_split_by_image(centroid_test_data):
+    experiments, reflections = centroid_test_data
+    start, end = experiments[0].scan.get_array_range()
+    image_number = flex.floor(reflections["xyzobs.px.value"].parts()[2])
+    split = per_image_analysis.split_by_image(reflections, start, end)
+    assert len(split) == end - start
+    for i, refl in zip(range(start, end), split):
+        expected = reflections.select(image_number == i)
+        assert list(refl["xyzobs.px.value"]) == list(expected["xyzobs.px.value"])
+
+
 def test_stats_table_no_resolution_analysis(centroid_test_data):
     experiments, reflections = centroid_test_data
     stats = per_image_analysis.stats_per_image(
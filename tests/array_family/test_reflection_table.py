@@ -758,7 +758,8 @@ def test_copy():
     assert table2.is_consistent()
 
 
-def test_extract_shoeboxes():
+@pytest.mark.parametrize("background_read", [False, True])
+def test_extract_shoeboxes(background_read):
     random.seed(0)
 
     reflections = flex.reflection_table()
@@ -830,7 +831,7 @@ def get_mask(self, index):
 
     imageset = FakeImageSet()
 
-    reflections.extract_shoeboxes(imageset)
+    reflections.extract_shoeboxes(imageset, background_read=background_read, prefetch=4)
 
     for i in range(len(reflections)):
         sbox = reflections[i]["shoebox"]
@@ -860,6 +861,43 @@ def get_mask(self, index):
                         assert m1 == 0
 
 
+def test_extract_shoeboxes_background_read(dials_data):
+    experiments = load.experiment_list(
+        dials_data("centroid_test_data", pathlib=True) / "experiments.json"
+    )
+    imageset = experiments[0].imageset
+    width, height = imageset.get_detector()[0].get_image_size()
+    frame0, frame1 = imageset.get_array_range()
+
+    random.seed(0)
+    bboxes = flex.int6()
+    for i in range(500):
+        x0 = random.randint(0, width - 10)
+        y0 = random.randint(0, height - 10)
+        z0 = random.randint(frame0, frame1 - 1)
+        z1 = min(z0 + random.randint(1, 3), frame1)
+        bboxes.append(
+            (x0, x0 + random.randint(3, 10), y0, y0 + random.randint(3, 10), z0, z1)
+        )
+
+    shoeboxes = []
+    for background_read in (False, True):
+        reflections = flex.reflection_table()
+        reflections["panel"] = flex.size_t(len(bboxes), 0)
+        reflections["bbox"] = bboxes
+        reflections["shoebox"] = flex.shoebox(
+            reflections["panel"], reflections["bbox"], allocate=True
+        )
+        reflections.extract_shoeboxes(
+            imageset, background_read=background_read, prefetch=2
+        )
+        shoeboxes.append(reflections["shoebox"])
+
+    for sbox1, sbox2 in zip(*shoeboxes):
+        assert sbox1.data.all_eq(sbox2.data)
+        assert sbox1.mask.all_eq(sbox2.mask)
+
+
 def test_split_by_experiment_id():
     r = flex.reflection_table()
     r["id"] = flex.int()
@@ -1095,6 +1133,29 @@ def is_overlap(b0, b1, border):
             assert is_overlap(b0, b1, i)
 
 
+def test_find_overlapping_with_experiments():
+    r = flex.reflection_table()
+    r["bbox"] = flex.int6(
+        [(0, 5, 0, 5, 0, 5), (2, 7, 2, 7, 2, 7), (20, 25, 0, 5, 0, 5)]
+    )
+    r["panel"] = flex.size_t(3, 0)
+    r["id"] = flex.int([0, 1, 1])
+
+    # experiments sharing an imageset are treated together
+    experiments = ExperimentList([Experiment(), Experiment()])
+    overlaps = r.find_overlaps(experiments)
+    assert overlaps.num_vertices() == 3
+    edges = {
+        tuple(sorted((overlaps.source(e), overlaps.target(e))))
+        for e in overlaps.edges()
+    }
+    assert edges == {(0, 1)}
+
+    r["id"][2] = 2
+    with pytest.raises(KeyError):
+        r.find_overlaps(experiments)
+
+
 def test_to_from_msgpack(tmp_path):
     def gen_shoebox():
         shoebox = Shoebox(0, (0, 4, 0, 3, 0, 1))
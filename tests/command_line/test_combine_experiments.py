@@ -17,6 +17,7 @@
 from dials.array_family import flex
 from dials.command_line.combine_experiments import (
     combine_experiments,
+    combine_experiments_in_batches,
     combine_experiments_no_reflections,
     phil_scope,
 )
@@ -465,3 +466,39 @@ def test_combine_imagesets(dials_data, tmp_path):
     expts2 = combine_experiments_no_reflections(params, list_of_elists)
     assert len(expts2) == 4
     assert expts2.identifiers() == expts.identifiers()
+
+
+@pytest.mark.parametrize("min_refl", [None, 100])
+def test_combine_experiments_in_batches(dials_data, min_refl):
+    data_dir = dials_data("refinement_test_data", pathlib=True)
+    params = phil_scope.extract()
+    params.output.min_reflections_per_experiment = min_refl
+
+    def load_input():
+        experiments = load.experiment_list(
+            data_dir / "multi_stills_combined.json", check_format=False
+        )
+        reflections = flex.reflection_table.from_file(
+            data_dir / "multi_stills_combined.pickle"
+        )
+        return [experiments], [reflections]
+
+    expts, refls = combine_experiments(params, *load_input())
+    batches = list(combine_experiments_in_batches(params, *load_input(), 4))
+
+    # the batches are the split of the combined output, as equal as possible
+    n_batches = len(expts) // 4 + 1
+    assert len(batches) == n_batches
+    assert sum(len(batch_expts) for batch_expts, _ in batches) == len(expts)
+    assert max(len(b[0]) for b in batches) - min(len(b[0]) for b in batches) <= 1
+    i_expt = 0
+    for batch_expts, batch_refls in batches:
+        assert set(batch_refls["id"]) == set(range(len(batch_expts)))
+        for batch_id, expt in enumerate(batch_expts):
+            assert expt.identifier == expts[i_expt].identifier
+            sel = refls["id"] == i_expt
+            assert (batch_refls["id"] == batch_id).count(True) == sel.count(True)
+            assert list(
+                batch_refls.select(batch_refls["id"] == batch_id)["miller_index"]
+            ) == list(refls.select(sel)["miller_index"])
+            i_expt += 1
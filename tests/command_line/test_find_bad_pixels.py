@@ -4,6 +4,11 @@
 import shutil
 import subprocess
 
+import pytest
+
+from dials.array_family import flex
+from dials.command_line import find_bad_pixels
+
 
 def return_locations():
     locations = {
@@ -34,13 +39,15 @@ def return_locations():
     return locations
 
 
-def test_find_bad_pixels(dials_data, tmp_path):
+@pytest.mark.parametrize("nproc", [1, 2])
+def test_find_bad_pixels(dials_data, tmp_path, nproc):
     image_files = sorted(dials_data("x4wide", pathlib=True).glob("*.cbf"))
     image_files = image_files[:10] + image_files[-10:]
     result = subprocess.run(
         [
             shutil.which("dials.find_bad_pixels"),
             "mask=pixels.mask",
+            f"nproc={nproc}",
         ]
         + image_files,
         cwd=tmp_path,
@@ -85,3 +92,28 @@ def test_find_bad_pixels(dials_data, tmp_path):
         capture_output=True,
     )
     assert not result.returncode and not result.stderr
+
+
+def test_accumulate_signal_pixels_converges(monkeypatch):
+    class FakeCounter:
+        n_pixels = 4
+
+        def __init__(self, imageset):
+            pass
+
+        def __call__(self, idx):
+            # pixel 0 is always signal, pixel 1 on every other image
+            return flex.bool([True, idx % 2 == 0, False, False])
+
+    monkeypatch.setattr(find_bad_pixels, "SignalPixelCounter", FakeCounter)
+    images = list(range(1, 101))
+
+    total, n_images = find_bad_pixels.accumulate_signal_pixels(None, images)
+    assert n_images == 100
+    assert list(total) == [100, 50, 0, 0]
+
+    total, n_images = find_bad_pixels.accumulate_signal_pixels(
+        None, images, check_interval=5, stable_checks=2
+    )
+    assert n_images == 15
+    assert list(total) == [15, 7, 0, 0]
@@ -11,6 +11,10 @@
 from cctbx import sgtbx, uctbx
 from dxtbx.serialize import load
 
+from dials.algorithms.indexing.bravais_settings import (
+    refined_settings_from_refined_triclinic,
+)
+from dials.array_family import flex
 from dials.command_line import refine_bravais_settings
 
 
@@ -298,3 +302,39 @@ def test_refine_bravais_settings_non_primitive_input(dials_data, tmp_path):
         )
         uc_ref = uctbx.unit_cell(bravais_summary[f"{i+1}"]["unit_cell"])
         assert uc_input_to_ref.is_similar_to(uc_ref)
+
+
+def test_refined_settings_parallel_matches_serial(dials_data):
+    data_dir = dials_data("insulin_processed", pathlib=True)
+    experiments = load.experiment_list(data_dir / "indexed.expt", check_format=False)
+    reflections = flex.reflection_table.from_file(data_dir / "indexed.refl")
+    reflections = refine_bravais_settings.eliminate_sys_absent(experiments, reflections)
+    cb_op_to_primitive = refine_bravais_settings.map_to_primitive(
+        experiments, reflections
+    )
+
+    results = []
+    for nproc in (1, 4):
+        params = refine_bravais_settings.phil_scope.extract()
+        params.nproc = nproc
+        results.append(
+            refined_settings_from_refined_triclinic(
+                experiments,
+                reflections,
+                params,
+                cb_op_to_primitive=cb_op_to_primitive,
+            )
+        )
+    serial, parallel = results
+
+    assert len(serial) == len(parallel)
+    for expected, subgroup in zip(serial, parallel):
+        assert subgroup.setting_number == expected.setting_number
+        assert subgroup["bravais"] == expected["bravais"]
+        assert subgroup.rmsd == pytest.approx(expected.rmsd)
+        assert subgroup.Nmatches == expected.Nmatches
+        assert subgroup.max_cc == pytest.approx(expected.max_cc)
+        assert subgroup.recommended == expected.recommended
+        assert subgroup.refined_crystal.get_unit_cell().parameters() == pytest.approx(
+            expected.refined_crystal.get_unit_cell().parameters()
+        )
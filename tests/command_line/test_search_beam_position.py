@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+import copy
 import os
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 import scitbx
 from cctbx import uctbx
 from dxtbx.serialize import load
 
+from dials.array_family import flex
 from dials.command_line import search_beam_position
 
 from ..algorithms.indexing.test_index import run_indexing
@@ -225,3 +228,41 @@ def test_multi_sweep_fixed_rotation(dials_data, run_in_tmp_path):
         ) - scitbx.matrix.col(new_expt.detector[0].get_origin())
         print(shift)
         assert shift.elems == pytest.approx((0.096, -1.111, 0), abs=1e-2)
+
+
+def test_origin_offset_scorer_reciprocal_lattice_points(dials_data):
+    from rstbx.indexing_api import dps_extended
+
+    insulin = dials_data("insulin_processed", pathlib=True)
+    experiments = load.experiment_list(insulin / "imported.expt", check_format=False)
+    reflections = flex.reflection_table.from_file(insulin / "strong.refl")
+    reflections["imageset_id"] = flex.int(len(reflections), 0)
+    reflections.centroid_px_to_mm(experiments)
+
+    scorer = search_beam_position._OriginOffsetScorer(
+        experiments, [reflections], [None], [None]
+    )
+    offsets = np.array([(0.0, 0.0, 0.0), (0.3, -0.2, 0.0), (-1.0, 0.5, 0.0)])
+    rlps = scorer._reciprocal_lattice_points(scorer._spots[0], offsets)
+    for offset, rlp in zip(offsets, rlps):
+        experiment = copy.copy(experiments[0])
+        experiment.detector = dps_extended.get_new_detector(
+            experiment.detector, scitbx.matrix.col(offset)
+        )
+        reflections.map_centroids_to_reciprocal_space([experiment])
+        assert rlp == pytest.approx(reflections["rlp"].as_numpy_array(), abs=1e-10)
+
+
+@pytest.mark.parametrize("coarse_step", [1, 2, 4])
+def test_search_grid(coarse_step):
+    def score_points(points):
+        points = np.array(points)
+        return np.exp(-((points[:, 0] - 7) ** 2 + (points[:, 1] + 3) ** 2) / 50)
+
+    scores = search_beam_position._search_grid(score_points, 20, coarse_step)
+    assert scores.shape == (41, 41)
+    assert np.unravel_index(np.nanargmax(scores), scores.shape) == (20 - 3, 20 + 7)
+    if coarse_step == 1:
+        assert not np.isnan(scores).any()
+    else:
+        assert np.isnan(scores).sum() > scores.size // 2
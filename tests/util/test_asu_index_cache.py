@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import numpy as np
+
+from cctbx import miller, sgtbx
+from dxtbx import flumpy
+
+from dials.array_family import flex
+from dials.util.asu_index_cache import (
+    AsuIndexCache,
+    pack_miller_indices,
+    unpack_miller_indices,
+)
+
+
+def _random_indices(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    hkl = rng.integers(-20, 21, size=(n, 3)).astype(np.int32)
+    return flumpy.miller_index_from_numpy(hkl)
+
+
+def test_pack_miller_indices():
+    hkl = flumpy.to_numpy(_random_indices())
+    keys = pack_miller_indices(hkl)
+    assert np.array_equal(unpack_miller_indices(keys), hkl)
+    # sorting the keys sorts the indices lexicographically
+    assert [tuple(h) for h in hkl[np.argsort(keys)]] == sorted(tuple(h) for h in hkl)
+
+
+def test_asu_index_cache():
+    cache = AsuIndexCache()
+    indices = _random_indices()
+    space_group = sgtbx.space_group_info("P 4 2 2").group()
+
+    asu = cache.asu_indices(indices, space_group)
+    expected = indices.deep_copy()
+    miller.map_to_asu(space_group.type(), False, expected)
+    assert list(asu) == list(expected)
+    assert cache.misses == 1
+
+    # the same indices and an equal copy of them are both cache hits
+    assert cache.asu_indices(indices, space_group) is asu
+    assert cache.asu_indices(indices.deep_copy(), space_group) is asu
+    assert cache.hits == 2
+
+    # the asu indices themselves map to the same entry
+    perm = cache.sort_permutation(asu, space_group)
+    assert cache.misses == 1
+    assert list(asu.select(flumpy.from_numpy(perm.astype(np.uint64)))) == sorted(asu)
+
+    # anomalous and reindexed arrays are distinct entries
+    cache.asu_indices(indices, space_group, anomalous=True)
+    cb_op = sgtbx.change_of_basis_op("-x,-y,z")
+    reindexed = cache.asu_indices(indices, space_group, cb_op=cb_op)
+    expected = cb_op.apply(indices)
+    miller.map_to_asu(space_group.type(), False, expected)
+    assert list(reindexed) == list(expected)
+    assert cache.misses == 3
+    assert len(cache) == 3
+
+
+def test_asu_index_cache_sort_in_asu():
+    cache = AsuIndexCache()
+    space_group = sgtbx.space_group_info("P 4 2 2").group()
+    asu = _random_indices()
+    miller.map_to_asu(space_group.type(), False, asu)
+    perm = cache.sort_permutation(asu, space_group, in_asu=True)
+    assert list(asu.select(flumpy.from_numpy(perm.astype(np.uint64)))) == sorted(asu)
+    assert cache.misses == 1
+    assert cache.sort_permutation(asu, space_group, in_asu=True) is perm
+    assert cache.hits == 1
+
+
+def test_asu_index_cache_eviction():
+    space_group = sgtbx.space_group_info("P 1").group()
+    first = _random_indices(seed=0)
+    # an entry holds 12 bytes of indices and 8 bytes of keys per reflection
+    cache = AsuIndexCache(max_bytes=20 * first.size())
+    cache.asu_indices(first, space_group)
+    cache.asu_indices(_random_indices(seed=1), space_group)
+    # the least recently used entry is evicted when over budget
+    assert len(cache) == 1
+    cache.asu_indices(first, space_group)
+    assert cache.misses == 3
+    # entries larger than the budget are not cached
+    cache.sort_permutation(first, space_group)
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+    cache = AsuIndexCache(max_bytes=0)
+    asu = cache.asu_indices(first, space_group)
+    assert len(cache) == 0
+    assert cache.asu_indices(first, space_group) is not asu
+    assert cache.misses == 2
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+    assert isinstance(cache.asu_indices(first, space_group), flex.miller_index)
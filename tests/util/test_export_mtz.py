@@ -6,9 +6,14 @@
 
 import itertools
 
+import gemmi
+import pytest
+
 from dxtbx.model import Scan
 
+from dials.array_family import flex
 from dials.util.batch_handling import calculate_batch_offsets
+from dials.util.export_mtz import write_columns
 
 
 def range_to_set(ranges):
@@ -87,3 +92,42 @@ def test_calculate_batch_ranges(self):
         assert all(float(x).is_integer() for x in offsets)
         assert all(isinstance(x, int) for x in offsets)
         assert all(x > 0 for x in offsets)
+
+
+@pytest.mark.parametrize("chunk_size", [2, 1000000])
+def test_write_columns(chunk_size):
+    """Test writing the reflection data, in one or several chunks of rows."""
+    table = flex.reflection_table()
+    table["miller_index"] = flex.miller_index([(1, 2, 3), (-1, 0, 4), (2, 2, 2)])
+    table["batch"] = flex.int([1, 2, 3])
+    table["intensity.sum.value"] = flex.double([10.0, 20.0, 30.0])
+    table["intensity.sum.variance"] = flex.double([4.0, 9.0, 16.0])
+    table["fractioncalc"] = flex.double(3, 1.0)
+    table["xyzobs.px.value"] = flex.vec3_double([(1, 2, 3), (4, 5, 6), (7, 8, 9)])
+    table["ROT"] = flex.double([0.5, 1.5, 2.5])
+
+    mtz = gemmi.Mtz(with_base=True)
+    mtz.add_dataset("test")
+    write_columns(mtz, table, chunk_size=chunk_size)
+
+    labels = [column.label for column in mtz.columns]
+    assert labels == [
+        "H",
+        "K",
+        "L",
+        "M/ISYM",
+        "BATCH",
+        "I",
+        "SIGI",
+        "FRACTIONCALC",
+        "XDET",
+        "YDET",
+        "ROT",
+        "QE",
+    ]
+    data = mtz.array
+    assert data[:, 0:3].tolist() == [[1, 2, 3], [-1, 0, 4], [2, 2, 2]]
+    assert list(data[:, labels.index("BATCH")]) == [1, 2, 3]
+    assert list(data[:, labels.index("SIGI")]) == [2, 3, 4]
+    assert list(data[:, labels.index("YDET")]) == [2, 5, 8]
+    assert list(data[:, labels.index("QE")]) == [1, 1, 1]
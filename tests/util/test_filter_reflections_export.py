@@ -717,3 +717,23 @@ def test_sum_partial_reflections():
     # Add test to check calculation in case where both prf and sum - but this
     # requires knowing how the values will be weighted, so leave until that is
     # decided.
+
+
+def test_sum_partial_reflections_interleaved_groups():
+    """Test summing partials whose groups are interleaved in the table."""
+    r = flex.reflection_table()
+    r["intensity.sum.value"] = flex.double([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    r["intensity.sum.variance"] = flex.double([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    r["intensity.scale.value"] = flex.double([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    r["intensity.scale.variance"] = flex.double([1.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+    r["partial_id"] = flex.int([7, 3, 7, 5, 3, 7])
+    r["partiality"] = flex.double([0.25, 0.5, 0.25, 0.9, 0.25, 0.25])
+    r["identifier"] = flex.int([1, 2, 3, 4, 5, 6])
+
+    r = sum_partial_reflections(r)
+    assert list(r["identifier"]) == [1, 2, 4]
+    assert list(r["partiality"]) == [0.75, 0.75, 0.9]
+    assert list(r["intensity.sum.value"]) == [10.0, 7.0, 4.0]
+    assert list(r["intensity.sum.variance"]) == [10.0, 7.0, 4.0]
+    assert list(r["intensity.scale.value"]) == pytest.approx([10 / 3, 3.5, 4.0])
+    assert list(r["intensity.scale.variance"]) == pytest.approx([1 / 3, 0.5, 1.0])
@@ -175,6 +175,7 @@ def test_yml_parsing_template(tmp_path):
         assert iitgi[i] == i % 10
     assert iitgi.single_return_val is None
     assert iitgi.group_ids.size() == 0
+    assert list(iitgi.group_ids_for(np.arange(100))) == [i % 10 for i in range(100)]
 
     simple_block_example = """
 metadata:
@@ -230,6 +231,36 @@ def test_yml_parsing_template(tmp_path):
 """
 
 
+def test_shared_metadata_file(tmp_path):
+    """Test images sharing a metadata dataset, which is read once"""
+    test_h5 = str(os.fspath(tmp_path / "meta.h5"))
+    shared_example = f"""
+metadata:
+  timepoint:
+    '/path/to/example_1.h5' : '{test_h5}:/timepoint'
+    '/path/to/example_2.h5' : '{test_h5}:/timepoint'
+grouping:
+  merge_by:
+    values:
+      - timepoint
+"""
+    with h5py.File(test_h5, "w") as f:
+        f.create_dataset("timepoint", data=np.array([0, 1, 2, 0, 1, 2]))
+
+    parsed = ParsedYAML(yml_str=shared_example)
+    I1 = ImageFile("/path/to/example_1.h5", True, False)
+    I2 = ImageFile("/path/to/example_2.h5", True, False)
+    timepoint = parsed.metadata_items["timepoint"]
+    assert timepoint[I1] is timepoint[I2]
+
+    handler = get_grouping_handler(parsed, "merge_by")
+    iitgi = handler._files_to_groups_dict[I1]["img_idx_to_group_id"]
+    assert list(iitgi.group_ids_for([5, 0, 1, 4])) == [2, 0, 1, 1]
+    assert [iitgi[i] for i in [5, 0, 1, 4]] == [2, 0, 1, 1]
+    with pytest.raises(ValueError):
+        iitgi.group_ids_for([6])
+
+
 def test_invalid_yml(tmp_path):
     with open(tmp_path / "example.yaml", "w") as f:
         f.write(invalid_example)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import pytest
+
+from dials.util import instrumentation
+from dials.util.mp import multi_node_parallel_map
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.enable()
+    instrumentation.collect()
+    yield
+    instrumentation.disable()
+    instrumentation.collect()
+
+
+def _square(x):
+    with instrumentation.span("square"):
+        instrumentation.count("squared")
+        return x * x
+
+
+def test_disabled_records_nothing():
+    assert not instrumentation.is_enabled()
+    with instrumentation.span("outer"):
+        instrumentation.count("items", 3)
+    collected = instrumentation.collect()
+    assert collected["counters"] == {}
+    assert not [e for e in collected["events"] if e["ph"] == "X"]
+
+
+def test_spans_and_counters(enabled, tmp_path):
+    with instrumentation.span("outer", n=2):
+        for _ in range(2):
+            with instrumentation.span("inner"):
+                instrumentation.count("items", 3)
+
+    @instrumentation.timed()
+    def func():
+        pass
+
+    func()
+
+    summary = instrumentation.summary()
+    assert "outer/inner" in summary
+    instrumentation.write_trace(tmp_path / "trace.json")
+    with (tmp_path / "trace.json").open() as f:
+        trace = json.load(f)
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["args"]["path"] for e in spans] == [
+        "outer/inner",
+        "outer/inner",
+        "outer",
+        f"{__name__}.test_spans_and_counters.<locals>.func",
+    ]
+    assert spans[2]["args"]["n"] == 2
+    assert spans[2]["dur"] >= spans[0]["dur"] + spans[1]["dur"]
+    assert trace["otherData"]["counters"] == {"items": 6}
+
+
+def test_collect_and_merge(enabled):
+    with instrumentation.span("parent"):
+        pass
+    collected = instrumentation.collect()
+    assert len([e for e in collected["events"] if e["ph"] == "X"]) == 1
+    assert instrumentation.collect()["counters"] == {}
+    instrumentation.merge(collected)
+    instrumentation.merge(collected)
+    assert instrumentation.summary().count("parent") == 1
+    assert "2" in instrumentation.summary()
+
+
+def test_records_merged_from_workers(enabled):
+    results = multi_node_parallel_map(
+        _square, range(6), nproc=2, cluster_method="multiprocessing"
+    )
+    assert results == [0, 1, 4, 9, 16, 25]
+    collected = instrumentation.collect()
+    assert collected["counters"] == {"squared": 6}
+    assert len([e for e in collected["events"] if e["name"] == "square"]) == 6
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="Requires fork"
+)
+def test_other_processes_are_not_instrumented(enabled):
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        assert pool.apply(instrumentation.is_enabled) is False
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from dials.util import instrumentation; print(instrumentation.is_enabled())",
+        ],
+        capture_output=True,
+        env=os.environ,
+    )
+    assert result.stdout.decode().strip() == "False"
@@ -272,6 +272,21 @@ def test_parse_multiple_datasets():
     assert single_tables[3].experiment_identifiers()[3] == "5"
 
 
+def test_parse_multiple_datasets_interleaved_ids():
+    """Test splitting a table with interleaved ids and unindexed reflections."""
+    rt = flex.reflection_table()
+    rt["id"] = flex.int([4, -1, 2, 4, 2, -1, 4])
+    rt["value"] = flex.double([0, 1, 2, 3, 4, 5, 6])
+    rt.experiment_identifiers()[2] = "2"
+    rt.experiment_identifiers()[4] = "4"
+    single_tables = parse_multiple_datasets([rt])
+    assert len(single_tables) == 2
+    assert list(single_tables[0]["value"]) == [2, 4]
+    assert dict(single_tables[0].experiment_identifiers()) == {2: "2"}
+    assert list(single_tables[1]["value"]) == [0, 3, 6]
+    assert dict(single_tables[1].experiment_identifiers()) == {4: "4"}
+
+
 def test_sort_tables_to_experiments_order_multi_dataset_files():
     """Test reflection table sorting when a table contains multiple datasets."""
     # Reflection tables in the wrong order
@@ -11,9 +11,11 @@
 import libtbx.phil
 from dxtbx.model import Experiment, ExperimentList
 
+from dials.array_family import flex
 from dials.util import Sorry
 from dials.util.options import (
     ArgumentParser,
+    Importer,
     flatten_reflections,
     reflections_and_experiments_from_files,
 )
@@ -129,3 +131,62 @@ def test_invalid_phil_raises_system_exit(capsys):
         'error: Invalid phil parameter: One True or False value expected, foo="bar" found'
         in captured.err
     )
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_importer_reads_files_concurrently(tmp_path, lazy):
+    expt_files = []
+    refl_files = []
+    for i in range(4):
+        experiments = ExperimentList([Experiment(identifier=f"expt{i}")])
+        expt_files.append(str(tmp_path / f"{i}.expt"))
+        experiments.as_file(expt_files[-1])
+        table = flex.reflection_table()
+        table["id"] = flex.int(3, 0)
+        table.experiment_identifiers()[0] = f"expt{i}"
+        refl_files.append(str(tmp_path / f"{i}.refl"))
+        table.as_file(refl_files[-1])
+    missing = str(tmp_path / "missing.refl")
+
+    importer = Importer(
+        expt_files + refl_files + [missing],
+        read_experiments=True,
+        read_reflections=True,
+        check_format=False,
+        lazy=lazy,
+        nproc=4,
+        max_bytes=0,
+    )
+    assert importer.unhandled == [missing]
+    assert [o.filename for o in importer.experiments] == expt_files
+    assert [o.filename for o in importer.reflections] == refl_files
+    for i, (expt, refl) in enumerate(zip(importer.experiments, importer.reflections)):
+        if lazy:
+            assert dict(refl.identifiers) == {0: f"expt{i}"}
+            assert not refl.loaded
+        assert list(expt.data.identifiers()) == [f"expt{i}"]
+        assert refl.data.size() == 3
+        assert dict(refl.data.experiment_identifiers()) == {0: f"expt{i}"}
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_importer_corrupt_reflection_file(tmp_path, lazy):
+    table = flex.reflection_table()
+    table["id"] = flex.int(1000, 0)
+    table["intensity.sum.value"] = flex.double(1000, 1)
+    table.experiment_identifiers()[0] = "expt0"
+    table.as_file(str(tmp_path / "good.refl"))
+    # a file truncated in the column data, after a valid header
+    data = (tmp_path / "good.refl").read_bytes()
+    truncated = tmp_path / "truncated.refl"
+    truncated.write_bytes(data[: len(data) // 2])
+
+    importer = Importer(
+        [str(tmp_path / "good.refl"), str(truncated)],
+        read_reflections=True,
+        lazy=lazy,
+    )
+    # corrupt files are reported when importing, not when the data are used
+    assert importer.unhandled == [str(truncated)]
+    assert [o.filename for o in importer.reflections] == [str(tmp_path / "good.refl")]
+    assert importer.handling_errors[str(truncated)][0].type == "Reflections"